@@ -1,10 +1,59 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from card import Carte
+from evaluator_fast import np
 from simulator import Simulateur
-import traceback
+from cache import CacheEquite
+from jobs import FileSaturee, GestionnaireTaches, flux_sse
+from batch import evaluer_spots, lire_entree
+from metrics import METRIQUES
+from demarrage import demarrer, publier_memoire
+from sessions import GestionnaireSessions
+from journal import configurer as configurer_journal, journaliser, journaliser_erreur
+from reponses import FORMATS, PRECISION_DEFAUT, PRECISION_MAX, TYPES_MIME, compresser, encoder, etag
+from itertools import islice
+import io
+import json
+import multiprocessing
+import os
+import time
 
 app = Flask(__name__)
 
+# Précision visée pour /simulate : erreur standard (points de %), plafond d'essais et de temps
+ERREUR_CIBLE = 0.25
+ITERATIONS_MAX = 50000
+BUDGET_TEMPS = 1.0
+
+# Nombre de process utilisés par simulation Monte Carlo (un pool partagé par serveur)
+PROCESSUS = int(os.environ.get("POKER_PROCESSUS", os.cpu_count() or 1))
+
+# Échantillonnage Monte Carlo : 'standard' ou une méthode de réduction de variance (voir variance.py)
+METHODE = os.environ.get("POKER_METHODE", "standard")
+
+# Cache des résultats (isomorphisme de couleurs) ; POKER_CACHE = fichier SQLite persistant
+CACHE = CacheEquite(taille_max=int(os.environ.get("POKER_CACHE_TAILLE", 10000)),
+                    chemin=os.environ.get("POKER_CACHE"))
+
+# Calculs en arrière-plan de /jobs : POKER_TACHES threads, file bornée
+TACHES = GestionnaireTaches(max_workers=int(os.environ.get("POKER_TACHES", 4)))
+
+# Paramètres de calcul qui entrent dans l'ETag de /simulate : le changer invalide les réponses gardées par les clients
+CONTEXTE_CALCUL = f"{ERREUR_CIBLE}:{ITERATIONS_MAX}:{BUDGET_TEMPS}:{METHODE}"
+
+# Tables chargées dès l'import (POKER_PRECHAUFFER=tables, par défaut) ; le pool de simulation
+# démarre à la première requête, dans le process qui la sert. POKER_PRECHAUFFER=1 le démarre
+# aussi dès l'import, avant tout thread ; =0 reporte tout à la première requête. Rien de tout
+# cela dans les process du pool, qui réimportent ce module quand il est lancé en script.
+PRECHAUFFER = os.environ.get("POKER_PRECHAUFFER", "tables")
+if multiprocessing.current_process().name == "MainProcess":
+    if PRECHAUFFER != "0":
+        demarrer(PROCESSUS, pool=PRECHAUFFER != "tables")
+    # Journal JSON des requêtes, écrit par un thread dédié (voir journal.py)
+    configurer_journal()
+
+# Sessions de main (voir sessions.py) : oubliées POKER_SESSION_DUREE secondes après leur dernière requête
+SESSIONS = GestionnaireSessions(duree_vie=int(os.environ.get("POKER_SESSION_DUREE", 900)))
+
 def string_to_cards(card_strings):
     cards = []
     for s in card_strings:
@@ -18,56 +67,247 @@ def string_to_cards(card_strings):
 def index():
     return render_template('index.html')
 
+def resume_equite(resultat):
+    """Partie « probabilités » de la réponse de /simulate."""
+    win, tie = resultat['win'], resultat['tie']
+    return {
+        'win': round(win, 2),
+        'tie': round(tie, 2),
+        'loss': round(max(0, 100 - win - tie), 2),
+        'erreur': round(resultat['ic95_win'], 2),
+        'mode': resultat['mode'],
+        'iterations': round(resultat['iterations']),
+        'taille_effective': round(resultat.get('taille_effective', resultat['iterations'])),
+        'mains_absolues': resultat['repartition'],
+    }
+
+def analyser(data, tache=None):
+    """Réponse complète de /simulate.
+
+    Avec une tâche (voir /jobs), les résultats partiels sont publiés au fil du calcul :
+    'analyse' (outs, tirages, texture), 'equite' après chaque lot de simulation, puis 'heatmap'.
+    Avec "timings": true dans la requête, la réponse contient les durées par phase (ms)
+    et les compteurs (évaluations, essais, cache) de ce calcul.
+
+    Avec "session": true (nouvelle session) ou l'id rendu par une requête précédente de la
+    même main, les issues calculées aux tours précédents sont reprises (voir sessions.py) ;
+    la réponse contient l'id de la session à renvoyer au tour suivant.
+    """
+    with METRIQUES.requete('simulate') as mesures:
+        reponse = _analyser(data, tache)
+    if data.get('timings') and mesures is not None:
+        reponse['timings'] = mesures
+    return reponse
+
+def _analyser(data, tache):
+    ma_main = string_to_cards(data.get('ma_main', []))
+    tableau = string_to_cards(data.get('tableau', []))
+    exclues = string_to_cards(data.get('exclues', []))
+    profiles = data.get('profiles', ['any'])
+    publier = tache.publier if tache is not None else None
+    session = SESSIONS.obtenir(data['session']) if data.get('session') else None
+    
+    # Outs et tirages exacts (flop et turn) : outs francs et souillés, runner-runner.
+    # Sans NumPy, l'analyse exacte du flop (~1,2 M d'évaluations) est trop lente pour une
+    # requête : seuls les outs simples (carte qui améliore la main) sont donnés.
+    with METRIQUES.phase('outs'):
+        equite_session = heatmap_session = None
+        outs_simples = None
+        if np is None and len(tableau) == 3:
+            analyse_tirages = {}
+            outs_simples = [repr(c) for c in CACHE.calculer_outs(ma_main, tableau, exclues)]
+        elif session is not None:
+            analyse_tirages, equite_session, heatmap_session = session.analyser(ma_main, tableau, exclues, profiles)
+        else:
+            analyse_tirages = CACHE.analyser_tirages(ma_main, tableau, exclues, profiles)
+    tirages = {
+        'outs': (outs_simples if outs_simples is not None else
+                 analyse_tirages['outs']['franc'] + analyse_tirages['outs']['souille'] if analyse_tirages else []),
+        'outs_detail': analyse_tirages.get('outs', {}),
+        'tirages': analyse_tirages.get('tirages', []),
+        'proba_tirage': analyse_tirages.get('proba_prochaine', 0),
+        'proba_riviere': analyse_tirages.get('proba_riviere', 0),
+    }
+    
+    # Analyse de Texture
+    with METRIQUES.phase('texture'):
+        texture = Simulateur.analyser_texture(tableau)
+    if publier: publier('analyse', dict(tirages, texture=texture))
+    
+    # Simulation (en premier : c'est la première estimation attendue par l'interface)
+    rappel = (lambda partiel: publier('equite', resume_equite(partiel))) if publier else None
+    with METRIQUES.phase('simulation'):
+        resultat = equite_session or CACHE.simuler_detail(ma_main, tableau, profiles, exclues, iterations=ITERATIONS_MAX,
+                                        processus=PROCESSUS, erreur_cible=ERREUR_CIBLE, budget_temps=BUDGET_TEMPS,
+                                        methode=METHODE, rappel=rappel)
+    equite = resume_equite(resultat)
+    if publier: publier('equite', equite)
+    
+    # Heatmap (uniquement si Turn ou Flop, trop long pour PreFlop)
+    heatmap = {}
+    if len(tableau) >= 3 and len(tableau) < 5:
+        rappel = (lambda partielle: publier('heatmap', {'heatmap': partielle})) if publier else None
+        with METRIQUES.phase('heatmap'):
+            heatmap = heatmap_session or CACHE.calculer_heatmap(ma_main, tableau, exclues, profiles, rappel=rappel)
+        if publier: publier('heatmap', {'heatmap': heatmap})
+
+
+    return dict(equite, **tirages, **{
+        'success': True,
+        'session': session.id if session is not None else None,
+        'texture': texture,
+        'heatmap': heatmap,
+        'mains_gagnantes': {},
+    })
+
 @app.route('/simulate', methods=['POST'])
 def simulate():
+    """Réponse de analyser, au format ?format=json|compact|binaire et à ?precision=0..2 décimales
+    pour les formats quantifiés (voir reponses.py), compressée en gzip si le client l'accepte.
+
+    Le calcul ne modifie rien : la réponse porte un ETag (main normalisée, format, précision,
+    paramètres de calcul) et une requête avec If-None-Match correspondant reçoit 304 sans
+    calcul. Pas d'ETag avec "session" ou "timings", dont les réponses varient d'un appel à l'autre.
+    """
+    debut = time.perf_counter()
+    format_ = request.args.get('format', 'json')
+    precision = request.args.get('precision', PRECISION_DEFAUT, type=int)
+    if format_ not in FORMATS or not 0 <= precision <= PRECISION_MAX:
+        return jsonify({'success': False, 'error': "Format ou précision invalide"}), 400
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': "Le corps doit être un objet JSON"}), 400
+    duree_ms = lambda: round((time.perf_counter() - debut) * 1000, 1)
+
+    tag = None
+    if not data.get('session') and not data.get('timings'):
+        try:
+            tag = etag(data, format_, precision, CONTEXTE_CALCUL)
+        except (KeyError, IndexError, TypeError):
+            pass  # Carte invalide : l'analyse renverra l'erreur
+        if tag is not None and request.if_none_match.contains_weak(tag):
+            journaliser('simulate', statut=304, format=format_, duree_ms=duree_ms())
+            reponse = Response(status=304)
+            reponse.set_etag(tag, weak=True)
+            return reponse
+
     try:
-        data = request.json
-        print(f"DEBUG: Data received = {data}") # Log pour voir les données
-        
-        ma_main = string_to_cards(data.get('ma_main', []))
-        tableau = string_to_cards(data.get('tableau', []))
-        exclues = string_to_cards(data.get('exclues', []))
-        profiles = data.get('profiles', ['any'])
-        
-        # Calcul des outs
-        outs_obj = Simulateur.calculer_outs(ma_main, tableau, exclues)
-        outs = [repr(c) for c in outs_obj]
-        
-        # Analyse de Texture
-        texture = Simulateur.analyser_texture(tableau)
-        
-        # Heatmap (uniquement si Turn ou Flop, trop long pour PreFlop)
-        heatmap = {}
-        if len(tableau) >= 3 and len(tableau) < 5:
-            heatmap = Simulateur.calculer_heatmap(ma_main, tableau, exclues, profiles)
-        
-        # Simulation
-        win, tie, mains_gagnantes, mains_absolues = Simulateur.simuler(ma_main, tableau, profiles, exclues, iterations=5000)
-        
-        # Analyse des Tirages (basée sur la heatmap)
-        tirages = []
-        proba_tirage = 0
-        if heatmap:
-            total_inconnues = 52 - len(ma_main) - len(tableau) - len(exclues)
-            tirages, proba_tirage = Simulateur.analyser_tirages(heatmap, win, total_inconnues)
+        resultat = analyser(data)
+        corps = encoder(resultat, format_, precision)
+        taille = len(corps)
+        corps, encodage = compresser(corps, request.headers.get('Accept-Encoding'))
+    except Exception as e:
+        journaliser_erreur('simulate', erreur=str(e), duree_ms=duree_ms())
+        return jsonify({'success': False, 'error': str(e)})
+    reponse = Response(corps, mimetype=TYPES_MIME[format_])
+    reponse.headers['Vary'] = 'Accept-Encoding'
+    if encodage:
+        reponse.headers['Content-Encoding'] = encodage
+    if tag is not None:
+        reponse.set_etag(tag, weak=True)
+        reponse.headers['Cache-Control'] = 'no-cache'
+    journaliser('simulate', statut=200, format=format_, mode=resultat['mode'], octets=taille, envoyes=len(corps),
+                duree_ms=duree_ms())
+    return reponse
+
+@app.route('/showdown', methods=['POST'])
+def showdown():
+    """Parts de pot de chaque joueur (voir Simulateur.simuler_joueurs).
 
+    Corps : {"joueurs": [["Ah", "Kh"], "QQ+, AKs", "any"], "tableau": [...], "exclues": [...]}.
+    """
+    try:
+        data = request.json
+        joueurs = [j if isinstance(j, str) else string_to_cards(j) for j in data.get('joueurs', [])]
+        if len(joueurs) < 2:
+            raise ValueError("Il faut au moins 2 joueurs")
+        with METRIQUES.requete('showdown'):
+            resultat = Simulateur.simuler_joueurs(joueurs, string_to_cards(data.get('tableau', [])),
+                                                  string_to_cards(data.get('exclues', [])),
+                                                  iterations=min(int(data.get('iterations', ITERATIONS_MAX)), ITERATIONS_MAX))
         return jsonify({
             'success': True,
-            'win': round(win, 2),
-            'tie': round(tie, 2),
-            'loss': round(max(0, 100 - win - tie), 2),
-            'outs': outs,
-            'texture': texture,
-            'heatmap': heatmap,
-            'tirages': tirages,
-            'proba_tirage': proba_tirage,
-            'mains_gagnantes': mains_gagnantes,
-            'mains_absolues': mains_absolues
+            'joueurs': [{cle: round(valeur, 2) for cle, valeur in j.items()} for j in resultat['joueurs']],
+            'iterations': round(resultat['iterations']),
         })
     except Exception as e:
-        print("!!! ERREUR DURANT LA SIMULATION !!!")
-        traceback.print_exc() # Affiche l'erreur complète dans le terminal
+        journaliser_erreur('showdown', erreur=str(e))
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Spots en JSONL, liste JSON ou CSV (Content-Type text/csv) ; voir batch.py.
+
+    Les résultats sortent en JSONL dans l'ordre des spots, au fil du calcul ; ?debut=N
+    saute les N premiers spots (reprise).
+    """
+    texte = request.get_data(as_text=True)
+    debut = request.args.get('debut', 0, type=int)
+    if 'csv' in (request.content_type or ''):
+        spots = lire_entree(io.StringIO(texte), 'csv')
+    elif texte.lstrip().startswith('['):
+        try:
+            spots = iter(json.loads(texte))
+        except json.JSONDecodeError as e:
+            return jsonify({'success': False, 'error': f"Liste JSON invalide : {e}"}), 400
+    else:
+        spots = lire_entree(io.StringIO(texte))
+    spots = islice(spots, debut, None)
+
+    def generer():
+        for i, resultat in enumerate(evaluer_spots(spots, PROCESSUS)):
+            yield json.dumps(dict(resultat, index=debut + i)) + "\n"
+    return Response(generer(), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['POST'])
+def creer_tache():
+    """Même entrée que /simulate ; répond tout de suite avec l'id de la tâche (202)."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': "Le corps doit être un objet JSON"}), 400
+    try:
+        tache = TACHES.soumettre(lambda tache: analyser(data, tache))
+    except FileSaturee as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify({'success': True, 'id': tache.id, 'flux': f"/jobs/{tache.id}/flux"}), 202
+
+@app.route('/jobs/<id_tache>', methods=['GET'])
+def etat_tache(id_tache):
+    tache = TACHES.obtenir(id_tache)
+    if tache is None:
+        return jsonify({'success': False, 'error': "Tâche inconnue"}), 404
+    return jsonify(dict(tache.resume(), success=True))
+
+@app.route('/jobs/<id_tache>', methods=['DELETE'])
+def annuler_tache(id_tache):
+    if not TACHES.annuler(id_tache):
+        return jsonify({'success': False, 'error': "Tâche inconnue"}), 404
+    return jsonify({'success': True})
+
+@app.route('/jobs/<id_tache>/flux')
+def flux_tache(id_tache):
+    """Événements de la tâche en Server-Sent Events ; la déconnexion du client l'annule."""
+    tache = TACHES.obtenir(id_tache)
+    if tache is None:
+        return jsonify({'success': False, 'error': "Tâche inconnue"}), 404
+    try:
+        debut = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        debut = 0
+    return Response(flux_sse(tache, debut), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/sessions/<id_session>', methods=['DELETE'])
+def supprimer_session(id_session):
+    if not SESSIONS.supprimer(id_session):
+        return jsonify({'success': False, 'error': "Session inconnue"}), 404
+    return jsonify({'success': True})
+
+@app.route('/metrics')
+def metriques():
+    """Compteurs, histogrammes de durée et jauges (mémoire, chargement) au format Prometheus (voir metrics.py)."""
+    publier_memoire()
+    return Response(METRIQUES.exposer(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,231 @@
+"""Évaluation en lot de milliers de situations (spots) : fichier ou entrée standard, JSONL ou CSV.
+
+Chaque spot donne la main du héros, le tableau, les cartes exclues, les adversaires (nombre
+ou profils/ranges) et la précision voulue. Les résultats sortent en JSONL dans l'ordre des
+spots. Les spots identiques à une permutation des couleurs près ne sont calculés qu'une fois,
+et les calculs sont répartis, un spot par tâche, sur le pool de process du simulateur.
+
+    python batch.py spots.jsonl -o resultats.jsonl --processus 8 --reprise spots.ckpt
+    cat spots.csv | python batch.py - --format csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import zlib
+from collections import OrderedDict
+
+from cache import SituationCanonique
+from card import CARTES, INDEX_PAR_NOM
+from simulator import Simulateur, pool
+
+# Précision par défaut d'un spot : erreur standard visée (points de %) et plafond d'essais
+ERREUR_CIBLE = 0.25
+ITERATIONS_MAX = 50000
+
+# Spots lus, dédoublonnés et répartis sur le pool à la fois (puis écrits et sauvegardés)
+TAILLE_LOT = 256
+
+# Résultats gardés pour le dédoublonnage entre lots
+TAILLE_MEMOIRE = 100000
+
+# Colonnes du format CSV (profils séparés par '|', les ranges contenant des virgules)
+COLONNES_CSV = ('ma_main', 'tableau', 'exclues', 'profiles', 'adversaires', 'erreur_cible', 'iterations')
+
+
+def lire_cartes(valeur):
+    """'AhKd', 'Ah Kd', 'Ah,Kd' ou ['Ah', 'Kd'] -> liste de Carte."""
+    if not valeur: return []
+    if isinstance(valeur, str):
+        valeur = valeur.replace(',', ' ').split()
+        if len(valeur) == 1 and len(valeur[0]) > 2:
+            valeur = [valeur[0][i:i + 2] for i in range(0, len(valeur[0]), 2)]
+    cartes = []
+    for nom in valeur:
+        nom = nom.strip()
+        if len(nom) != 2 or nom[0].upper() + nom[1].lower() not in INDEX_PAR_NOM:
+            raise ValueError(f"Carte invalide : {nom!r}")
+        cartes.append(CARTES[INDEX_PAR_NOM[nom[0].upper() + nom[1].lower()]])
+    return cartes
+
+
+def lire_spot(donnees, erreur_cible=ERREUR_CIBLE, iterations=ITERATIONS_MAX):
+    """dict d'un spot -> (ma_main, tableau, exclues, profils, options de simuler_detail)."""
+    if 'erreur_lecture' in donnees: raise ValueError(donnees['erreur_lecture'])
+    ma_main = lire_cartes(donnees.get('ma_main'))
+    tableau = lire_cartes(donnees.get('tableau'))
+    exclues = lire_cartes(donnees.get('exclues'))
+    if len(ma_main) != 2: raise ValueError("La main du héros doit contenir 2 cartes")
+    if len(tableau) > 5: raise ValueError("Le tableau contient au plus 5 cartes")
+    toutes = ma_main + tableau + exclues
+    if len(set(toutes)) != len(toutes): raise ValueError("Carte en double")
+
+    profils = donnees.get('profiles')
+    if isinstance(profils, str):
+        profils = [p.strip() for p in profils.split('|')]
+    if not profils:
+        profils = ['any'] * int(donnees.get('adversaires') or 1)
+
+    options = {
+        'erreur_cible': float(erreur_cible if donnees.get('erreur_cible') in (None, '') else donnees['erreur_cible']),
+        'iterations': int(iterations if donnees.get('iterations') in (None, '') else donnees['iterations']),
+    }
+    if options['erreur_cible'] <= 0: raise ValueError("L'erreur cible doit être positive")
+    if options['iterations'] <= 0: raise ValueError("Le nombre d'itérations doit être positif")
+    return ma_main, tableau, exclues, list(profils), options
+
+
+def lire_entree(flux, format_entree='jsonl'):
+    """Générateur des spots (dict) d'un flux texte, lignes vides ignorées.
+
+    Une ligne JSON illisible donne un spot {'erreur_lecture': ...}, qui sortira en erreur à sa place.
+    """
+    if format_entree == 'csv':
+        lignes = (l for l in flux if l.strip())
+        for ligne in csv.DictReader(lignes):
+            yield {k: v for k, v in ligne.items() if k in COLONNES_CSV}
+        return
+    for ligne in flux:
+        if not ligne.strip(): continue
+        try:
+            spot = json.loads(ligne)
+        except ValueError as e:
+            spot = {'erreur_lecture': f"JSON invalide : {e}"}
+        yield spot if isinstance(spot, dict) else {'erreur_lecture': "Un spot doit être un objet JSON"}
+
+
+def evaluer_spots(spots, processus=1, graine=0, erreur_cible=ERREUR_CIBLE, iterations=ITERATIONS_MAX,
+                  taille_lot=TAILLE_LOT):
+    """Générateur des résultats, dans l'ordre des spots.
+
+    Chaque résultat est un dict : win, tie, loss, erreur (IC 95 %), mode, iterations, ou
+    error si le spot est invalide. Un spot est toujours simulé avec la même graine, dérivée
+    de `graine` et de sa forme canonique : le résultat ne dépend ni de sa position dans le
+    lot ni du nombre de process.
+    """
+    memoire = OrderedDict()
+    lot = []
+    for spot in spots:
+        lot.append(spot)
+        if len(lot) >= taille_lot:
+            yield from _evaluer_lot(lot, memoire, processus, graine, erreur_cible, iterations)
+            lot = []
+    if lot:
+        yield from _evaluer_lot(lot, memoire, processus, graine, erreur_cible, iterations)
+
+
+def _evaluer_lot(lot, memoire, processus, graine, erreur_cible, iterations):
+    cles = []
+    a_calculer = {}
+    for spot in lot:
+        try:
+            ma_main, tableau, exclues, profils, options = lire_spot(spot, erreur_cible, iterations)
+            situation = SituationCanonique(ma_main, tableau, exclues, profils)
+            cle = situation.cle('simuler', profils, options)
+        except (ValueError, TypeError, AttributeError) as e:
+            cles.append({'error': str(e)})
+            continue
+        cles.append(cle)
+        if cle not in memoire and cle not in a_calculer:
+            options['graine'] = (graine ^ zlib.crc32(cle.encode())) & 0xFFFFFFFF
+            a_calculer[cle] = (situation.main, situation.tableau, situation.exclues, profils, options)
+
+    if a_calculer:
+        travaux = list(a_calculer.values())
+        if processus > 1:
+            resultats = pool(processus).map(_calculer_spot, travaux, chunksize=max(1, len(travaux) // (4 * processus)))
+        else:
+            resultats = map(_calculer_spot, travaux)
+        for cle, resultat in zip(a_calculer, resultats):
+            memoire[cle] = resultat
+            while len(memoire) > TAILLE_MEMOIRE:
+                memoire.popitem(last=False)
+
+    for cle in cles:
+        if isinstance(cle, dict):
+            yield cle
+        else:
+            memoire.move_to_end(cle)
+            yield memoire[cle]
+
+
+def _calculer_spot(travail):
+    """Point d'entrée d'un process du pool : un spot, en couleurs canoniques."""
+    main, tableau, exclues, profils, options = travail
+    cartes = lambda indices: [CARTES[i] for i in indices]
+    try:
+        res = Simulateur.simuler_detail(cartes(main), cartes(tableau), profils, cartes(exclues), **options)
+    except ValueError as e:
+        return {'error': str(e)}
+    return {
+        'win': round(res['win'], 3),
+        'tie': round(res['tie'], 3),
+        'loss': round(res['loss'], 3),
+        'erreur': round(res['ic95_win'], 3),
+        'mode': res['mode'],
+        'iterations': round(res['iterations']),
+    }
+
+
+def lire_reprise(chemin):
+    """Nombre de spots déjà écrits selon le fichier de reprise (0 s'il n'existe pas)."""
+    try:
+        with open(chemin) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def ecrire_reprise(chemin, position):
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(position))
+    os.replace(tmp, chemin)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Évalue un lot de spots (JSONL ou CSV) et écrit les équités en JSONL.")
+    parser.add_argument("entree", help="fichier de spots, ou - pour l'entrée standard")
+    parser.add_argument("-o", "--sortie", help="fichier JSONL de résultats (sortie standard par défaut)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="format d'entrée (déduit de l'extension sinon)")
+    parser.add_argument("--processus", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--erreur-cible", type=float, default=ERREUR_CIBLE, help="erreur standard visée par défaut (points de %%)")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS_MAX, help="essais maximum par spot par défaut")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--debut", type=int, default=0, help="nombre de spots à sauter")
+    parser.add_argument("--reprise", help="fichier de reprise : position mise à jour après chaque lot, relue au démarrage")
+    args = parser.parse_args(argv)
+
+    format_entree = args.format or ('csv' if args.entree.lower().endswith('.csv') else 'jsonl')
+    debut = max(args.debut, lire_reprise(args.reprise) if args.reprise else 0)
+    entree = sys.stdin if args.entree == '-' else open(args.entree, newline='', encoding='utf-8')
+    # En reprise, on complète le fichier de sortie existant
+    # (le champ index permet d'écarter les doublons si le process a été tué entre deux sauvegardes)
+    sortie = open(args.sortie, 'a' if debut else 'w', encoding='utf-8') if args.sortie else sys.stdout
+
+    spots = lire_entree(entree, format_entree)
+    for _ in range(debut):
+        if next(spots, None) is None: break
+
+    position = debut
+    chrono = time.perf_counter()
+    try:
+        for i, resultat in enumerate(evaluer_spots(spots, args.processus, args.graine, args.erreur_cible, args.iterations)):
+            sortie.write(json.dumps(dict(resultat, index=debut + i)) + "\n")
+            position = debut + i + 1
+            if args.reprise and position % TAILLE_LOT == 0:
+                sortie.flush()
+                ecrire_reprise(args.reprise, position)
+    finally:
+        sortie.flush()
+        if args.reprise:
+            ecrire_reprise(args.reprise, position)
+        duree = time.perf_counter() - chrono
+        print(f"{position - debut} spots en {duree:.1f}s ({(position - debut) / max(duree, 1e-9):.0f} spots/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
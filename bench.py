@@ -0,0 +1,490 @@
+"""Banc d'essai des chemins critiques (évaluateur, simulation, heatmap, outs) et oracle de l'évaluateur.
+
+Les charges utilisent des graines fixes : deux exécutions mesurent exactement le même travail.
+Chaque charge rapporte son débit (mains de 7 cartes évaluées par seconde), la latence p50/p99
+d'un appel et le pic de mémoire alloué (tracemalloc) pendant un appel.
+
+    python bench.py --sortie bench.json                      # mesure et enregistre
+    python bench.py --baseline bench.json --seuil 0.15       # compare, code retour 1 si régression
+    python bench.py --oracle                                 # vérifie les 2 598 960 mains de 5 cartes
+    python bench.py --variance --sans-mesures                # précision des méthodes de réduction de variance
+    python bench.py --equivalences --sans-mesures            # index de river, matrice et sessions contre l'exact
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from itertools import combinations
+
+from card import CARTES, CODES, INDEX_PAR_CODE, masque_cartes
+from evaluator_fast import EvaluateurFast, np
+from matrice import COMBOS, MatriceEquite
+from ranges import Range, range_depuis_texte
+from simulator import Simulateur
+from riviere import IndexRiviere
+from sessions import SessionMain
+from tirages import AnalyseurTirages
+from variance import METHODES
+
+BENCH_VERSION = 1
+GRAINE = 1234
+
+# Nombre de mains de 5 cartes par catégorie (carte haute ... quinte flush), et de valeurs distinctes
+COMPTES_CATEGORIES = [1302540, 1098240, 123552, 54912, 10200, 5108, 3744, 624, 40]
+NB_VALEURS_DISTINCTES = 7462
+
+# Situations de simulation : main du héros et tableau par street
+SITUATIONS = {
+    'preflop': ('Ah Kh', ''),
+    'flop': ('Ah Kh', 'Qh Jd 2c'),
+    'turn': ('Ah Kh', 'Qh Jd 2c 7s'),
+}
+ESSAIS_SIMULATION = 20000
+
+# Situations de référence (énumération exacte possible) pour comparer les méthodes d'échantillonnage
+SITUATIONS_VARIANCE = (('flop', 1), ('turn', 1), ('turn', 2))
+
+# Range adverse des vérifications d'équivalence (matrice et sessions)
+RANGE_EQUIVALENCE = "QQ+, AKs, AQo, T9s-65s, A5s-A2s"
+# Écart toléré entre deux résultats exacts (arrondis flottants ; la matrice est en float32)
+TOLERANCE = 1e-6
+TOLERANCE_MATRICE = 1e-5
+
+
+def _cartes(texte):
+    noms = {repr(c): c for c in CARTES}
+    return [noms[n] for n in texte.split()]
+
+
+def _mains_aleatoires(nb, taille, graine=GRAINE):
+    rng = random.Random(graine)
+    return [rng.sample(CODES, taille) for _ in range(nb)]
+
+
+def charges(rapide=False):
+    """Liste de (nom, appel, mains évaluées par appel, répétitions)."""
+    facteur = 5 if rapide else 1
+    resultat = []
+
+    mains_7 = _mains_aleatoires(10000, 7)
+    mains_5 = _mains_aleatoires(10000, 5)
+    cartes_7 = [[CARTES[INDEX_PAR_CODE[c]] for c in main] for main in mains_7[:2000]]
+
+    def boucle(fonction, mains):
+        def appel():
+            for main in mains: fonction(main)
+        return appel
+
+    resultat.append(('evaluer_7_ints', boucle(EvaluateurFast.evaluer_7_ints, mains_7), len(mains_7), 30 // facteur))
+    resultat.append(('evaluer_7_cartes', boucle(EvaluateurFast.evaluer_7_cartes, cartes_7), len(cartes_7), 30 // facteur))
+    resultat.append(('evaluer_5_ints', boucle(EvaluateurFast.evaluer_5_ints, mains_5), len(mains_5), 30 // facteur))
+    if np is not None:
+        lot = np.array(_mains_aleatoires(100000, 7), dtype=np.int64)
+        resultat.append(('evaluer_batch', lambda: EvaluateurFast.evaluer_batch(lot), len(lot), 30 // facteur))
+
+    for street, (main, tableau) in SITUATIONS.items():
+        for nb_adv in (1, 3, 8):
+            args = (_cartes(main), _cartes(tableau), ['any'] * nb_adv)
+            appel = (lambda a=args: Simulateur.simuler_detail(*a, iterations=ESSAIS_SIMULATION, budget_exact=0,
+                                                              graine=GRAINE, utiliser_tables=False))
+            resultat.append((f'simuler_{street}_{nb_adv}adv', appel, ESSAIS_SIMULATION * (nb_adv + 1), 10 // facteur))
+    if np is not None:
+        args = (_cartes(SITUATIONS['flop'][0]), _cartes(SITUATIONS['flop'][1]), ['any'] * 3)
+        for methode in METHODES:
+            appel = (lambda a=args, m=methode: Simulateur.simuler_detail(*a, iterations=ESSAIS_SIMULATION, budget_exact=0,
+                                                                         graine=GRAINE, methode=m))
+            resultat.append((f'simuler_flop_3adv_{methode}', appel, ESSAIS_SIMULATION * 4, 10 // facteur))
+
+    # Index des tableaux de river, construit pour les rivers du tableau du turn seulement
+    if np is not None:
+        chemin = os.path.join(tempfile.mkdtemp(), "river_index.bin")
+        main, tableau = (_cartes(t) for t in SITUATIONS['turn'])
+        IndexRiviere.construire(chemin, tableaux=[[c.index for c in tableau]], verbeux=False)
+        for nb_adv in (1, 2):
+            args = ([c.index for c in main], [c.index for c in tableau], [], nb_adv)
+            resultat.append((f'index_turn_{nb_adv}adv', lambda a=args: IndexRiviere.compteurs(*a, chemin=chemin),
+                             0, 200 // facteur))
+
+    # Showdown à 9 joueurs : parts de pot de chacun
+    joueurs = [_cartes('Ah Kh'), _cartes('Qs Qd')] + ['any'] * 7
+    resultat.append(('showdown_flop_9joueurs', lambda: Simulateur.simuler_joueurs(
+        joueurs, _cartes('Qh Jd 2c'), iterations=ESSAIS_SIMULATION, graine=GRAINE), ESSAIS_SIMULATION * 9, 10 // facteur))
+
+    for street in ('flop', 'turn'):
+        main, tableau = SITUATIONS[street]
+        for nb_adv in (1, 3):
+            args = (_cartes(main), _cartes(tableau), [], ['any'] * nb_adv)
+            resultat.append((f'heatmap_{street}_{nb_adv}adv', lambda a=args: Simulateur.calculer_heatmap(*a, graine=GRAINE),
+                             0, 10 // facteur))
+        args = (_cartes(main), _cartes(tableau), [])
+        resultat.append((f'outs_{street}', lambda a=args: Simulateur.calculer_outs(*a), 52 - 2 - len(args[1]), 200 // facteur))
+        args = (_cartes(main), _cartes(tableau), [], ['any'])
+        resultat.append((f'tirages_{street}', lambda a=args: AnalyseurTirages.analyser(*a), 0, 10 // facteur))
+    return resultat
+
+
+def mesurer(appel, mains, repetitions):
+    """Débit, latences et pic de mémoire d'un appel (après un appel de chauffe)."""
+    appel()
+    durees = []
+    for _ in range(max(1, repetitions)):
+        debut = time.perf_counter()
+        appel()
+        durees.append(time.perf_counter() - debut)
+
+    tracemalloc.start()
+    appel()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durees.sort()
+    centile = lambda p: durees[min(len(durees) - 1, int(p * len(durees)))]
+    return {
+        'mains_par_s': round(mains * len(durees) / sum(durees)) if mains else None,
+        'p50_ms': round(centile(0.50) * 1000, 3),
+        'p99_ms': round(centile(0.99) * 1000, 3),
+        'memoire_pic_ko': round(pic / 1024, 1),
+        'repetitions': len(durees),
+    }
+
+
+def executer(filtre=None, rapide=False, verbeux=True):
+    resultats = {}
+    for nom, appel, mains, repetitions in charges(rapide):
+        if filtre and filtre not in nom: continue
+        resultats[nom] = mesurer(appel, mains, repetitions)
+        if verbeux:
+            r = resultats[nom]
+            debit = f"{r['mains_par_s']:>12,} mains/s" if r['mains_par_s'] else " " * 20
+            print(f"{nom:<26}{debit}  p50 {r['p50_ms']:>9.3f} ms  p99 {r['p99_ms']:>9.3f} ms  "
+                  f"pic {r['memoire_pic_ko']:>9.1f} Ko", file=sys.stderr)
+    return {
+        'version': BENCH_VERSION,
+        'python': platform.python_version(),
+        'numpy': np.__version__ if np is not None else None,
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'charges': resultats,
+    }
+
+
+def comparer(mesure, baseline, seuil):
+    """Liste des régressions : débit plus bas ou latence p50 plus haute de plus de `seuil` (fraction)."""
+    regressions = []
+    for nom, r in mesure['charges'].items():
+        base = baseline.get('charges', {}).get(nom)
+        if base is None: continue
+        if r['mains_par_s'] and base.get('mains_par_s') and r['mains_par_s'] < base['mains_par_s'] * (1 - seuil):
+            regressions.append(f"{nom} : débit {r['mains_par_s']:,} mains/s contre {base['mains_par_s']:,}")
+        if base.get('p50_ms') and r['p50_ms'] > base['p50_ms'] * (1 + seuil):
+            regressions.append(f"{nom} : p50 {r['p50_ms']} ms contre {base['p50_ms']} ms")
+    return regressions
+
+
+def cle_reference(cartes):
+    """Rang d'une main de 5 cartes (index 0-51) par une méthode indépendante des tables.
+
+    Retourne (catégorie 0-8, rangs départageants) : deux mains se comparent par ce tuple.
+    """
+    rangs = [c >> 2 for c in cartes]
+    couleur = len({c & 3 for c in cartes}) == 1
+    groupes = sorted(Counter(rangs).items(), key=lambda g: (g[1], g[0]), reverse=True)
+    formes = tuple(n for _, n in groupes)
+    ordre = tuple(r for r, _ in groupes)
+    quinte = None
+    if len(groupes) == 5:
+        if ordre[0] - ordre[4] == 4: quinte = ordre[0]
+        elif ordre == (12, 3, 2, 1, 0): quinte = 3  # A-2-3-4-5 : quinte au 5
+
+    if quinte is not None and couleur: return 8, (quinte,)
+    if formes == (4, 1): return 7, ordre
+    if formes == (3, 2): return 6, ordre
+    if couleur: return 5, ordre
+    if quinte is not None: return 4, (quinte,)
+    if formes == (3, 1, 1): return 3, ordre
+    if formes == (2, 2, 1): return 2, ordre
+    if formes == (2, 1, 1, 1): return 1, ordre
+    return 0, ordre
+
+
+def oracle(verbeux=True):
+    """Vérifie l'évaluateur sur les 2 598 960 mains de 5 cartes.
+
+    Pour chaque main : le lookup (evaluer_7_ints) égale evaluer_5_ints, et la catégorie égale
+    celle de cle_reference. Sur l'ensemble : les comptes par catégorie sont les comptes connus,
+    et l'ordre des scores est exactement celui des clés de référence (7 462 valeurs distinctes).
+    Retourne la liste des erreurs (vide si tout est correct).
+    """
+    erreurs = []
+    comptes = [0] * 9
+    par_score = {}
+    memo = {}
+    debut = time.perf_counter()
+    evaluer = EvaluateurFast.evaluer_7_ints
+    for n, main in enumerate(combinations(range(52), 5)):
+        codes = [CODES[i] for i in main]
+        score = evaluer(codes)
+        score_5, type_5 = EvaluateurFast.evaluer_5_ints(codes)
+        if score != (type_5 << 24) | score_5 and len(erreurs) < 20:
+            erreurs.append(f"{main} : lookup {score} != evaluer_5_ints {(type_5 << 24) | score_5}")
+
+        # La clé de référence ne dépend que des rangs et de la couleur unique
+        signature = (tuple(sorted(i >> 2 for i in main)), len({i & 3 for i in main}) == 1)
+        cle = memo.get(signature)
+        if cle is None:
+            cle = memo[signature] = cle_reference(main)
+        comptes[cle[0]] += 1
+        if score >> 24 != cle[0] and len(erreurs) < 20:
+            erreurs.append(f"{main} : catégorie {score >> 24} au lieu de {cle[0]}")
+        if par_score.setdefault(score, cle) != cle and len(erreurs) < 20:
+            erreurs.append(f"{main} : score {score} partagé par {cle} et {par_score[score]}")
+        if verbeux and n % 500000 == 0 and n:
+            print(f"  {n:,} mains ({time.perf_counter() - debut:.0f}s)", file=sys.stderr)
+
+    if comptes != COMPTES_CATEGORIES:
+        erreurs.append(f"comptes par catégorie {comptes} au lieu de {COMPTES_CATEGORIES}")
+    if len(par_score) != NB_VALEURS_DISTINCTES:
+        erreurs.append(f"{len(par_score)} valeurs distinctes au lieu de {NB_VALEURS_DISTINCTES}")
+    cles = [par_score[s] for s in sorted(par_score)]
+    if any(a >= b for a, b in zip(cles, cles[1:])):
+        erreurs.append("l'ordre des scores diffère de l'ordre de référence")
+    if verbeux:
+        print(f"oracle : {sum(comptes):,} mains en {time.perf_counter() - debut:.0f}s, "
+              f"{len(erreurs)} erreur(s)", file=sys.stderr)
+    return erreurs
+
+
+def precision_variance(repetitions=100, essais=4096, verbeux=True):
+    """Compare chaque méthode d'échantillonnage à l'énumération exacte sur SITUATIONS_VARIANCE.
+
+    Chaque méthode est jouée `repetitions` fois (graines 0, 1, ...) avec `essais` essais.
+    La taille effective empirique est p(1-p) / erreur quadratique moyenne : le nombre d'essais
+    Monte Carlo standard de même précision. La taille rapportée vient de la variance moyenne
+    estimée par la méthode. Retourne {situation: {methode: mesures}}.
+    """
+    resultats = {}
+    for street, nb_adv in SITUATIONS_VARIANCE:
+        main, tableau = SITUATIONS[street]
+        args = (_cartes(main), _cartes(tableau), ['any'] * nb_adv)
+        exact = Simulateur.simuler_detail(*args, budget_exact=10 ** 9)['win']
+        nom = f'{street}_{nb_adv}adv'
+        resultats[nom] = {}
+        for methode in ('standard',) + tuple(METHODES):
+            debut = time.perf_counter()
+            res = [Simulateur.simuler_detail(*args, iterations=essais, budget_exact=0, graine=g, methode=methode)
+                   for g in range(repetitions)]
+            duree = (time.perf_counter() - debut) / repetitions
+            wins = [r['win'] for r in res]
+            eqm = sum((w - exact) ** 2 for w in wins) / repetitions
+            variance = sum(r['erreur_win'] ** 2 for r in res) / repetitions
+            r = resultats[nom][methode] = {
+                'biais': round(sum(wins) / repetitions - exact, 4),
+                'rmse': round(eqm ** 0.5, 4),
+                'taille_effective': round(exact * (100 - exact) / eqm) if eqm else None,
+                'taille_rapportee': round(exact * (100 - exact) / variance) if variance else None,
+                'ms': round(duree * 1000, 2),
+            }
+            if verbeux:
+                print(f"{nom:<12}{methode:<14}exact {exact:6.2f}  biais {r['biais']:+.3f}  rmse {r['rmse']:.3f}  "
+                      f"taille effective {r['taille_effective'] or 0:>7,} (rapportée {r['taille_rapportee'] or 0:>7,}) "
+                      f"pour {essais:,} essais  {r['ms']:.1f} ms", file=sys.stderr)
+    return resultats
+
+
+def _situation_exacte(main, tableau, exclues, nb_adv):
+    """Situation de Simulateur._simuler_exact pour des index de cartes et nb_adv adversaires aléatoires."""
+    cartes = lambda indices: [CARTES[i] for i in indices]
+    restantes = Simulateur._cartes_vivantes(masque_cartes(cartes(list(main) + list(tableau) + list(exclues))))
+    return Simulateur._situation(cartes(main), cartes(tableau), restantes, ['any'] * nb_adv)[:4]
+
+
+def _equite_directe(main, tableau, exclues, adversaires):
+    """Équité (fraction) du héros contre un adversaire, par énumération directe des fins de tableau
+    et des mains adverses `adversaires` ({(carte1, carte2): poids}) compatibles."""
+    connues = set(main) | set(tableau) | set(exclues)
+    restantes = [c for c in range(52) if c not in connues]
+    gains = total = 0.0
+    for fin in combinations(restantes, 5 - len(tableau)):
+        final = [CODES[c] for c in list(tableau) + list(fin)]
+        mon_score = EvaluateurFast.evaluer_7_ints(final + [CODES[c] for c in main])
+        for (i, j), poids in adversaires.items():
+            if i in connues or j in connues or i in fin or j in fin: continue
+            score = EvaluateurFast.evaluer_7_ints(final + [CODES[i], CODES[j]])
+            gains += poids * (1.0 if mon_score > score else 0.5 if mon_score == score else 0.0)
+            total += poids
+    return gains / total if total else float('nan')
+
+
+def _poids_adversaire(profil):
+    """{(carte1, carte2): poids} du profil adverse ('any' ou range texte)."""
+    if Range.est_aleatoire(profil):
+        return dict.fromkeys(COMBOS, 1.0)
+    r = range_depuis_texte(profil)
+    return dict(zip(r.combos, r.poids))
+
+
+def _ecarts(nom, obtenu, attendu, tolerance=TOLERANCE):
+    """Messages d'erreur si les deux suites de nombres diffèrent de plus de `tolerance` (relative)."""
+    obtenu, attendu = list(obtenu), list(attendu)
+    if len(obtenu) != len(attendu):
+        return [f"{nom} : {len(obtenu)} valeurs au lieu de {len(attendu)}"]
+    if any(abs(a - b) > tolerance * max(1.0, abs(b)) or (a != a) != (b != b) for a, b in zip(obtenu, attendu)):
+        return [f"{nom} : {obtenu} au lieu de {attendu}"]
+    return []
+
+
+def equivalences(echantillons=100, verbeux=True):
+    """Vérifie les moteurs qui remplacent l'énumération exacte de Simulateur, sur des situations tirées
+    au hasard (graine fixe) :
+
+        index      IndexRiviere.compteurs contre _simuler_exact, au turn et à la river, 1 ou 2
+                   adversaires, 0 à 3 cartes exclues (index temporaire construit pour ces tableaux) ;
+        matrice    MatriceEquite.calculer (paires de combos) et contre_range (aléatoire et range)
+                   contre l'énumération directe, au turn et à la river ;
+        sessions   équité et heatmap d'une session flop -> turn -> river contre simuler_detail exact
+                   à chaque tour (1 ou 2 adversaires aléatoires), et turn -> river contre une range.
+
+    `echantillons` situations pour l'index, un dixième pour les sessions et un vingtième des
+    tableaux pour la matrice. Retourne la liste des écarts (vide si tout concorde).
+    """
+    if np is None:
+        raise RuntimeError("Les vérifications d'équivalence nécessitent NumPy")
+    rng = random.Random(GRAINE)
+    erreurs = []
+    nom_spot = lambda main, tableau, exclues: (" ".join(repr(CARTES[i]) for i in main) + " | "
+                                               + " ".join(repr(CARTES[i]) for i in tableau)
+                                               + (" | mortes " + " ".join(repr(CARTES[i]) for i in exclues)
+                                                  if exclues else ""))
+
+    # Index des tableaux de river
+    debut = time.perf_counter()
+    spots = []
+    for _ in range(echantillons):
+        cartes = rng.sample(range(52), 10)
+        taille = rng.choice((4, 5))
+        spots.append((cartes[:2], cartes[2:2 + taille], cartes[7:7 + rng.randint(0, 3)], rng.choice((1, 2))))
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "river_index.bin")
+        IndexRiviere.construire(chemin, tableaux=[tableau for _, tableau, _, _ in spots], verbeux=False)
+        for main, tableau, exclues, nb_adv in spots:
+            obtenu = IndexRiviere.compteurs(main, tableau, exclues, nb_adv, chemin)
+            attendu = Simulateur._simuler_exact(*_situation_exacte(main, tableau, exclues, nb_adv))
+            nom = f"index {nom_spot(main, tableau, exclues)} contre {nb_adv}"
+            if obtenu is None:
+                erreurs.append(f"{nom} : tableau absent de l'index")
+                continue
+            erreurs += _ecarts(nom, [obtenu[0], obtenu[1], *obtenu[2], *obtenu[3]],
+                               [attendu[0], attendu[1], *attendu[2], *attendu[3]])
+        IndexRiviere._OUVERTS.pop(chemin, None)
+    if verbeux:
+        print(f"index : {len(spots)} situations en {time.perf_counter() - debut:.1f}s", file=sys.stderr)
+
+    # Matrice d'équités
+    debut = time.perf_counter()
+    nb_tableaux = max(2, echantillons // 20)
+    for k in range(nb_tableaux):
+        cartes = rng.sample(range(52), 7)
+        tableau, exclues = cartes[:4 + k % 2], cartes[5:5 + rng.randint(0, 2)]
+        connues = set(tableau) | set(exclues)
+        vivants = [k for k, (i, j) in enumerate(COMBOS) if i not in connues and j not in connues]
+        matrice = MatriceEquite.calculer([CARTES[i] for i in tableau], [CARTES[i] for i in exclues])
+        for _ in range(10):
+            a, b = rng.sample(vivants, 2)
+            attendu = (float('nan') if set(COMBOS[a]) & set(COMBOS[b])
+                       else _equite_directe(COMBOS[a], tableau, exclues, {COMBOS[b]: 1.0}))
+            erreurs += _ecarts(f"matrice {nom_spot(COMBOS[a], tableau, exclues)} contre {MatriceEquite.nom_combo(b)}",
+                               [float(matrice[a, b])], [attendu], TOLERANCE_MATRICE)
+        for profil in ('any', RANGE_EQUIVALENCE):
+            equites = MatriceEquite.contre_range([CARTES[i] for i in tableau], profil, [CARTES[i] for i in exclues])
+            adversaires = _poids_adversaire(profil)
+            for a in rng.sample(vivants, 5):
+                erreurs += _ecarts(f"contre_range {nom_spot(COMBOS[a], tableau, exclues)} contre {profil!r}",
+                                   [float(equites[a])], [_equite_directe(COMBOS[a], tableau, exclues, adversaires)])
+    if verbeux:
+        print(f"matrice : {nb_tableaux} tableaux en {time.perf_counter() - debut:.1f}s", file=sys.stderr)
+
+    # Sessions de main
+    debut = time.perf_counter()
+    nb_sessions = max(3, echantillons // 10)
+    for k in range(nb_sessions):
+        cartes = rng.sample(range(52), 9)
+        main, tableau, exclues = cartes[:2], cartes[2:7], cartes[7:7 + rng.randint(0, 2)]
+        profils = [RANGE_EQUIVALENCE] if k % 3 == 2 else ['any'] * (1 + k % 2)
+        en_cartes = lambda indices: [CARTES[i] for i in indices]
+        session = SessionMain()
+        for n in ((4, 5) if profils == [RANGE_EQUIVALENCE] else (3, 4, 5)):
+            nom = f"session {nom_spot(main, tableau[:n], exclues)} contre {profils}"
+            _, equite, heatmap = session.analyser(en_cartes(main), en_cartes(tableau[:n]), en_cartes(exclues), profils)
+            if equite is None:
+                erreurs.append(f"{nom} : pas de réponse exacte")
+                continue
+
+            def reference(tableau_final):
+                if profils == [RANGE_EQUIVALENCE]:
+                    return 100 * _equite_directe(main, tableau_final, exclues, _poids_adversaire(RANGE_EQUIVALENCE))
+                res = Simulateur.simuler_detail(en_cartes(main), en_cartes(tableau_final), profils, en_cartes(exclues),
+                                                budget_exact=10 ** 9, utiliser_tables=False)
+                return res['win'] + res['tie'] / 2
+
+            erreurs += _ecarts(nom, [equite['win'] + equite['tie'] / 2], [reference(tableau[:n])])
+            if n < 5:
+                suivantes = rng.sample(sorted(heatmap), 3)
+                noms = {repr(c): c.index for c in CARTES}
+                erreurs += _ecarts(f"{nom}, heatmap {suivantes}", [heatmap[c] for c in suivantes],
+                                   [reference(tableau[:n] + [noms[c]]) for c in suivantes])
+    if verbeux:
+        print(f"sessions : {nb_sessions} mains en {time.perf_counter() - debut:.1f}s, "
+              f"{len(erreurs)} écart(s) au total", file=sys.stderr)
+    return erreurs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai et oracle de l'évaluateur.")
+    parser.add_argument("--sortie", help="fichier JSON des mesures")
+    parser.add_argument("--baseline", help="fichier JSON de référence à comparer")
+    parser.add_argument("--seuil", type=float, default=0.15, help="régression tolérée (fraction, défaut 0.15)")
+    parser.add_argument("--filtre", help="ne mesurer que les charges dont le nom contient ce texte")
+    parser.add_argument("--rapide", action="store_true", help="moins de répétitions")
+    parser.add_argument("--oracle", action="store_true", help="vérifier les 2 598 960 mains de 5 cartes")
+    parser.add_argument("--variance", action="store_true",
+                        help="comparer les méthodes de réduction de variance à l'énumération exacte")
+    parser.add_argument("--equivalences", type=int, nargs="?", const=100, metavar="N",
+                        help="vérifier index de river, matrice et sessions contre l'exact sur N situations (100)")
+    parser.add_argument("--sans-mesures", action="store_true",
+                        help="n'exécuter que l'oracle, --variance et --equivalences")
+    args = parser.parse_args(argv)
+
+    code = 0
+    if args.oracle:
+        erreurs = oracle()
+        for e in erreurs: print(f"ERREUR {e}", file=sys.stderr)
+        if erreurs: code = 1
+    if args.variance and np is not None:
+        precision_variance()
+    if args.equivalences and np is not None:
+        erreurs = equivalences(args.equivalences)
+        for e in erreurs: print(f"ÉCART {e}", file=sys.stderr)
+        if erreurs: code = 1
+    if args.sans_mesures:
+        return code
+
+    mesure = executer(args.filtre, args.rapide)
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump(mesure, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = comparer(mesure, json.load(f), args.seuil)
+        for r in regressions: print(f"RÉGRESSION {r}", file=sys.stderr)
+        if regressions: code = 1
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import permutations
+
+from card import CARTES, INDEX_PAR_NOM, NOMS
+from metrics import METRIQUES
+from ranges import Range
+from simulator import Simulateur
+from tirages import AnalyseurTirages
+
+# Les 24 permutations des couleurs : PERMUTATIONS[k][s] = nouvelle couleur de la couleur s
+PERMUTATIONS = tuple(permutations(range(4)))
+
+
+def _permuter(index, perm):
+    return (index & ~3) | perm[index & 3]
+
+
+class SituationCanonique:
+    """Situation ramenée à sa forme canonique par isomorphisme de couleurs.
+
+    AhKh sur 2c7d9s et AsKs sur 2d7h9c donnent la même forme canonique : on retient, parmi les
+    24 permutations des couleurs, celle qui donne les index (main, tableau, exclues) triés les
+    plus petits. `vers_original` ramène une carte canonique dans les couleurs de la requête.
+    Si un profil adverse cite des combos précis (AhKh), la situation n'est pas invariante par
+    permutation des couleurs : elle est gardée telle quelle.
+    """
+
+    __slots__ = ('main', 'tableau', 'exclues', 'perm', 'inverse')
+
+    def __init__(self, ma_main, tableau, cartes_exclues, profils=()):
+        groupes = [[c.index for c in ma_main], [c.index for c in tableau], [c.index for c in cartes_exclues]]
+        symetrique = all(Range.est_symetrique(p) for p in profils)
+        meilleure = None
+        for perm in (PERMUTATIONS if symetrique else PERMUTATIONS[:1]):
+            forme = tuple(tuple(sorted(_permuter(i, perm) for i in g)) for g in groupes)
+            if meilleure is None or forme < meilleure[0]:
+                meilleure = (forme, perm)
+        (self.main, self.tableau, self.exclues), self.perm = meilleure
+        self.inverse = tuple(self.perm.index(s) for s in range(4))
+
+    def cartes(self, indices):
+        return [CARTES[i] for i in indices]
+
+    def vers_original(self, nom):
+        return NOMS[_permuter(INDEX_PAR_NOM[nom], self.inverse)]
+
+    def cle(self, fonction, *parametres):
+        noms = lambda indices: ''.join(NOMS[i] for i in indices)
+        return '|'.join([fonction, noms(self.main), noms(self.tableau), noms(self.exclues)] +
+                        [json.dumps(p, sort_keys=True) for p in parametres])
+
+
+class CacheEquite:
+    """Cache devant Simulateur.simuler, simuler_detail, calculer_outs, calculer_heatmap et l'analyse des tirages.
+
+    Les situations identiques à une permutation des couleurs près partagent la même entrée.
+    Les résultats sont gardés dans un LRU en mémoire de `taille_max` entrées et, si `chemin`
+    est donné, dans une base SQLite qui survit aux redémarrages. Les calculs sont faits dans
+    les couleurs canoniques ; outs, heatmap et tirages sont ramenés dans les couleurs de la requête.
+    """
+
+    def __init__(self, taille_max=10000, chemin=None):
+        self.taille_max = taille_max
+        self.lru = OrderedDict()
+        self.verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if chemin:
+            self.db = sqlite3.connect(chemin, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS equites (cle TEXT PRIMARY KEY, valeur TEXT)")
+            self.db.commit()
+
+    def simuler(self, ma_main, tableau, profils, cartes_exclues=None, **options):
+        detail = self.simuler_detail(ma_main, tableau, profils, cartes_exclues, **options)
+        return detail['win'], detail['tie'], {}, detail['repartition']
+
+    def simuler_detail(self, ma_main, tableau, profils, cartes_exclues=None, rappel=None, **options):
+        """Voir Simulateur.simuler_detail ; `rappel` (résultats partiels) ne sert qu'en cas de calcul."""
+        situation = SituationCanonique(ma_main, tableau, cartes_exclues or [], profils)
+        cle = situation.cle('simuler', list(profils), options)
+        return dict(self._obtenir(cle, lambda: Simulateur.simuler_detail(
+            situation.cartes(situation.main), situation.cartes(situation.tableau), profils,
+            situation.cartes(situation.exclues), rappel=rappel, **options),
+            garder=lambda resultat: self._precision_atteinte(resultat, options)))
+
+    def calculer_outs(self, ma_main, tableau, cartes_exclues):
+        situation = SituationCanonique(ma_main, tableau, cartes_exclues)
+        cle = situation.cle('outs')
+        outs = self._obtenir(cle, lambda: [repr(c) for c in Simulateur.calculer_outs(
+            situation.cartes(situation.main), situation.cartes(situation.tableau),
+            situation.cartes(situation.exclues))])
+        return [CARTES[INDEX_PAR_NOM[situation.vers_original(nom)]] for nom in outs]
+
+    def calculer_heatmap(self, ma_main, tableau, cartes_exclues, profils, rappel=None, **options):
+        situation = SituationCanonique(ma_main, tableau, cartes_exclues, profils)
+        cle = situation.cle('heatmap', list(profils), options)
+        vers_original = lambda heatmap: {situation.vers_original(nom): eq for nom, eq in heatmap.items()}
+        partiel = (lambda heatmap: rappel(vers_original(heatmap))) if rappel is not None else None
+        heatmap = self._obtenir(cle, lambda: Simulateur.calculer_heatmap(
+            situation.cartes(situation.main), situation.cartes(situation.tableau),
+            situation.cartes(situation.exclues), profils, rappel=partiel, **options))
+        return vers_original(heatmap)
+
+    def analyser_tirages(self, ma_main, tableau, cartes_exclues, profils):
+        """Voir tirages.AnalyseurTirages.analyser."""
+        situation = SituationCanonique(ma_main, tableau, cartes_exclues, profils)
+        cle = situation.cle('tirages', list(profils))
+        analyse = self._obtenir(cle, lambda: AnalyseurTirages.analyser(
+            situation.cartes(situation.main), situation.cartes(situation.tableau),
+            situation.cartes(situation.exclues), profils))
+        if not analyse: return analyse
+        vers_original = lambda noms: sorted((situation.vers_original(n) for n in noms), key=INDEX_PAR_NOM.get)
+        return dict(analyse,
+                    cartes={situation.vers_original(nom): info for nom, info in analyse['cartes'].items()},
+                    outs={classe: vers_original(noms) for classe, noms in analyse['outs'].items()})
+
+    @staticmethod
+    def _precision_atteinte(resultat, options):
+        """Faux pour un résultat adaptatif arrêté par le budget de temps avant l'erreur cible et le
+        plafond d'essais : il dépend de la charge de la machine et n'est pas gardé."""
+        if resultat['mode'] != 'adaptatif' or not options.get('budget_temps'): return True
+        erreur_cible = options.get('erreur_cible')
+        if erreur_cible and max(resultat['erreur_win'], resultat['erreur_tie']) <= erreur_cible: return True
+        return resultat['iterations'] >= options.get('iterations', 10000)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'taille': len(self.lru)}
+
+    def _obtenir(self, cle, calcul, garder=None):
+        """Valeur gardée pour `cle`, sinon calcul() ; gardée à son tour sauf si garder(valeur) est faux."""
+        with self.verrou:
+            if cle in self.lru:
+                self.lru.move_to_end(cle)
+                self.hits += 1
+                METRIQUES.compter('cache_hits')
+                return self.lru[cle]
+            if self.db is not None:
+                ligne = self.db.execute("SELECT valeur FROM equites WHERE cle = ?", (cle,)).fetchone()
+                if ligne is not None:
+                    self.hits += 1
+                    METRIQUES.compter('cache_hits')
+                    valeur = json.loads(ligne[0])
+                    self._memoriser(cle, valeur)
+                    return valeur
+            self.misses += 1
+            METRIQUES.compter('cache_misses')
+
+        # Calcul hors verrou : deux requêtes identiques simultanées peuvent calculer deux fois
+        valeur = calcul()
+        if garder is not None and not garder(valeur):
+            return valeur
+        with self.verrou:
+            self._memoriser(cle, valeur)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO equites (cle, valeur) VALUES (?, ?)", (cle, json.dumps(valeur)))
+                self.db.commit()
+        return valeur
+
+    def _memoriser(self, cle, valeur):
+        self.lru[cle] = valeur
+        self.lru.move_to_end(cle)
+        while len(self.lru) > self.taille_max:
+            self.lru.popitem(last=False)
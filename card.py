@@ -19,26 +19,29 @@ class Carte:
         's': 'Pique', 'h': 'Cœur', 'd': 'Carreau', 'c': 'Trèfle'
     }
 
+    __slots__ = ('valeur', 'couleur', 'rang', 'index', 'bit_value')
+
     def __init__(self, valeur, couleur):
         if valeur not in self.VALEURS or couleur not in self.COULEURS:
             raise ValueError(f"Carte invalide : {valeur}{couleur}")
+        # Vue sur le modèle entier : toutes les données viennent des tables pré-calculées
+        index = self.VALEURS.index(valeur) * 4 + self.COULEURS.index(couleur)
         self.valeur = valeur
         self.couleur = couleur
-        self.rang = self.VALEURS.index(valeur)
-        
-        # Encodage binaire pour l'optimisation
-        # Format (32 bits) : xxxxyyyy zzzzAAAA BBBBCCCC DDDDEEEE
-        # EEEE (4 bits) : Nombre premier du rang (table PRIMES)
-        # CCCC (4 bits) : Rang (0-12)
-        # BBBB (4 bits) : Masque de couleur (1, 2, 4, 8)
-        # AAAA (13 bits): Masque de rang (1 << rang)
-        
-        prime = self.PRIMES[self.rang]
-        rank_shift = self.rang << 8
-        suit_shift = (1 << self.COULEURS.index(couleur)) << 12
-        rank_mask = (1 << self.rang) << 16
-        
-        self.bit_value = prime | rank_shift | suit_shift | rank_mask
+        self.rang = index >> 2
+        self.index = index
+        self.bit_value = CODES[index]
+
+    @staticmethod
+    def depuis_index(index):
+        """Carte (partagée, ne pas modifier) correspondant à l'index 0-51."""
+        return CARTES[index]
+
+    def __eq__(self, autre):
+        return isinstance(autre, Carte) and self.index == autre.index
+
+    def __hash__(self):
+        return self.index
 
     def __repr__(self):
         return f"{self.valeur}{self.couleur}"
@@ -47,10 +50,10 @@ class Carte:
         return f"{self.NOM_VALEURS[self.valeur]} de {self.NOM_COULEURS[self.couleur]}"
 
 class Paquet:
-    """Représente un paquet de 52 cartes."""
+    """Représente un paquet de 52 cartes (vue sur les cartes partagées de CARTES)."""
     
     def __init__(self):
-        self.cartes = [Carte(v, c) for v in Carte.VALEURS for c in Carte.COULEURS]
+        self.cartes = list(CARTES)
         self.melanger()
 
     def melanger(self):
@@ -63,5 +66,81 @@ class Paquet:
 
     def retirer_cartes(self, cartes_a_retirer):
         """Retire des cartes spécifiques du paquet (pour les mains connues)."""
-        str_cartes = [str(c) for c in cartes_a_retirer]
-        self.cartes = [c for c in self.cartes if str(c) not in str_cartes]
+        masque = masque_cartes(cartes_a_retirer)
+        self.cartes = [c for c in self.cartes if not (masque >> c.index) & 1]
+
+
+class Echantillonneur:
+    """Tire des cartes sans remise parmi les cartes vivantes, sans allocation par tirage.
+
+    Les cartes vivantes (codes bit_value) sont copiées une fois dans `cartes` ; chaque tirage
+    est un Fisher-Yates partiel en place : après melanger_partiel(k), cartes[0:k] est un
+    échantillon uniforme de k cartes.
+    """
+
+    __slots__ = ('cartes', 'n', 'rng')
+
+    def __init__(self, masque_mortes=0, rng=None):
+        self.cartes = [CODES[i] for i in range(52) if not (masque_mortes >> i) & 1]
+        self.n = len(self.cartes)
+        self.rng = rng if rng is not None else random.Random()
+
+    def melanger_partiel(self, k):
+        cartes = self.cartes
+        n = self.n
+        alea = self.rng.random
+        for i in range(k):
+            j = i + int(alea() * (n - i))
+            cartes[i], cartes[j] = cartes[j], cartes[i]
+
+    def exclure(self, codes):
+        """Retire temporairement des cartes du tirage (déplacées après la zone active)."""
+        cartes = self.cartes
+        for code in codes:
+            i = cartes.index(code, 0, self.n)
+            self.n -= 1
+            cartes[i], cartes[self.n] = cartes[self.n], cartes[i]
+
+    def restaurer(self):
+        """Annule les exclusions : toutes les cartes vivantes redeviennent tirables."""
+        self.n = len(self.cartes)
+
+    def tirer(self, k, tampon, debut=0):
+        """Place k cartes tirées au hasard dans tampon[debut:debut + k] (tampon pré-alloué)."""
+        self.melanger_partiel(k)
+        cartes = self.cartes
+        for i in range(k):
+            tampon[debut + i] = cartes[i]
+
+
+def code_carte(index):
+    """Encodage binaire Cactus Kev de la carte d'index 0-51 (rang * 4 + couleur)."""
+    rang, couleur = divmod(index, 4)
+
+    # Format (32 bits) : xxxxyyyy zzzzAAAA BBBBCCCC DDDDEEEE
+    # EEEE (4 bits) : Nombre premier du rang (table PRIMES)
+    # CCCC (4 bits) : Rang (0-12)
+    # BBBB (4 bits) : Masque de couleur (1, 2, 4, 8)
+    # AAAA (13 bits): Masque de rang (1 << rang)
+    prime = Carte.PRIMES[rang]
+    rank_shift = rang << 8
+    suit_shift = (1 << couleur) << 12
+    rank_mask = (1 << rang) << 16
+    return prime | rank_shift | suit_shift | rank_mask
+
+
+def masque_cartes(cartes):
+    """Masque 64 bits des cartes (bit `index` levé pour chaque carte)."""
+    masque = 0
+    for c in cartes:
+        masque |= 1 << c.index
+    return masque
+
+
+# Modèle entier : index 0-51 -> code bit_value, nom court, et cartes partagées
+CODES = tuple(code_carte(i) for i in range(52))
+INDEX_PAR_CODE = {code: i for i, code in enumerate(CODES)}
+NOMS = tuple(v + c for v in Carte.VALEURS for c in Carte.COULEURS)
+INDEX_PAR_NOM = {nom: i for i, nom in enumerate(NOMS)}
+CARTES = tuple(Carte(nom[0], nom[1]) for nom in NOMS)
+MASQUE_PAQUET = (1 << 52) - 1
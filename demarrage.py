@@ -0,0 +1,67 @@
+"""Démarrage d'un process serveur : tables chargées, pool de simulation chaud et rapport mémoire.
+
+Les tables de l'évaluateur (evaluator_tables.bin) et l'index des tableaux de river
+(river_index.bin) sont projetés en mémoire en lecture seule : tous les process de la machine,
+workers du serveur web comme process du pool de simulation, en partagent les pages. La
+mémoire 'partagee' du rapport compte ces pages, la mémoire 'privee' ce que chaque process
+paie seul.
+
+    python demarrage.py --processus 8      # charge, démarre le pool et affiche le rapport
+"""
+import argparse
+import sys
+import time
+
+from metrics import METRIQUES, memoire_process
+from simulator import charger_tables, prechauffer
+
+
+def demarrer(processus=1, pool=True, verbeux=True):
+    """Charge les tables et, si `pool`, démarre les `processus` process de simulation.
+
+    Retourne le rapport {'tables', 'pool', 'memoire'} ; durées et mémoire sont aussi publiées
+    en jauges pour /metrics. Avec `verbeux`, un résumé est écrit sur la sortie d'erreur.
+    """
+    tables = charger_tables()
+    debut = time.perf_counter()
+    memoires = prechauffer(processus) if pool else []
+    rapport = {
+        'tables': tables,
+        'pool': {'process': len(memoires), 'secondes': time.perf_counter() - debut, 'memoire': memoires},
+        'memoire': memoire_process(),
+    }
+    for nom, table in tables.items():
+        METRIQUES.jauge(f'chargement_{nom}_secondes', table['secondes'])
+    METRIQUES.jauge('demarrage_pool_secondes', rapport['pool']['secondes'])
+    publier_memoire()
+    if verbeux:
+        print(resume(rapport), file=sys.stderr)
+    return rapport
+
+
+def publier_memoire():
+    """Jauges memoire_{residente,partagee,privee}_octets du process courant."""
+    for nom, octets in memoire_process().items():
+        METRIQUES.jauge(f'memoire_{nom}_octets', octets)
+
+
+def resume(rapport):
+    mio = lambda octets: f"{octets / (1 << 20):.1f} Mio"
+    memoire = lambda m: (f"{mio(m['residente'])} résidents, dont {mio(m['partagee'])} partagés"
+                         if 'partagee' in m else f"{mio(m['residente'])} résidents (pic)" if m else "mémoire inconnue")
+    lignes = ["Tables : " + ", ".join(
+        f"{nom} {t['secondes'] * 1000:.1f} ms ({mio(t['octets'])}{', projetée' if t['projetee'] else ''})"
+        for nom, t in rapport['tables'].items())]
+    pool = rapport['pool']
+    if pool['process']:
+        lignes.append(f"Pool : {pool['process']} process prêts en {pool['secondes'] * 1000:.0f} ms "
+                      f"({memoire(pool['memoire'][0])} chacun)")
+    lignes.append(f"Process : {memoire(rapport['memoire'])}")
+    return "\n".join(lignes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Charge les tables, démarre le pool et affiche la mémoire utilisée.")
+    parser.add_argument("--processus", type=int, default=1, help="process du pool de simulation")
+    args = parser.parse_args()
+    demarrer(args.processus)
@@ -1,11 +1,45 @@
-from itertools import combinations
+import mmap
+import os
+import sys
+import struct
+import time
+from array import array
+from collections import Counter
+from itertools import combinations, combinations_with_replacement
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel : seule l'évaluation par lots en dépend
+    np = None
+
+# Fichier binaire contenant les tables pré-calculées (généré au premier import)
+TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluator_tables.bin")
+TABLES_MAGIC = b"PKEV"
+TABLES_VERSION = 2
+# magic, version, taille table non-assortie (M), nb de seaux (NB), taille table couleur
+# (complété à 24 octets : les tables qui suivent sont alignées et lisibles sans copie)
+_ENTETE = struct.Struct("<4sHIII6x")
+
+# Incrément du compteur de couleurs (un quartet de 4 bits par couleur) selon le masque 1/2/4/8
+_INC_COULEUR = (0, 1, 1 << 4, 0, 1 << 8, 0, 0, 0, 1 << 12, 0, 0, 0, 0, 0, 0, 0)
+# Nombre de mains évaluées par tranche dans evaluer_batch (mémoire bornée)
+TAILLE_TRANCHE = 1 << 16
+
+# Bit de débordement du quartet (>= 5 cartes) -> masque de couleur dans bit_value
+_BIT_COULEUR = {0x8: 0x1000, 0x80: 0x2000, 0x800: 0x4000, 0x8000: 0x8000}
+
 
 class EvaluateurFast:
     """Evaluateur optimisé utilisant les produits de nombres premiers et les opérations bit à bit."""
     
-    # Tables de lookup (générées à l'initialisation)
-    FLUSH_LOOKUP = {}
-    UNSUITED_LOOKUP = {}
+    # Tables de lookup (chargées ou générées à l'import, voir _init_tables)
+    # FLUSH_LOOKUP : masque de rangs (13 bits) de la couleur -> score total
+    # UNSUITED_LOOKUP : hachage parfait du produit des nombres premiers -> score total
+    FLUSH_LOOKUP = array("I")
+    UNSUITED_LOOKUP = array("I")
+    UNSUITED_DISP = array("I")
+    UNSUITED_M = 0
+    UNSUITED_NB = 0
     
     # Rangs lisibles
     RANGS_MAINS = [
@@ -15,17 +49,363 @@ class EvaluateurFast:
     
     PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
 
+    # Vues NumPy (sans copie) des tables, créées au premier appel de evaluer_batch
+    _NP_TABLES = None
+
+    # Chargement des tables : durée (s) et projection du fichier (None si les tables sont copiées en mémoire)
+    DUREE_CHARGEMENT = 0.0
+    PROJECTION = None
+
+    @staticmethod
+    def _init_tables(chemin=TABLES_PATH):
+        """Charge les tables de lookup depuis le disque, ou les génère et les sauvegarde.
+
+        Le fichier est projeté en mémoire en lecture seule : tous les process qui l'ouvrent
+        partagent les mêmes pages (cache du système), sans copie par process.
+        """
+        debut = time.perf_counter()
+        tables = EvaluateurFast._charger_tables(chemin)
+        if tables is None:
+            tables = EvaluateurFast._generer_tables()
+            try:
+                EvaluateurFast._sauver_tables(chemin, tables)
+            except OSError:
+                pass  # Répertoire en lecture seule : les tables restent en mémoire
+            else:
+                tables = EvaluateurFast._charger_tables(chemin) or tables
+        (EvaluateurFast.FLUSH_LOOKUP, EvaluateurFast.UNSUITED_LOOKUP,
+         EvaluateurFast.UNSUITED_DISP, EvaluateurFast.UNSUITED_M, EvaluateurFast.UNSUITED_NB) = tables
+        EvaluateurFast.PROJECTION = tables[0].obj if isinstance(tables[0], memoryview) else None
+        EvaluateurFast._NP_TABLES = None
+        EvaluateurFast.DUREE_CHARGEMENT = time.perf_counter() - debut
+
     @staticmethod
-    def _init_tables():
-        """Génère les tables de lookup pour l'évaluation O(1)."""
-        # Cette fonction est simplifiée pour ne pas bloquer le script, 
-        # elle utilise une logique hybride (plus rapide que lookup géante)
-        pass
+    def _generer_tables():
+        """Construit les tables à partir de evaluer_5_ints (scores identiques à l'ancienne méthode)."""
+        primes = EvaluateurFast.PRIMES
+
+        def score_5(rangs, couleurs):
+            ints = [primes[r] | (r << 8) | ((1 << s) << 12) | ((1 << r) << 16) for r, s in zip(rangs, couleurs)]
+            score, type_main = EvaluateurFast.evaluer_5_ints(ints)
+            return (type_main << 24) | score
+
+        # 1. Couleurs : masques de 5 bits évalués, puis 6 et 7 bits par maximum sur les sous-masques
+        flush = array("I", [0] * 8192)
+        masques = sorted((m for m in range(8192) if 5 <= bin(m).count("1") <= 7), key=lambda m: bin(m).count("1"))
+        for m in masques:
+            bits = [r for r in range(13) if m & (1 << r)]
+            if len(bits) == 5:
+                flush[m] = score_5(bits, [0] * 5)
+            else:
+                flush[m] = max(flush[m & ~(1 << r)] for r in bits)
+
+        # 2. Mains non assorties : multi-ensembles de rangs (5 à 7 cartes, 4 max par rang)
+        valeurs = {}
+        for n in (5, 6, 7):
+            for rangs in combinations_with_replacement(range(13), n):
+                counts = Counter(rangs)
+                if max(counts.values()) > 4: continue
+                produit = 1
+                for r in rangs: produit *= primes[r]
+                if n == 5:
+                    valeurs[produit] = score_5(rangs, [0, 1, 2, 3, 0])
+                else:
+                    valeurs[produit] = max(valeurs[produit // primes[r]] for r in counts)
+
+        # 3. Hachage parfait (hash & displace) : slot = (produit + disp[produit % NB]) % M
+        cles = list(valeurs)
+        for charge in (1.05, 1.1, 1.2, 1.3, 1.5):
+            m_taille = int(len(cles) * charge)
+            nb_seaux = len(cles) // 4
+            disp = EvaluateurFast._deplacements(cles, m_taille, nb_seaux)
+            if disp is not None: break
+        else:
+            raise RuntimeError("Impossible de construire le hachage parfait")
+
+        unsuited = array("I", [0] * m_taille)
+        for k, v in valeurs.items():
+            unsuited[(k + disp[k % nb_seaux]) % m_taille] = v
+        return flush, unsuited, disp, m_taille, nb_seaux
+
+    @staticmethod
+    def _deplacements(cles, m_taille, nb_seaux):
+        """Cherche un déplacement par seau sans collision (None si échec)."""
+        seaux = [[] for _ in range(nb_seaux)]
+        for k in cles: seaux[k % nb_seaux].append(k % m_taille)
+        occupe = bytearray(m_taille)
+        disp = array("I", [0] * nb_seaux)
+        for b in sorted(range(nb_seaux), key=lambda b: -len(seaux[b])):
+            base = seaux[b]
+            if not base: break
+            if len(set(base)) != len(base): return None
+            for d in range(m_taille):
+                slots = [(x + d) % m_taille for x in base]
+                if not any(occupe[s] for s in slots):
+                    for s in slots: occupe[s] = 1
+                    disp[b] = d
+                    break
+            else:
+                return None
+        return disp
+
+    @staticmethod
+    def _charger_tables(chemin):
+        """Lit le fichier de tables ; None s'il est absent, d'une autre version ou tronqué.
+
+        Sur une machine little-endian, les tables sont des vues (memoryview 'I') sur le fichier
+        projeté en mémoire ; sinon elles sont lues et retournées dans des array.
+        """
+        try:
+            with open(chemin, "rb") as f:
+                magic, version, m_taille, nb_seaux, n_flush = _ENTETE.unpack(f.read(_ENTETE.size))
+                if magic != TABLES_MAGIC or version != TABLES_VERSION: return None
+                if sys.byteorder == "little":
+                    taille = _ENTETE.size + 4 * (n_flush + m_taille + nb_seaux)
+                    if os.fstat(f.fileno()).st_size < taille: return None
+                    projection = memoryview(mmap.mmap(f.fileno(), taille, access=mmap.ACCESS_READ))
+                    tables, debut = [], _ENTETE.size
+                    for n in (n_flush, m_taille, nb_seaux):
+                        tables.append(projection[debut:debut + 4 * n].cast("I"))
+                        debut += 4 * n
+                    return tables[0], tables[1], tables[2], m_taille, nb_seaux
+                tables = []
+                for n in (n_flush, m_taille, nb_seaux):
+                    t = array("I")
+                    t.fromfile(f, n)
+                    if sys.byteorder == "big": t.byteswap()
+                    tables.append(t)
+        except (OSError, EOFError, struct.error):
+            return None
+        return tables[0], tables[1], tables[2], m_taille, nb_seaux
+
+    @staticmethod
+    def _sauver_tables(chemin, tables):
+        flush, unsuited, disp, m_taille, nb_seaux = tables
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_ENTETE.pack(TABLES_MAGIC, TABLES_VERSION, m_taille, nb_seaux, len(flush)))
+            for t in (flush, unsuited, disp):
+                if sys.byteorder == "big":
+                    t = array("I", t)
+                    t.byteswap()
+                t.tofile(f)
+        os.replace(tmp, chemin)  # Écriture atomique (plusieurs process peuvent importer en même temps)
 
     @staticmethod
     def evaluer_7_cartes(cartes):
-        """Prend 7 objets Carte et retourne le score (Rang, Tie-Breaker)."""
-        # On passe directement aux entiers
+        """Prend 5 à 7 objets Carte et retourne le score (Rang, Score total)."""
+        if len(cartes) < 5: return (-1, -1)
+        total = EvaluateurFast.evaluer_7_ints([c.bit_value for c in cartes])
+        return (total >> 24, total)
+
+    @staticmethod
+    def evaluer_7_ints(ints):
+        """Évalue 5 à 7 entiers de cartes par lookup direct, sans énumérer les combinaisons.
+
+        Retourne le score total (Type << 24) | Score_Interne de la meilleure main de 5 cartes.
+        """
+        produit = 1
+        couleurs = 0
+        for v in ints:
+            produit *= v & 0xFF
+            couleurs += _INC_COULEUR[(v >> 12) & 0xF]
+
+        # Un quartet >= 5 déborde sur son bit de poids fort : au moins 5 cartes d'une couleur.
+        # Avec 7 cartes, une couleur exclut Full et Carré : seule la table couleur compte.
+        flush = (couleurs + 0x3333) & 0x8888
+        if flush:
+            bit = _BIT_COULEUR[flush]
+            masque = 0
+            for v in ints:
+                if v & bit: masque |= v >> 16
+            return EvaluateurFast.FLUSH_LOOKUP[masque]
+
+        m_taille = EvaluateurFast.UNSUITED_M
+        return EvaluateurFast.UNSUITED_LOOKUP[(produit + EvaluateurFast.UNSUITED_DISP[produit % EvaluateurFast.UNSUITED_NB]) % m_taille]
+
+    @staticmethod
+    def etat_partiel(ints):
+        """Pré-calcule l'état d'un tableau partagé (produit des premiers, compteur de couleurs).
+
+        L'état est réutilisé par evaluer_complement pour chaque paire de cartes privatives.
+        """
+        produit = 1
+        couleurs = 0
+        for v in ints:
+            produit *= v & 0xFF
+            couleurs += _INC_COULEUR[(v >> 12) & 0xF]
+        return (produit, couleurs, tuple(ints))
+
+    @staticmethod
+    def evaluer_complement(etat, *cartes):
+        """Score total du tableau `etat` complété par les cartes données (entiers), 5 à 7 cartes au total."""
+        produit, couleurs, ints = etat
+        for v in cartes:
+            couleurs += _INC_COULEUR[(v >> 12) & 0xF]
+            produit *= v & 0xFF
+        if (couleurs + 0x3333) & 0x8888:
+            return EvaluateurFast.evaluer_7_ints(ints + cartes)
+        return EvaluateurFast.UNSUITED_LOOKUP[(produit + EvaluateurFast.UNSUITED_DISP[produit % EvaluateurFast.UNSUITED_NB]) % EvaluateurFast.UNSUITED_M]
+
+    @staticmethod
+    def etat_tableau(ints):
+        """État d'un tableau (3 à 5 cartes) pour le showdown, calculé une fois par tableau final.
+
+        Retourne (produit des premiers, bit de la couleur candidate, nombre de cartes de cette
+        couleur, masque de rangs de cette couleur). Sur 5 cartes au plus, une seule couleur peut
+        en compter 3 : c'est la seule qui peut encore donner une couleur avec 2 cartes privatives
+        (bit 0 s'il n'y en a pas).
+        """
+        produit = 1
+        couleurs = 0
+        for v in ints:
+            produit *= v & 0xFF
+            couleurs += _INC_COULEUR[(v >> 12) & 0xF]
+        for s in range(4):
+            compte = (couleurs >> (4 * s)) & 0xF
+            if compte >= 3:
+                bit = 0x1000 << s
+                masque = 0
+                for v in ints:
+                    if v & bit: masque |= v >> 16
+                return (produit, bit, compte, masque)
+        return (produit, 0, 0, 0)
+
+    @staticmethod
+    def evaluer_joueurs(etat, mains):
+        """Scores totaux de chaque main privative (c1, c2) complétée par le tableau de `etat` (etat_tableau).
+
+        Chaque main ne coûte que deux multiplications et un lookup ; la table couleur n'est
+        consultée que si la couleur candidate du tableau atteint 5 cartes avec la main.
+        """
+        produit, bit, compte, masque = etat
+        unsuited = EvaluateurFast.UNSUITED_LOOKUP
+        disp = EvaluateurFast.UNSUITED_DISP
+        nb = EvaluateurFast.UNSUITED_NB
+        m_taille = EvaluateurFast.UNSUITED_M
+        scores = []
+        for c1, c2 in mains:
+            if bit and compte + (c1 & bit != 0) + (c2 & bit != 0) >= 5:
+                m = masque
+                if c1 & bit: m |= c1 >> 16
+                if c2 & bit: m |= c2 >> 16
+                scores.append(EvaluateurFast.FLUSH_LOOKUP[m])
+            else:
+                p = produit * (c1 & 0xFF) * (c2 & 0xFF)
+                scores.append(unsuited[(p + disp[p % nb]) % m_taille])
+        return scores
+
+    @staticmethod
+    def evaluer_joueurs_batch(tableaux, mains):
+        """Version NumPy de evaluer_joueurs : tableaux (N, 3..5) et mains (N, J, 2) -> scores (N, J).
+
+        Le produit et le compteur de couleurs de chaque tableau sont calculés une fois puis
+        complétés par les deux cartes de chaque main ; les rares mains avec couleur sont
+        réévaluées en entier.
+        """
+        _, unsuited, disp, inc_couleur = EvaluateurFast._tables_numpy()
+        tableaux = np.asarray(tableaux, dtype=np.int64)
+        mains = np.asarray(mains, dtype=np.int64)
+        c1, c2 = mains[..., 0], mains[..., 1]
+        produit = np.prod(tableaux & 0xFF, axis=1)[:, None] * (c1 & 0xFF) * (c2 & 0xFF)
+        couleurs = (inc_couleur[(tableaux >> 12) & 0xF].sum(axis=1)[:, None]
+                    + inc_couleur[(c1 >> 12) & 0xF] + inc_couleur[(c2 >> 12) & 0xF])
+        scores = unsuited[(produit + disp[produit % EvaluateurFast.UNSUITED_NB]) % EvaluateurFast.UNSUITED_M].astype(np.int64)
+        flush = ((couleurs + 0x3333) & 0x8888) != 0
+        if flush.any():
+            i, j = np.nonzero(flush)
+            scores[i, j] = EvaluateurFast._evaluer_tranche(np.hstack([mains[i, j], tableaux[i]]))
+        return scores
+
+    @staticmethod
+    def evaluer_batch(codes):
+        """Évalue un tableau (N, 5..7) d'entiers de cartes (bit_value) et retourne les N scores totaux.
+
+        Même résultat que evaluer_7_ints ligne par ligne, mais par lookups vectorisés NumPy,
+        traités par tranches de TAILLE_TRANCHE mains.
+        """
+        if np is None:
+            raise RuntimeError("evaluer_batch nécessite NumPy (pip install numpy)")
+        codes = np.asarray(codes, dtype=np.int64)
+        if codes.ndim != 2 or not 5 <= codes.shape[1] <= 7:
+            raise ValueError(f"Tableau (N, 5..7) attendu, reçu {codes.shape}")
+
+        scores = np.empty(codes.shape[0], dtype=np.int64)
+        for debut in range(0, codes.shape[0], TAILLE_TRANCHE):
+            tranche = codes[debut:debut + TAILLE_TRANCHE]
+            scores[debut:debut + len(tranche)] = EvaluateurFast._evaluer_tranche(tranche)
+        return scores
+
+    @staticmethod
+    def etat_batch(codes):
+        """Version NumPy de etat_partiel sur le dernier axe de `codes` (0 à 7 cartes).
+
+        Retourne (produit, couleurs, masques) où masques[..., s] est le masque de rangs de la
+        couleur s. Des états disjoints se combinent avec combiner_etats puis evaluer_etat_batch.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        inc_couleur = EvaluateurFast._tables_numpy()[3]
+        produit = np.prod(codes & 0xFF, axis=-1)
+        couleurs = inc_couleur[(codes >> 12) & 0xF].sum(axis=-1)
+        masques = np.stack([np.bitwise_or.reduce(np.where(codes & (0x1000 << s), codes >> 16, 0), axis=-1)
+                            for s in range(4)], axis=-1)
+        return produit, couleurs, masques
+
+    @staticmethod
+    def combiner_etats(e1, e2):
+        """État de l'union de deux ensembles de cartes disjoints (avec broadcasting NumPy)."""
+        return e1[0] * e2[0], e1[1] + e2[1], e1[2] | e2[2]
+
+    @staticmethod
+    def evaluer_etat_batch(etat):
+        """Scores totaux d'états de 5 à 7 cartes (mêmes valeurs que evaluer_batch)."""
+        flush_table, unsuited, disp, _ = EvaluateurFast._tables_numpy()
+        produit, couleurs, masques = etat
+        scores = unsuited[(produit + disp[produit % EvaluateurFast.UNSUITED_NB]) % EvaluateurFast.UNSUITED_M].astype(np.int64)
+        flush = ((couleurs + 0x3333) & 0x8888) != 0
+        if flush.any():
+            comptes = (couleurs[flush][:, None] >> np.array([0, 4, 8, 12])) & 0xF
+            couleur = comptes.argmax(axis=1)
+            scores[flush] = flush_table[np.take_along_axis(masques[flush], couleur[:, None], axis=1)[:, 0]]
+        return scores
+
+    @staticmethod
+    def _tables_numpy():
+        if EvaluateurFast._NP_TABLES is None:
+            EvaluateurFast._NP_TABLES = (
+                np.frombuffer(EvaluateurFast.FLUSH_LOOKUP, dtype=np.uint32),
+                np.frombuffer(EvaluateurFast.UNSUITED_LOOKUP, dtype=np.uint32),
+                np.frombuffer(EvaluateurFast.UNSUITED_DISP, dtype=np.uint32).astype(np.int64),
+                np.array(_INC_COULEUR, dtype=np.int64),
+            )
+        return EvaluateurFast._NP_TABLES
+
+    @staticmethod
+    def _evaluer_tranche(codes):
+        flush_table, unsuited, disp, inc_couleur = EvaluateurFast._tables_numpy()
+        m_taille = EvaluateurFast.UNSUITED_M
+
+        produit = np.prod(codes & 0xFF, axis=1)
+        couleurs = inc_couleur[(codes >> 12) & 0xF].sum(axis=1)
+        scores = unsuited[(produit + disp[produit % EvaluateurFast.UNSUITED_NB]) % m_taille].astype(np.int64)
+
+        # Les mains avec couleur (rares) sont corrigées par un lookup dans la table couleur
+        flush = ((couleurs + 0x3333) & 0x8888) != 0
+        if flush.any():
+            lignes = codes[flush]
+            debord = (couleurs[flush] + 0x3333) & 0x8888
+            masques = np.zeros(len(lignes), dtype=np.int64)
+            for quartet, bit in _BIT_COULEUR.items():
+                sel = debord == quartet
+                if sel.any():
+                    l = lignes[sel]
+                    masques[sel] = np.bitwise_or.reduce(np.where(l & bit, l >> 16, 0), axis=1)
+            scores[flush] = flush_table[masques]
+        return scores
+
+    @staticmethod
+    def evaluer_7_cartes_reference(cartes):
+        """Ancienne méthode (21 combinaisons de 5 cartes), conservée comme référence."""
         ints = [c.bit_value for c in cartes]
         
         meilleur_score = -1
@@ -34,7 +414,7 @@ class EvaluateurFast:
         # On teste toutes les combinaisons de 5 cartes parmi 7
         for combo in combinations(ints, 5):
             score, type_main = EvaluateurFast.evaluer_5_ints(combo)
-            # Le score combiné : (Type << 20) | Score_Interne
+            # Le score combiné : (Type << 24) | Score_Interne
             total = (type_main << 24) | score
             if total > meilleur_score:
                 meilleur_score = total
@@ -140,3 +520,6 @@ class EvaluateurFast:
         # Carte Haute
         val = rangs[0]<<16 | rangs[1]<<12 | rangs[2]<<8 | rangs[3]<<4 | rangs[4]
         return (val, 0)
+
+
+EvaluateurFast._init_tables()
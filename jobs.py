@@ -0,0 +1,166 @@
+"""Tâches de calcul en arrière-plan : exécution bornée, résultats progressifs et annulation.
+
+Une tâche publie une suite d'événements (type, données) que les clients lisent en flux
+Server-Sent Events (voir flux_sse), depuis le début ou depuis le dernier événement reçu.
+"""
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# États finaux d'une tâche
+ETATS_FINAUX = {'terminee', 'annulee', 'erreur'}
+
+
+class TacheAnnulee(Exception):
+    """Levée dans le calcul d'une tâche dont l'annulation a été demandée."""
+
+
+class FileSaturee(Exception):
+    """Trop de tâches en attente : le client doit réessayer plus tard."""
+
+
+class Tache:
+    """Calcul soumis au GestionnaireTaches, avec son journal d'événements."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.etat = 'en_attente'
+        self.evenements = []
+        self.condition = threading.Condition()
+        self.annulation = threading.Event()
+        self.future = None
+        self.fin = None
+
+    @property
+    def annulee(self):
+        return self.annulation.is_set()
+
+    def publier(self, type_evt, donnees):
+        """Ajoute un événement au journal ; lève TacheAnnulee si l'annulation a été demandée.
+
+        Appelée régulièrement par le calcul, elle sert aussi de point d'arrêt.
+        """
+        if self.annulee:
+            raise TacheAnnulee()
+        with self.condition:
+            self.evenements.append((type_evt, donnees))
+            self.condition.notify_all()
+
+    def annuler(self):
+        """Demande l'arrêt du calcul ; une tâche encore en file n'est jamais lancée."""
+        self.annulation.set()
+        if self.future is not None and self.future.cancel():
+            self._terminer('annulee', 'annulee', {})
+
+    def dernier(self, type_evt):
+        """Données du dernier événement de ce type, ou None."""
+        with self.condition:
+            for t, donnees in reversed(self.evenements):
+                if t == type_evt:
+                    return donnees
+        return None
+
+    def attendre(self, debut, delai):
+        """Événements à partir de l'index `debut`, en attendant au plus `delai` s'il n'y en a pas.
+
+        Retourne (événements, terminée).
+        """
+        with self.condition:
+            if len(self.evenements) <= debut and self.etat not in ETATS_FINAUX:
+                self.condition.wait(delai)
+            return self.evenements[debut:], self.etat in ETATS_FINAUX
+
+    def resume(self):
+        return {'id': self.id, 'etat': self.etat, 'evenements': len(self.evenements),
+                'resultat': self.dernier('resultat')}
+
+    def _terminer(self, etat, type_evt, donnees):
+        with self.condition:
+            if self.etat in ETATS_FINAUX: return
+            self.evenements.append((type_evt, donnees))
+            self.etat = etat
+            self.fin = time.monotonic()
+            self.condition.notify_all()
+
+
+class GestionnaireTaches:
+    """Exécute les tâches sur un pool de `max_workers` threads, avec au plus `max_file` tâches
+    non terminées (au-delà, soumettre lève FileSaturee).
+
+    Les tâches finies restent consultables `duree_vie` secondes.
+    """
+
+    def __init__(self, max_workers=4, max_file=None, duree_vie=300):
+        self.executeur = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tache")
+        self.max_file = max_file if max_file is not None else 4 * max_workers
+        self.duree_vie = duree_vie
+        self.taches = {}
+        self.verrou = threading.Lock()
+
+    def soumettre(self, fonction, *args):
+        """Lance fonction(tache, *args) en arrière-plan ; son retour devient l'événement 'resultat'."""
+        tache = Tache()
+        with self.verrou:
+            self._purger()
+            if sum(t.etat not in ETATS_FINAUX for t in self.taches.values()) >= self.max_file:
+                raise FileSaturee("Trop de calculs en cours, réessayez plus tard")
+            self.taches[tache.id] = tache
+        tache.future = self.executeur.submit(self._executer, tache, fonction, args)
+        return tache
+
+    def obtenir(self, id_tache):
+        with self.verrou:
+            return self.taches.get(id_tache)
+
+    def annuler(self, id_tache):
+        tache = self.obtenir(id_tache)
+        if tache is None: return False
+        tache.annuler()
+        return True
+
+    def _executer(self, tache, fonction, args):
+        if tache.annulee:
+            tache._terminer('annulee', 'annulee', {})
+            return
+        tache.etat = 'en_cours'
+        try:
+            resultat = fonction(tache, *args)
+        except TacheAnnulee:
+            tache._terminer('annulee', 'annulee', {})
+        except Exception as e:
+            traceback.print_exc()
+            tache._terminer('erreur', 'erreur', {'error': str(e)})
+        else:
+            tache._terminer('terminee', 'resultat', resultat)
+
+    def _purger(self):
+        limite = time.monotonic() - self.duree_vie
+        for id_tache in [i for i, t in self.taches.items() if t.fin is not None and t.fin < limite]:
+            del self.taches[id_tache]
+
+
+def flux_sse(tache, debut=0, pulsation=15.0, annuler_si_abandon=True):
+    """Générateur de messages Server-Sent Events pour les événements de la tâche.
+
+    Chaque message porte l'index de l'événement en `id`, ce qui permet de reprendre avec
+    l'en-tête Last-Event-ID. Un commentaire est envoyé toutes les `pulsation` secondes sans
+    événement. Si le client se déconnecte avant la fin, la tâche est annulée.
+    """
+    termine = False
+    try:
+        while True:
+            evenements, termine = tache.attendre(debut, pulsation)
+            if not evenements and not termine:
+                yield ": pulsation\n\n"
+                continue
+            for type_evt, donnees in evenements:
+                yield f"id: {debut}\nevent: {type_evt}\ndata: {json.dumps(donnees)}\n\n"
+                debut += 1
+            if termine and debut >= len(tache.evenements):
+                return
+    finally:
+        if annuler_si_abandon and not termine:
+            tache.annuler()
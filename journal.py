@@ -0,0 +1,71 @@
+"""Journal structuré : une ligne JSON par événement, écrite hors du chemin des requêtes.
+
+Le thread de la requête ne fait que déposer l'enregistrement dans une file ; un thread
+dédié (logging.handlers.QueueListener) le formate et l'écrit. Niveau : POKER_JOURNAL
+(INFO par défaut, WARNING pour ne garder que les erreurs).
+
+    journaliser('simulate', statut=200, duree_ms=12.5)
+    -> {"ts": "2026-01-01T12:00:00.000Z", "niveau": "INFO", "evenement": "simulate", "statut": 200, "duree_ms": 12.5}
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+JOURNAL = logging.getLogger("poker")
+_ECOUTEUR = None
+
+
+class FormatJSON(logging.Formatter):
+    """Enregistrement -> objet JSON d'une ligne (champs passés par journaliser, trace des erreurs)."""
+
+    def format(self, record):
+        ligne = {
+            'ts': time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'niveau': record.levelname,
+            'evenement': record.getMessage(),
+        }
+        ligne.update(getattr(record, 'champs', {}))
+        if record.exc_info:
+            ligne['trace'] = self.formatException(record.exc_info)
+        return json.dumps(ligne, ensure_ascii=False, default=str)
+
+
+class _FileSansFormatage(logging.handlers.QueueHandler):
+    """QueueHandler qui laisse tout le formatage, trace comprise, au thread d'écriture."""
+
+    def prepare(self, record):
+        return record
+
+
+def configurer(niveau=None, flux=None):
+    """Branche le journal sur `flux` (sortie d'erreur par défaut), une seule fois par process."""
+    global _ECOUTEUR
+    if _ECOUTEUR is not None: return
+    sortie = logging.StreamHandler(flux or sys.stderr)
+    sortie.setFormatter(FormatJSON())
+    file = queue.SimpleQueue()
+    JOURNAL.addHandler(_FileSansFormatage(file))
+    JOURNAL.setLevel(niveau or os.environ.get("POKER_JOURNAL", "INFO").upper())
+    JOURNAL.propagate = False
+    _ECOUTEUR = logging.handlers.QueueListener(file, sortie)
+    _ECOUTEUR.start()
+    atexit.register(_ECOUTEUR.stop)
+
+
+def journaliser(evenement, **champs):
+    if JOURNAL.isEnabledFor(logging.INFO):
+        JOURNAL.info(evenement, extra={'champs': champs})
+
+
+def journaliser_avertissement(evenement, **champs):
+    JOURNAL.warning(evenement, extra={'champs': champs})
+
+
+def journaliser_erreur(evenement, **champs):
+    """À appeler dans un bloc except : la trace de l'exception en cours est jointe."""
+    JOURNAL.error(evenement, exc_info=True, extra={'champs': champs})
@@ -1,6 +1,7 @@
 import sys
 from card import Carte
 from simulator import Simulateur
+from tirages import AnalyseurTirages
 
 def parser_cartes(entree):
     mots = entree.replace(',', ' ').split()
@@ -40,22 +41,35 @@ def main():
 
     print("\n" + "-"*30)
     print("ANALYSE DES OUTS (Cartes à venir)")
-    outs = Simulateur.calculer_outs(ma_main, tableau, exclues)
-    if not outs:
-        if len(tableau) >= 5:
-            print("Tableau complet. Plus d'outs possibles.")
-        else:
-            print("Aucune carte simple n'améliore votre main immédiatement.")
+    profils = ['random'] * nb_adv
+    analyse = AnalyseurTirages.analyser(ma_main, tableau, exclues, profils)
+    if len(tableau) >= 5:
+        print("Tableau complet. Plus d'outs possibles.")
+    elif not analyse:
+        print("Les outs sont analysés à partir du flop.")
+    elif not analyse['outs']['franc'] and not analyse['outs']['souille'] and not analyse['runner_runner']:
+        print("Aucune carte n'améliore votre main de façon décisive.")
     else:
-        print(f"Outs détectés ({len(outs)}) : " + ", ".join([str(c) for c in outs]))
-        prob_out = (len(outs) / (52 - 2 - len(tableau) - len(exclues))) * 100
-        print(f"Probabilité de toucher un out au prochain tour : {prob_out:.2f}%")
+        for classe, libelle in (('franc', 'Outs francs'), ('souille', 'Outs souillés'), ('partage', 'Outs partagés')):
+            if analyse['outs'][classe]:
+                print(f"{libelle} ({len(analyse['outs'][classe])}) : " + ", ".join(analyse['outs'][classe]))
+        for tirage in analyse['tirages']:
+            print(f"- {tirage['nom']} : {tirage['prob']}%")
+        print(f"Probabilité de toucher un out au prochain tour : {analyse['proba_prochaine']:.1f}%")
+        if len(tableau) == 3:
+            print(f"Probabilité de toucher d'ici la river (runner-runner compris) : {analyse['proba_riviere']:.1f}%")
 
-    print("\nSIMULATION MONTE CARLO (10 000 itérations)...")
-    profils = ['random'] * nb_adv
-    win, tie, _, mains_stats = Simulateur.simuler(ma_main, tableau, profils, exclues)
+    print("\nSIMULATION MONTE CARLO (précision ±0.5%, 100 000 itérations max)...")
+    resultat = Simulateur.simuler_detail(ma_main, tableau, profils, exclues, iterations=100000, erreur_cible=0.25)
+    win, tie, mains_stats = resultat['win'], resultat['tie'], resultat['repartition']
 
     print("\n--- PROBABILITÉS DE VICTOIRE ---")
+    if resultat['mode'] == 'exact':
+        print("(calcul exact, toutes les donnes énumérées)")
+    elif resultat['mode'] == 'index':
+        print("(calcul exact, index des tableaux de river)")
+    else:
+        print(f"({resultat['iterations']} itérations, intervalle de confiance 95% : ±{resultat['ic95_win']:.2f}%)")
     print(f"VICTOIRE : {win:.2f}%")
     print(f"ÉGALITÉ  : {tie:.2f}%")
     print(f"DÉFAITE  : {(100 - win - tie):.2f}%")
@@ -66,6 +80,10 @@ def main():
             print(f"- {nom}: {proc:.1f}% des victoires")
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["--batch"]:
+        # Mode lot : python main.py --batch spots.jsonl [options de batch.py]
+        from batch import main as main_batch
+        sys.exit(main_batch(sys.argv[2:]))
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,184 @@
+"""Équités de toutes les mains de départ entre elles sur un tableau donné.
+
+Sur un tableau complet, chaque combo vivant est évalué une seule fois, puis les combos sont
+triés par score : l'équité d'un combo contre une range se lit dans des sommes cumulées des
+poids, corrigées des combos qui partagent une de ses cartes (une somme cumulée par carte).
+Au flop et au turn, les résultats de chaque fin de tableau sont additionnés.
+
+    python matrice.py "Qh Jd 2c" --sortie matrice.npy        # matrice 1326 x 1326 (mmap)
+"""
+import argparse
+import sys
+import time
+from itertools import combinations
+from math import comb
+
+from card import CARTES, CODES, INDEX_PAR_NOM, NOMS
+from evaluator_fast import EvaluateurFast, np
+from ranges import Range, range_depuis_texte
+
+# Les 1326 combos (i < j, index 0-51), dans l'ordre des combos de ranges.Range
+COMBOS = tuple(combinations(range(52), 2))
+NB_COMBOS = len(COMBOS)
+
+# Évaluations (fins de tableau x combos) par appel à evaluer_joueurs_batch
+CELLULES_MATRICE = 1 << 17
+
+if np is not None:
+    _COMBOS = np.array(COMBOS, dtype=np.int64)
+    _CODES = np.array(CODES, dtype=np.int64)
+    _INDEX_COMBO = np.full((52, 52), -1, dtype=np.int64)
+    _INDEX_COMBO[_COMBOS[:, 0], _COMBOS[:, 1]] = _INDEX_COMBO[_COMBOS[:, 1], _COMBOS[:, 0]] = np.arange(NB_COMBOS)
+
+
+class MatriceEquite:
+    """Équités combo contre combo et combo contre range sur un tableau de 3 à 5 cartes (NumPy requis)."""
+
+    @staticmethod
+    def index_combo(carte1, carte2):
+        """Ligne ou colonne de la matrice du combo formé de ces deux cartes."""
+        return int(_INDEX_COMBO[carte1.index, carte2.index])
+
+    @staticmethod
+    def nom_combo(k):
+        i, j = COMBOS[k]
+        return NOMS[j] + NOMS[i]
+
+    @staticmethod
+    def calculer(tableau, cartes_exclues=(), chemin=None):
+        """Matrice (1326, 1326) float32 : équité (victoire + moitié des égalités, en fraction) du
+        combo de la ligne contre celui de la colonne, toutes les fins de tableau jouées.
+
+        NaN si l'un des combos touche une carte connue ou s'ils partagent une carte. Avec
+        `chemin`, la matrice est écrite dans un fichier .npy projeté en mémoire (à relire avec
+        np.load(chemin, mmap_mode='r')) au lieu d'être allouée.
+        """
+        signes = np.zeros((NB_COMBOS, NB_COMBOS), dtype=np.int16)
+        for ids, scores in MatriceEquite._fins(tableau, cartes_exclues):
+            for k, s in zip(ids, scores):
+                # Somme des signes (+1 victoire, 0 égalité, -1 défaite) sur les fins de tableau
+                signes[np.ix_(k, k)] += np.sign(s[:, None] - s[None, :]).astype(np.int16)
+
+        vivantes = 52 - len(tableau) - len(cartes_exclues)
+        fins = comb(vivantes - 4, 5 - len(tableau))
+        if chemin is not None:
+            matrice = np.lib.format.open_memmap(chemin, mode='w+', dtype=np.float32, shape=signes.shape)
+        else:
+            matrice = np.empty(signes.shape, dtype=np.float32)
+        # victoires - défaites = somme des signes, et victoires + défaites + égalités = fins
+        np.divide(signes + fins, 2 * fins, out=matrice, casting='unsafe')
+
+        valides = np.ones(NB_COMBOS, dtype=bool)
+        connues = [c.index for c in list(tableau) + list(cartes_exclues)]
+        valides[np.isin(_COMBOS, connues).any(axis=1)] = False
+        matrice[~valides] = np.nan
+        matrice[:, ~valides] = np.nan
+        for c in range(52):
+            # Combos qui partagent la carte c (dont la diagonale)
+            partage = np.nonzero((_COMBOS == c).any(axis=1))[0]
+            matrice[np.ix_(partage, partage)] = np.nan
+        if chemin is not None:
+            matrice.flush()
+        return matrice
+
+    @staticmethod
+    def contre_range(tableau, profil='any', cartes_exclues=()):
+        """Vecteur (1326,) : équité de chaque combo contre une range adverse (texte ou Range).
+
+        La main adverse est tirée dans la range pondérée, parmi les combos compatibles avec le
+        combo évalué et le tableau. NaN si le combo touche une carte connue ou si aucun combo
+        de la range n'est compatible.
+        """
+        poids = np.zeros(NB_COMBOS)
+        if isinstance(profil, str) and Range.est_aleatoire(profil):
+            poids[:] = 1.0
+        else:
+            r = range_depuis_texte(profil) if isinstance(profil, str) else profil
+            poids[_INDEX_COMBO[[i for i, _ in r.combos], [j for _, j in r.combos]]] = r.poids
+
+        gains = np.zeros(NB_COMBOS)
+        totaux = np.zeros(NB_COMBOS)
+        for ids, scores in MatriceEquite._fins(tableau, cartes_exclues):
+            t, n = ids.shape
+            lignes = np.arange(t)[:, None]
+            ordre = np.argsort(scores, axis=1, kind='stable')
+            ids, scores = ids[lignes, ordre], scores[lignes, ordre]
+            w = poids[ids]
+            c1, c2 = _COMBOS[ids, 0], _COMBOS[ids, 1]
+
+            # Sommes cumulées des poids : toutes les mains, puis celles qui contiennent chaque carte
+            cumul = np.zeros((t, n + 1))
+            cumul[:, 1:] = np.cumsum(w, axis=1)
+            par_carte = np.zeros((t, n + 1, 52))
+            par_carte[lignes, np.arange(1, n + 1), c1] = w
+            par_carte[lignes, np.arange(1, n + 1), c2] = w
+            np.cumsum(par_carte, axis=1, out=par_carte)
+
+            # Bornes du groupe de scores égaux de chaque main : [debut, fin[
+            position = np.broadcast_to(np.arange(n), (t, n))
+            nouveau = np.ones((t, n), dtype=bool)
+            nouveau[:, 1:] = scores[:, 1:] != scores[:, :-1]
+            debut = np.maximum.accumulate(np.where(nouveau, position, 0), axis=1)
+            dernier = np.ones((t, n), dtype=bool)
+            dernier[:, :-1] = nouveau[:, 1:]
+            fin = np.minimum.accumulate(np.where(dernier, position + 1, n)[:, ::-1], axis=1)[:, ::-1]
+
+            def sans_conflit(cumuls_totaux, bornes):
+                # Poids des mains avant la borne, moins celles qui partagent une carte du combo
+                return (np.take_along_axis(cumuls_totaux, bornes, axis=1)
+                        - par_carte[lignes, bornes, c1] - par_carte[lignes, bornes, c2])
+
+            battues = sans_conflit(cumul, debut)
+            non_gagnantes = sans_conflit(cumul, fin) + w  # le combo lui-même, retiré deux fois
+            compatibles = sans_conflit(cumul, np.full((t, n), n)) + w
+            np.add.at(gains, ids, battues + 0.5 * (non_gagnantes - battues))
+            np.add.at(totaux, ids, compatibles)
+
+        equites = np.full(NB_COMBOS, np.nan)
+        np.divide(gains, totaux, out=equites, where=totaux > 1e-12)
+        return equites
+
+    @staticmethod
+    def _fins(tableau, cartes_exclues):
+        """Par tranches de fins de tableau : (combos vivants (t, n), leurs scores (t, n)).
+
+        Le nombre de combos vivants est le même pour chaque fin de tableau : ceux qui ne
+        touchent ni le tableau final ni les cartes exclues.
+        """
+        if np is None:
+            raise RuntimeError("La matrice d'équités nécessite NumPy")
+        if not 3 <= len(tableau) <= 5:
+            raise ValueError("Le tableau doit contenir 3 à 5 cartes")
+        connues = {c.index for c in list(tableau) + list(cartes_exclues)}
+        restantes = np.array([i for i in range(52) if i not in connues], dtype=np.int64)
+        a_venir = 5 - len(tableau)
+        tirages = list(combinations(range(len(restantes)), a_venir))
+        tirages = np.array(tirages, dtype=np.int64).reshape(len(tirages), a_venir)
+        paires = np.array(list(combinations(range(len(restantes) - a_venir), 2)), dtype=np.int64)
+        tableau_ints = _CODES[[c.index for c in tableau]]
+
+        tranche = max(1, CELLULES_MATRICE // len(paires))
+        for debut in range(0, len(tirages), tranche):
+            sorties = tirages[debut:debut + tranche]
+            t = len(sorties)
+            libres = np.ones((t, len(restantes)), dtype=bool)
+            libres[np.arange(t)[:, None], sorties] = False
+            vivantes = restantes[np.nonzero(libres)[1].reshape(t, -1)]
+            ids = _INDEX_COMBO[vivantes[:, paires[:, 0]], vivantes[:, paires[:, 1]]]
+            tableaux = np.hstack([np.broadcast_to(tableau_ints, (t, len(tableau_ints))), _CODES[restantes[sorties]]])
+            yield ids, EvaluateurFast.evaluer_joueurs_batch(tableaux, _CODES[_COMBOS[ids]])
+
+
+def _lire_cartes(texte):
+    return [CARTES[INDEX_PAR_NOM[nom[0].upper() + nom[1].lower()]] for nom in texte.replace(',', ' ').split()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matrice d'équités 1326 x 1326 des combos sur un tableau.")
+    parser.add_argument("tableau", help="3 à 5 cartes (\"Qh Jd 2c\")")
+    parser.add_argument("--exclues", default="", help="cartes mortes")
+    parser.add_argument("--sortie", required=True, help="fichier .npy (float32, projeté en mémoire)")
+    args = parser.parse_args()
+    debut = time.perf_counter()
+    MatriceEquite.calculer(_lire_cartes(args.tableau), _lire_cartes(args.exclues), args.sortie)
+    print(f"{args.sortie} écrit en {time.perf_counter() - debut:.1f}s", file=sys.stderr)
@@ -0,0 +1,219 @@
+"""Instrumentation : durées par phase, compteurs, export Prometheus et profilage des requêtes lentes.
+
+Désactivée (POKER_METRIQUES=0), chaque point de mesure se réduit à un test d'attribut.
+Les mesures sont faites dans le process courant : les lots Monte Carlo joués par les
+process du pool comptent dans les essais et évaluations, pas dans les phases internes.
+"""
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+
+# Bornes (secondes) des histogrammes de durée des phases
+BORNES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Mesures de la requête en cours (dict 'phases' / 'compteurs'), propre à chaque thread
+_REQUETE = contextvars.ContextVar('requete', default=None)
+
+
+class _PhaseNulle:
+    """Contexte sans effet renvoyé par Metriques.phase quand l'instrumentation est désactivée."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULLE = _PhaseNulle()
+
+
+class _Phase:
+    __slots__ = ('metriques', 'nom', 'debut')
+
+    def __init__(self, metriques, nom):
+        self.metriques = metriques
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metriques.observer(self.nom, time.perf_counter() - self.debut)
+        return False
+
+
+class Metriques:
+    """Compteurs et histogrammes de durée, cumulés pour /metrics et détaillés par requête.
+
+    `profil_seuil` (secondes) active le profilage : une fraction `profil_taux` des requêtes
+    est exécutée sous cProfile et, si elle dépasse le seuil, ses statistiques sont écrites
+    dans `profil_dossier` (fichier .pstats) et résumées sur la sortie d'erreur.
+    """
+
+    def __init__(self, actif=True, profil_seuil=None, profil_taux=1.0, profil_dossier="profils"):
+        self.actif = actif
+        self.profil_seuil = profil_seuil
+        self.profil_taux = profil_taux
+        self.profil_dossier = profil_dossier
+        self.verrou = threading.Lock()
+        self.verrou_profil = threading.Lock()  # cProfile : une requête profilée à la fois
+        self.compteurs = {}
+        self.histogrammes = {}  # phase -> [comptes par borne, +Inf, somme]
+        self.jauges = {}
+
+    def compter(self, nom, n=1):
+        if not self.actif: return
+        with self.verrou:
+            self.compteurs[nom] = self.compteurs.get(nom, 0) + n
+        requete = _REQUETE.get()
+        if requete is not None:
+            requete['compteurs'][nom] = requete['compteurs'].get(nom, 0) + n
+
+    def jauge(self, nom, valeur):
+        """Valeur instantanée (mémoire, durée de chargement...), exposée telle quelle."""
+        if not self.actif: return
+        with self.verrou:
+            self.jauges[nom] = valeur
+
+    def phase(self, nom):
+        """Contexte qui mesure la durée d'une phase : `with METRIQUES.phase('heatmap'): ...`"""
+        if not self.actif: return _NULLE
+        return _Phase(self, nom)
+
+    def observer(self, nom, duree):
+        with self.verrou:
+            histo = self.histogrammes.get(nom)
+            if histo is None:
+                histo = self.histogrammes[nom] = [0] * (len(BORNES) + 1) + [0.0]
+            for i, borne in enumerate(BORNES):
+                if duree <= borne:
+                    histo[i] += 1
+            histo[len(BORNES)] += 1
+            histo[-1] += duree
+        requete = _REQUETE.get()
+        if requete is not None:
+            requete['phases'][nom] = round(requete['phases'].get(nom, 0.0) + duree * 1000, 3)
+
+    def requete(self, nom='requete'):
+        """Contexte qui collecte les phases et compteurs d'une requête.
+
+        `with METRIQUES.requete('simulate') as mesures:` ; mesures vaut None si désactivé,
+        sinon {'phases': {nom: ms}, 'compteurs': {...}, 'total_ms': ...} une fois le bloc fini.
+        """
+        return _Requete(self, nom)
+
+    def exposer(self):
+        """Texte au format d'exposition Prometheus."""
+        lignes = []
+        with self.verrou:
+            compteurs = dict(self.compteurs)
+            histogrammes = {k: list(v) for k, v in self.histogrammes.items()}
+            jauges = dict(self.jauges)
+        if histogrammes:
+            lignes += ["# HELP poker_phase_secondes Durée des phases de calcul",
+                       "# TYPE poker_phase_secondes histogram"]
+            for phase, histo in sorted(histogrammes.items()):
+                for borne, n in zip(BORNES, histo):
+                    lignes.append(f'poker_phase_secondes_bucket{{phase="{phase}",le="{borne}"}} {n}')
+                lignes.append(f'poker_phase_secondes_bucket{{phase="{phase}",le="+Inf"}} {histo[len(BORNES)]}')
+                lignes.append(f'poker_phase_secondes_sum{{phase="{phase}"}} {histo[-1]:.6f}')
+                lignes.append(f'poker_phase_secondes_count{{phase="{phase}"}} {histo[len(BORNES)]}')
+        for nom, valeur in sorted(compteurs.items()):
+            metrique = "poker_" + re.sub(r"[^a-zA-Z0-9_]", "_", nom) + "_total"
+            lignes += [f"# TYPE {metrique} counter", f"{metrique} {valeur:g}"]
+        for nom, valeur in sorted(jauges.items()):
+            metrique = "poker_" + re.sub(r"[^a-zA-Z0-9_]", "_", nom)
+            lignes += [f"# TYPE {metrique} gauge", f"{metrique} {valeur:g}"]
+        return "\n".join(lignes) + "\n"
+
+    def reinitialiser(self):
+        with self.verrou:
+            self.compteurs.clear()
+            self.histogrammes.clear()
+            self.jauges.clear()
+
+    def _ecrire_profil(self, nom, profil, duree):
+        os.makedirs(self.profil_dossier, exist_ok=True)
+        chemin = os.path.join(self.profil_dossier, f"{time.strftime('%Y%m%d-%H%M%S')}-{nom}-{duree * 1000:.0f}ms.pstats")
+        profil.dump_stats(chemin)
+        resume = io.StringIO()
+        pstats.Stats(profil, stream=resume).sort_stats("cumulative").print_stats(15)
+        print(f"Requête lente {nom} ({duree * 1000:.0f} ms), profil : {chemin}\n{resume.getvalue()}", file=sys.stderr)
+
+
+class _Requete:
+    __slots__ = ('metriques', 'nom', 'mesures', 'jeton', 'debut', 'profil')
+
+    def __init__(self, metriques, nom):
+        self.metriques = metriques
+        self.nom = nom
+        self.mesures = None
+        self.profil = None
+
+    def __enter__(self):
+        m = self.metriques
+        if not m.actif: return None
+        self.mesures = {'phases': {}, 'compteurs': {}}
+        self.jeton = _REQUETE.set(self.mesures)
+        if m.profil_seuil is not None and random.random() < m.profil_taux and m.verrou_profil.acquire(blocking=False):
+            self.profil = cProfile.Profile()
+            self.profil.enable()
+        self.debut = time.perf_counter()
+        return self.mesures
+
+    def __exit__(self, *exc):
+        m = self.metriques
+        if self.mesures is None: return False
+        duree = time.perf_counter() - self.debut
+        _REQUETE.reset(self.jeton)
+        m.observer(self.nom, duree)
+        self.mesures['total_ms'] = round(duree * 1000, 3)
+        if self.profil is not None:
+            self.profil.disable()
+            m.verrou_profil.release()
+            if duree >= m.profil_seuil:
+                m._ecrire_profil(self.nom, self.profil, duree)
+        return False
+
+
+def memoire_process():
+    """Mémoire résidente du process en octets : 'residente', dont 'partagee' (fichiers projetés
+    et mémoire partagée, communs à tous les process qui les ouvrent) et 'privee'.
+
+    Lue dans /proc/self/status (Linux) ; ailleurs, seul le pic de mémoire résidente est connu.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            champs = dict(ligne.split(":", 1) for ligne in f if ":" in ligne)
+        octets = lambda nom: int(champs[nom].split()[0]) * 1024
+        return {'residente': octets('VmRSS'), 'partagee': octets('RssFile') + octets('RssShmem'),
+                'privee': octets('RssAnon')}
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return {}
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'residente': pic if sys.platform == "darwin" else pic * 1024}
+
+
+def _seuil_profil():
+    valeur = os.environ.get("POKER_PROFIL_SEUIL")
+    return float(valeur) if valeur else None
+
+
+# Instance partagée par le simulateur, le cache et l'application web
+METRIQUES = Metriques(actif=os.environ.get("POKER_METRIQUES", "1") != "0",
+                      profil_seuil=_seuil_profil(),
+                      profil_taux=float(os.environ.get("POKER_PROFIL_TAUX", 1.0)),
+                      profil_dossier=os.environ.get("POKER_PROFIL_DOSSIER", "profils"))
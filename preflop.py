@@ -0,0 +1,192 @@
+"""Table d'équités préflop : 169 mains de départ x 1 à 9 adversaires aléatoires.
+
+Générée hors ligne (python preflop.py --iterations 200000) puis livrée avec le dépôt dans
+preflop_equity.bin ; Simulateur la consulte pour répondre instantanément aux requêtes
+préflop sans cartes exclues.
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import combinations
+
+from card import CODES, Carte
+from evaluator_fast import EvaluateurFast, np
+
+PREFLOP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.bin")
+PREFLOP_MAGIC = b"PKPF"
+PREFLOP_VERSION = 1
+NB_CLASSES = 169
+NB_ADV_MAX = 9
+# magic, version, nb de classes, nb d'adversaires max, itérations Monte Carlo par entrée
+_ENTETE = struct.Struct("<4sHHHI")
+# Les pourcentages sont quantifiés sur 16 bits : 65535 = 100 %
+_ECHELLE = 65535 / 100
+
+
+class TablePreflop:
+    """Équités préflop pré-calculées, chargées paresseusement au premier appel de consulter."""
+
+    # (iterations, win_tie[classe][nb_adv - 1] = (win, tie), repartition[classe] = 9 fréquences)
+    _DONNEES = None
+
+    @staticmethod
+    def classe(ma_main):
+        """Index 0-168 de la main de départ : paires, puis assorties, puis dépareillées."""
+        haute, basse = sorted((c.rang for c in ma_main), reverse=True)
+        if haute == basse:
+            return haute
+        rang_paire = haute * (haute - 1) // 2 + basse  # 0-77 parmi les couples haute > basse
+        assortie = ma_main[0].couleur == ma_main[1].couleur
+        return 13 + rang_paire + (0 if assortie else 78)
+
+    @staticmethod
+    def main_representante(classe):
+        """Deux cartes (Pique, puis Coeur si besoin) représentant la classe."""
+        v = Carte.VALEURS
+        if classe < 13:
+            return [Carte(v[classe], 's'), Carte(v[classe], 'h')]
+        assortie = classe < 13 + 78
+        rang_paire = (classe - 13) % 78
+        haute = 1
+        while (haute + 1) * haute // 2 <= rang_paire:
+            haute += 1
+        basse = rang_paire - haute * (haute - 1) // 2
+        return [Carte(v[haute], 's'), Carte(v[basse], 's' if assortie else 'h')]
+
+    @staticmethod
+    def nom_classe(classe):
+        haute, basse = TablePreflop.main_representante(classe)
+        if classe < 13:
+            return haute.valeur * 2
+        return haute.valeur + basse.valeur + ('s' if haute.couleur == basse.couleur else 'o')
+
+    @staticmethod
+    def consulter(ma_main, nb_adv, chemin=PREFLOP_PATH):
+        """Résultat au format de Simulateur.simuler_detail, ou None si la table est indisponible
+        ou si la main n'a pas exactement deux cartes."""
+        if not 1 <= nb_adv <= NB_ADV_MAX or len(ma_main) != 2:
+            return None
+        donnees = TablePreflop.donnees(chemin)
+        if not donnees:
+            return None
+
+        iterations, win_tie, repartition = donnees
+        classe = TablePreflop.classe(ma_main)
+        win, tie = win_tie[classe][nb_adv - 1]
+        erreur_win = (win * (100 - win) / iterations) ** 0.5
+        return {
+            'win': win,
+            'tie': tie,
+            'loss': max(0.0, 100 - win - tie),
+            'repartition': {EvaluateurFast.RANGS_MAINS[i]: f for i, f in enumerate(repartition[classe]) if f > 0},
+            'mode': 'table',
+            'methode': 'standard',
+            'iterations': iterations,
+            'taille_effective': iterations,
+            'erreur_win': erreur_win,
+            'erreur_tie': (tie * (100 - tie) / iterations) ** 0.5,
+            'ic95_win': 1.96 * erreur_win,
+        }
+
+    @staticmethod
+    def repartition(ma_main, chemin=PREFLOP_PATH):
+        """Fréquences (%) exactes des 9 types de main finale du héros, ou None si la table est
+        indisponible ou si la main n'a pas exactement deux cartes."""
+        if len(ma_main) != 2:
+            return None
+        donnees = TablePreflop.donnees(chemin)
+        if not donnees:
+            return None
+        return list(donnees[2][TablePreflop.classe(ma_main)])
+
+    @staticmethod
+    def donnees(chemin=PREFLOP_PATH):
+        """Table chargée (une fois par process), ou False si elle est indisponible."""
+        if TablePreflop._DONNEES is None:
+            TablePreflop._DONNEES = TablePreflop.charger(chemin) or False
+        return TablePreflop._DONNEES
+
+    @staticmethod
+    def charger(chemin=PREFLOP_PATH):
+        try:
+            with open(chemin, "rb") as f:
+                magic, version, nb_classes, nb_adv_max, iterations = _ENTETE.unpack(f.read(_ENTETE.size))
+                if magic != PREFLOP_MAGIC or version != PREFLOP_VERSION: return None
+                valeurs = array("H")
+                valeurs.fromfile(f, nb_classes * (2 * nb_adv_max + 9))
+        except (OSError, EOFError, struct.error):
+            return None
+        if sys.byteorder == "big": valeurs.byteswap()
+
+        pourcents = [v / _ECHELLE for v in valeurs]
+        taille = 2 * nb_adv_max + 9
+        win_tie, repartition = [], []
+        for c in range(nb_classes):
+            bloc = pourcents[c * taille:(c + 1) * taille]
+            win_tie.append([(bloc[2 * k], bloc[2 * k + 1]) for k in range(nb_adv_max)])
+            repartition.append(bloc[2 * nb_adv_max:])
+        return iterations, win_tie, repartition
+
+    @staticmethod
+    def generer(iterations=200000, processus=1, graine=0, chemin=PREFLOP_PATH, verbeux=True):
+        """Calcule et écrit la table.
+
+        Victoire et égalité : Monte Carlo (`iterations` essais par classe et nombre d'adversaires).
+        Répartition des mains finales : exacte (les 2 118 760 tableaux possibles), car elle ne
+        dépend pas des adversaires.
+        """
+        from simulator import Simulateur
+
+        valeurs = array("H")
+        debut = time.perf_counter()
+        for classe in range(NB_CLASSES):
+            ma_main = TablePreflop.main_representante(classe)
+            for nb_adv in range(1, NB_ADV_MAX + 1):
+                res = Simulateur.simuler_detail(ma_main, [], ['any'] * nb_adv, iterations=iterations, budget_exact=0,
+                                                processus=processus, graine=graine + classe * 100 + nb_adv,
+                                                utiliser_tables=False)
+                valeurs.extend(round(p * _ECHELLE) for p in (res['win'], res['tie']))
+            valeurs.extend(round(p * _ECHELLE) for p in TablePreflop._repartition_exacte(ma_main))
+            if verbeux:
+                print(f"{TablePreflop.nom_classe(classe):>4} ({classe + 1}/{NB_CLASSES}) "
+                      f"{time.perf_counter() - debut:.0f}s", file=sys.stderr)
+
+        if sys.byteorder == "big": valeurs.byteswap()
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_ENTETE.pack(PREFLOP_MAGIC, PREFLOP_VERSION, NB_CLASSES, NB_ADV_MAX, iterations))
+            valeurs.tofile(f)
+        os.replace(tmp, chemin)
+        TablePreflop._DONNEES = None
+
+    @staticmethod
+    def _repartition_exacte(ma_main):
+        """Fréquence (%) de chaque type de main finale du héros sur tous les tableaux possibles."""
+        main_ints = [c.bit_value for c in ma_main]
+        restantes = [code for code in CODES if code not in main_ints]
+        totaux = [0] * 9
+        if np is None:
+            for tableau in combinations(restantes, 5):
+                totaux[EvaluateurFast.evaluer_7_ints(main_ints + list(tableau)) >> 24] += 1
+        else:
+            rest = np.array(restantes, dtype=np.int64)
+            tableaux = np.array(list(combinations(range(len(restantes)), 5)), dtype=np.int8)
+            for debut in range(0, len(tableaux), 1 << 18):
+                tranche = rest[tableaux[debut:debut + (1 << 18)]]
+                mains = np.hstack([np.broadcast_to(np.array(main_ints), (len(tranche), 2)), tranche])
+                totaux = [a + b for a, b in zip(totaux, np.bincount(EvaluateurFast.evaluer_batch(mains) >> 24, minlength=9).tolist())]
+        total = sum(totaux)
+        return [t / total * 100 for t in totaux]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère la table d'équités préflop (preflop_equity.bin).")
+    parser.add_argument("--iterations", type=int, default=200000, help="essais Monte Carlo par main et nombre d'adversaires")
+    parser.add_argument("--processus", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--sortie", default=PREFLOP_PATH)
+    args = parser.parse_args()
+    TablePreflop.generer(args.iterations, args.processus, args.graine, args.sortie)
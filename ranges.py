@@ -0,0 +1,214 @@
+"""Ranges de mains adverses : syntaxe texte, poids par combo et tirage conditionnel."""
+from bisect import bisect_right
+from functools import lru_cache
+
+from card import CODES, INDEX_PAR_NOM, Carte
+from evaluator_fast import np
+
+# Textes de profil équivalents à « n'importe quelle main »
+TEXTES_ALEATOIRES = {'', 'any', 'random', '100%'}
+
+
+class Range:
+    """Range pondérée de combos de deux cartes.
+
+    Syntaxe (éléments séparés par des virgules, poids optionnel après ':') :
+        QQ, QQ+, 22-55          paires
+        AKs, AKo, AK            assorties, dépareillées, les deux
+        A2s+, KTo+              kicker croissant jusqu'à la carte sous la haute
+        T9s-65s, A5s-A2s        intervalles de même écart ou de même carte haute
+        AhKh                    combo précis
+        QQ+:0.5, AKs:0.25       poids (1 par défaut)
+    'any' (ou 'random', vide) désigne les 1326 combos.
+
+    Les combos sont stockés en index 0-51 (i < j) ; un combo cité deux fois garde le dernier poids.
+    """
+
+    def __init__(self, texte):
+        self.texte = texte
+        poids = {}
+        for i, j, w in Range._parser(texte):
+            poids[(min(i, j), max(i, j))] = w
+        self.combos = sorted(c for c, w in poids.items() if w > 0)
+        self.poids = [poids[c] for c in self.combos]
+        if not self.combos:
+            raise ValueError(f"Range vide : {texte!r}")
+
+    def __len__(self):
+        return len(self.combos)
+
+    def __repr__(self):
+        return f"Range({self.texte!r}, {len(self)} combos)"
+
+    @staticmethod
+    def est_aleatoire(texte):
+        return texte.strip().lower() in TEXTES_ALEATOIRES
+
+    @staticmethod
+    def est_symetrique(texte):
+        """Vrai si la range est invariante par permutation des couleurs (aucun combo précis)."""
+        return not any(Range._est_combo_precis(Range._element(e)[0]) for e in texte.split(',') if e.strip())
+
+    @staticmethod
+    def _est_combo_precis(main):
+        return len(main) == 4 and main[1] in Carte.COULEURS and main[3] in Carte.COULEURS
+
+    def preparer(self, masque_mortes=0):
+        """Combos compatibles avec les cartes mortes, prêts pour le tirage (voir RangePreparee)."""
+        return RangePreparee(self, masque_mortes)
+
+    @staticmethod
+    def _element(element):
+        element = element.strip()
+        if ':' in element:
+            element, w = element.split(':', 1)
+            return element.strip(), float(w)
+        return element, 1.0
+
+    @staticmethod
+    def _parser(texte):
+        if Range.est_aleatoire(texte):
+            for i in range(52):
+                for j in range(i + 1, 52):
+                    yield i, j, 1.0
+            return
+        for element in texte.split(','):
+            if not element.strip(): continue
+            main, w = Range._element(element)
+            for i, j in Range._combos_element(main):
+                yield i, j, w
+
+    @staticmethod
+    def _combos_element(main):
+        if Range._est_combo_precis(main):
+            try:
+                i, j = INDEX_PAR_NOM[main[0].upper() + main[1]], INDEX_PAR_NOM[main[2].upper() + main[3]]
+            except KeyError:
+                raise ValueError(f"Combo invalide : {main}")
+            if i == j: raise ValueError(f"Combo invalide : {main}")
+            return [(i, j)]
+
+        if '-' in main:
+            debut, fin = (Range._classe(m) for m in main.split('-', 1))
+            (h1, b1, t1), (h2, b2, t2) = debut, fin
+            if t1 != t2: raise ValueError(f"Intervalle invalide : {main}")
+            if h1 == b1 and h2 == b2:
+                classes = [(r, r, t1) for r in range(min(h1, h2), max(h1, h2) + 1)]
+            elif h1 == h2:
+                classes = [(h1, b, t1) for b in range(min(b1, b2), max(b1, b2) + 1)]
+            elif h1 - b1 == h2 - b2:
+                classes = [(b + h1 - b1, b, t1) for b in range(min(b1, b2), max(b1, b2) + 1)]
+            else:
+                raise ValueError(f"Intervalle invalide : {main}")
+        elif main.endswith('+'):
+            h, b, t = Range._classe(main[:-1])
+            if h == b:
+                classes = [(r, r, t) for r in range(h, 13)]
+            else:
+                classes = [(h, k, t) for k in range(b, h)]
+        else:
+            classes = [Range._classe(main)]
+
+        combos = []
+        for h, b, t in classes:
+            combos.extend(Range._combos_classe(h, b, t))
+        return combos
+
+    @staticmethod
+    def _classe(main):
+        """'AKs' -> (12, 11, 's') ; 'QQ' -> (10, 10, '') ; 'AK' -> (12, 11, '')."""
+        v = Carte.VALEURS
+        if len(main) not in (2, 3) or main[0].upper() not in v or main[1].upper() not in v:
+            raise ValueError(f"Main invalide : {main}")
+        r1, r2 = v.index(main[0].upper()), v.index(main[1].upper())
+        type_main = main[2].lower() if len(main) == 3 else ''
+        if type_main not in ('', 's', 'o') or (r1 == r2 and type_main):
+            raise ValueError(f"Main invalide : {main}")
+        return max(r1, r2), min(r1, r2), type_main
+
+    @staticmethod
+    def _combos_classe(haute, basse, type_main):
+        combos = []
+        for s1 in range(4):
+            for s2 in range(4):
+                if haute == basse and s2 <= s1: continue
+                if type_main == 's' and s1 != s2: continue
+                if type_main == 'o' and s1 == s2: continue
+                combos.append((haute * 4 + s1, basse * 4 + s2))
+        return combos
+
+
+@lru_cache(maxsize=256)
+def range_depuis_texte(texte):
+    """Range analysée (partagée entre appels : ne pas modifier)."""
+    return Range(texte)
+
+
+class RangePreparee:
+    """Combos d'une range compatibles avec des cartes mortes fixes, avec poids cumulés.
+
+    `tirer` choisit un combo proportionnellement à son poids parmi ceux qui n'utilisent aucune
+    carte de `masque_utilisees`, sans rejet : les combos en conflit sont retirés de la recherche
+    dichotomique sur les poids cumulés. Retourne aussi le poids total vivant, qui sert de poids
+    d'importance (le tirage séquentiel des adversaires n'est pas la loi jointe exacte).
+    """
+
+    def __init__(self, range_, masque_mortes=0):
+        combos, poids = [], []
+        for (i, j), w in zip(range_.combos, range_.poids):
+            if not (masque_mortes >> i) & 1 and not (masque_mortes >> j) & 1:
+                combos.append((i, j))
+                poids.append(w)
+        self.combos = combos
+        self.codes = [(CODES[i], CODES[j]) for i, j in combos]
+        self.masques = [(1 << i) | (1 << j) for i, j in combos]
+        self.poids = poids
+        self.cumul = []
+        total = 0.0
+        for w in poids:
+            total += w
+            self.cumul.append(total)
+        self.total = total
+        # Combos contenant chaque carte (index 0-51)
+        self.par_carte = [[] for _ in range(52)]
+        for k, (i, j) in enumerate(combos):
+            self.par_carte[i].append(k)
+            self.par_carte[j].append(k)
+
+    def __len__(self):
+        return len(self.combos)
+
+    def tirer(self, masque_utilisees, rng):
+        """(index du combo, poids total vivant) ; (-1, 0.0) si aucun combo n'est possible."""
+        conflits = set()
+        m = masque_utilisees
+        while m:
+            carte = (m & -m).bit_length() - 1
+            conflits.update(self.par_carte[carte])
+            m &= m - 1
+        conflits = sorted(conflits)
+        vivant = self.total - sum(self.poids[k] for k in conflits)
+        if vivant <= 1e-12:
+            return -1, 0.0
+
+        u = rng.random() * vivant
+        cumul = self.cumul
+        saut = 0.0
+        p = 0
+        k = bisect_right(cumul, u)
+        # Chaque conflit situé avant le candidat décale la cible de son poids
+        while p < len(conflits) and conflits[p] <= k:
+            saut += self.poids[conflits[p]]
+            p += 1
+            k = bisect_right(cumul, u + saut)
+        if k >= len(cumul):
+            # Arrondi flottant au-delà du dernier combo : on prend le dernier combo vivant
+            exclus = set(conflits)
+            k = max(i for i in range(len(cumul)) if i not in exclus)
+        return k, vivant
+
+    def tableaux_numpy(self):
+        """(codes (n, 2), masques (n,), poids (n,)) pour le tirage vectorisé."""
+        return (np.array(self.codes, dtype=np.int64).reshape(-1, 2),
+                np.array(self.masques, dtype=np.uint64),
+                np.array(self.poids, dtype=np.float64))
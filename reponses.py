@@ -0,0 +1,143 @@
+"""Encodage des réponses de /simulate : JSON complet, JSON compact ou binaire, gzip et ETag.
+
+Formats (paramètre ?format=) :
+    json      la réponse complète, telle que construite par app.analyser ;
+    compact   mêmes champs, mais les pourcentages sont des entiers en 1/echelle de point
+              (echelle = 10 ** precision) et les cartes des index 0-51 (rang * 4 + couleur) :
+              heatmap est une liste de 52 valeurs (-1 : carte connue), mains_absolues une
+              liste de 9 valeurs dans l'ordre de EvaluateurFast.RANGS_MAINS ;
+    binaire   les mêmes nombres dans une structure fixe (voir encoder_binaire), suivie des
+              champs texte (texture, tirages, session) en JSON.
+
+L'ETag ne dépend que de la main (cartes triées), du format, de la précision et du contexte
+de calcul : une requête répétée sur la même main reçoit 304 sans calcul. Il n'est pas
+invariant par permutation des couleurs, la réponse citant les cartes de la requête.
+"""
+import gzip
+import hashlib
+import json
+import struct
+
+from card import INDEX_PAR_NOM
+from evaluator_fast import EvaluateurFast
+
+FORMATS = ('json', 'compact', 'binaire')
+TYPES_MIME = {'json': 'application/json', 'compact': 'application/json', 'binaire': 'application/x-poker-equite'}
+PRECISION_DEFAUT = 1
+PRECISION_MAX = 2  # 100 % x 10 ** 2 tient dans un entier 16 bits
+
+# Version du format des réponses : entre dans l'ETag
+REPONSE_VERSION = 1
+BINAIRE_MAGIC = b"PKEQ"
+MODES = ('exact', 'index', 'table', 'monte_carlo', 'adaptatif')
+# magic, version, mode, echelle, win, tie, loss, erreur, proba_tirage, proba_riviere, iterations
+_ENTETE = struct.Struct("<4sBBHHHHHHHI")
+_ABSENTE = 0xFFFF
+
+# En dessous de cette taille, gzip coûte plus qu'il ne gagne
+TAILLE_MIN_GZIP = 512
+
+
+def etag(data, format_, precision, contexte=''):
+    """ETag faible de la requête /simulate `data` : empreinte de la main normalisée."""
+    cartes = lambda cle: sorted(INDEX_PAR_NOM[c[0].upper() + c[1].lower()] for c in data.get(cle, []) if c)
+    main = {
+        'v': REPONSE_VERSION,
+        'ma_main': cartes('ma_main'),
+        'tableau': cartes('tableau'),
+        'exclues': cartes('exclues'),
+        'profiles': list(data.get('profiles', ['any'])),
+        'format': format_,
+        'precision': precision,
+        'contexte': contexte,
+    }
+    return hashlib.sha1(json.dumps(main, sort_keys=True).encode()).hexdigest()[:20]
+
+
+def encoder(reponse, format_='json', precision=PRECISION_DEFAUT):
+    """Corps (bytes) de la réponse dans le format demandé."""
+    if format_ == 'binaire':
+        return encoder_binaire(reponse, precision)
+    if format_ == 'compact':
+        reponse = compacter(reponse, precision)
+        return json.dumps(reponse, separators=(',', ':')).encode()
+    return json.dumps(reponse).encode()
+
+
+def compacter(reponse, precision=PRECISION_DEFAUT):
+    """Réponse au format 'compact' (voir le docstring du module)."""
+    echelle = 10 ** precision
+    quantifier = lambda pourcent: int(round(pourcent * echelle))
+    cartes = lambda noms: [INDEX_PAR_NOM[nom] for nom in noms]
+    heatmap = [-1] * 52
+    for nom, equite in reponse.get('heatmap', {}).items():
+        heatmap[INDEX_PAR_NOM[nom]] = quantifier(equite)
+    mains = reponse.get('mains_absolues', {})
+    compacte = {cle: valeur for cle, valeur in reponse.items()
+                if cle not in ('heatmap', 'mains_absolues', 'mains_gagnantes') and valeur is not None}
+    compacte.update({
+        'echelle': echelle,
+        'win': quantifier(reponse['win']),
+        'tie': quantifier(reponse['tie']),
+        'loss': quantifier(reponse['loss']),
+        'erreur': quantifier(reponse['erreur']),
+        'proba_tirage': quantifier(reponse['proba_tirage']),
+        'proba_riviere': quantifier(reponse['proba_riviere']),
+        'heatmap': heatmap if reponse.get('heatmap') else [],
+        'mains_absolues': [quantifier(mains.get(nom, 0)) for nom in EvaluateurFast.RANGS_MAINS],
+        'outs': cartes(reponse.get('outs', [])),
+        'outs_detail': {classe: cartes(noms) for classe, noms in reponse.get('outs_detail', {}).items()},
+    })
+    return compacte
+
+
+def encoder_binaire(reponse, precision=PRECISION_DEFAUT):
+    """Réponse au format 'binaire', little-endian :
+
+        en-tête    magic 'PKEQ', version (u8), mode (u8, index dans MODES), echelle (u16),
+                   win, tie, loss, erreur, proba_tirage, proba_riviere (u16, en 1/echelle de point),
+                   iterations (u32)
+        heatmap    52 x u16 dans l'ordre des cartes (0xFFFF : carte connue)
+        mains      9 x u16 (ordre de EvaluateurFast.RANGS_MAINS)
+        outs       3 x u64 : masques des outs francs, souillés et partagés
+        reste      longueur (u32) puis JSON UTF-8 des champs texte (texture, tirages, session)
+    """
+    c = compacter(reponse, precision)
+    masque = lambda indices: sum(1 << i for i in indices)
+    texte = json.dumps({cle: c[cle] for cle in ('texture', 'tirages', 'session') if cle in c},
+                       separators=(',', ':'), ensure_ascii=False).encode()
+    return b"".join([
+        _ENTETE.pack(BINAIRE_MAGIC, REPONSE_VERSION, MODES.index(c['mode']), c['echelle'], c['win'], c['tie'],
+                     c['loss'], c['erreur'], c['proba_tirage'], c['proba_riviere'], min(c['iterations'], 0xFFFFFFFF)),
+        struct.pack("<52H", *(_ABSENTE if v < 0 else v for v in c['heatmap'] or [-1] * 52)),
+        struct.pack("<9H", *c['mains_absolues']),
+        struct.pack("<3Q", *(masque(c['outs_detail'].get(classe, [])) for classe in ('franc', 'souille', 'partage'))),
+        struct.pack("<I", len(texte)), texte,
+    ])
+
+
+def decoder_binaire(octets):
+    """Inverse de encoder_binaire : dict au format 'compact'."""
+    (magic, version, mode, echelle, win, tie, loss, erreur, proba_tirage, proba_riviere,
+     iterations) = _ENTETE.unpack_from(octets)
+    if magic != BINAIRE_MAGIC or version != REPONSE_VERSION:
+        raise ValueError("Réponse binaire invalide")
+    debut = _ENTETE.size
+    heatmap = [-1 if v == _ABSENTE else v for v in struct.unpack_from("<52H", octets, debut)]
+    mains = list(struct.unpack_from("<9H", octets, debut + 104))
+    masques = struct.unpack_from("<3Q", octets, debut + 122)
+    (longueur,) = struct.unpack_from("<I", octets, debut + 146)
+    texte = json.loads(octets[debut + 150:debut + 150 + longueur].decode())
+    cartes = lambda m: [i for i in range(52) if m >> i & 1]
+    outs_detail = {classe: cartes(m) for classe, m in zip(('franc', 'souille', 'partage'), masques) if m}
+    return dict(texte, success=True, mode=MODES[mode], echelle=echelle, win=win, tie=tie, loss=loss, erreur=erreur,
+                proba_tirage=proba_tirage, proba_riviere=proba_riviere, iterations=iterations,
+                heatmap=heatmap if any(v >= 0 for v in heatmap) else [], mains_absolues=mains,
+                outs=outs_detail.get('franc', []) + outs_detail.get('souille', []), outs_detail=outs_detail)
+
+
+def compresser(corps, accept_encoding):
+    """(corps, 'gzip' ou None) : gzip si le client l'accepte et que le corps est assez gros."""
+    if len(corps) < TAILLE_MIN_GZIP or 'gzip' not in (accept_encoding or ''):
+        return corps, None
+    return gzip.compress(corps, compresslevel=6, mtime=0), 'gzip'
@@ -0,0 +1,310 @@
+"""Index des tableaux de river : force de chaque main de 2 cartes sur chaque tableau canonique.
+
+Les 2 598 960 tableaux de 5 cartes se ramènent, par isomorphisme de couleurs, à 134 459 tableaux
+canoniques. Pour chacun, le fichier donne le rang de chacune des 1 081 mains de 2 cartes possibles
+(nombre de mains strictement plus faibles sur ce tableau). L'équité à la river contre 1 ou 2
+adversaires aléatoires s'en déduit par comptage, en retirant les mains qui touchent les cartes
+du héros ou les cartes exclues ; au turn, on additionne les rivers possibles.
+
+Construit hors ligne (python riviere.py), éventuellement par parties (--partie 1/8) ou pour
+quelques tableaux (--tableaux) qui complètent le fichier existant. Le fichier est projeté en
+mémoire (mmap) au premier appel : seules les lignes consultées sont lues. Simulateur le consulte
+s'il existe (mode 'index').
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+from itertools import combinations, islice, permutations
+from math import comb
+
+from card import CARTES, CODES, INDEX_PAR_NOM
+from evaluator_fast import EvaluateurFast, np
+from journal import journaliser_avertissement
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "river_index.bin")
+INDEX_MAGIC = b"PKRI"
+INDEX_VERSION = 1
+# Cartes hors du tableau et mains de 2 cartes parmi elles
+NB_VIVANTES = 47
+NB_MAINS = comb(NB_VIVANTES, 2)
+# Au-delà de 2 adversaires, le comptage des ensembles de mains disjointes n'a pas de forme close
+NB_ADV_MAX = 2
+# magic, version, mains par tableau, nombre de tableaux, CRC32 des clés puis des rangs
+_ENTETE = struct.Struct("<4sHHII")
+# Tableaux évalués par appel à evaluer_joueurs_batch pendant la construction
+TABLEAUX_PAR_TRANCHE = 256
+
+if np is not None:
+    # Carte de chaque index après chacune des 24 permutations des couleurs
+    _PERMUTATIONS = np.array([[(i & ~3) | p[i & 3] for i in range(52)] for p in permutations(range(4))], dtype=np.int64)
+    # Clé colex d'un tableau trié : somme des comb(carte, position + 1), unique dans [0, comb(52, 5))
+    _BINOMES = np.array([[comb(c, k + 1) for k in range(5)] for c in range(52)], dtype=np.int64)
+    _CODES = np.array(CODES, dtype=np.int64)
+    # Main k = (vivante _PI[k], vivante _PJ[k]) ; _PAIRE[i, j] = k ; _INCIDENCE[k, c] = la main k contient c
+    _PI, _PJ = (np.array(v, dtype=np.int64) for v in zip(*combinations(range(NB_VIVANTES), 2)))
+    _PAIRE = np.zeros((NB_VIVANTES, NB_VIVANTES), dtype=np.int64)
+    _PAIRE[_PI, _PJ] = _PAIRE[_PJ, _PI] = np.arange(NB_MAINS)
+    _INCIDENCE = np.zeros((NB_MAINS, NB_VIVANTES))
+    _INCIDENCE[np.arange(NB_MAINS), _PI] = _INCIDENCE[np.arange(NB_MAINS), _PJ] = 1
+
+
+class IndexRiviere:
+    """Index projeté en mémoire, ouvert paresseusement au premier appel de compteurs."""
+
+    # chemin -> (clés triées, rangs (tableaux, NB_MAINS)) ou False si le fichier est absent ou invalide
+    _OUVERTS = {}
+
+    @staticmethod
+    def compteurs(main, tableau, exclues, nb_adv, chemin=INDEX_PATH):
+        """Compteurs exacts (victoires, egalites, stats_mains, total_mains) au format de
+        Simulateur._simuler_exact, ou None si l'index ne couvre pas la situation.
+
+        `main`, `tableau` et `exclues` sont des index de cartes (0-51) ; le tableau a 4 ou 5
+        cartes et il y a 1 ou 2 adversaires aléatoires.
+        """
+        if np is None or not 1 <= nb_adv <= NB_ADV_MAX or len(tableau) not in (4, 5) or len(main) != 2:
+            return None
+        donnees = IndexRiviere.ouvrir(chemin)
+        if not donnees:
+            return None
+        cles_index, rangs = donnees
+
+        connues = set(main) | set(tableau) | set(exclues)
+        if len(tableau) == 5:
+            tableaux = np.array([tableau], dtype=np.int64)
+        else:
+            tableaux = np.array([list(tableau) + [r] for r in range(52) if r not in connues], dtype=np.int64)
+        n = len(tableaux)
+        lignes = np.arange(n)
+
+        cles, perms = IndexRiviere.canoniques(tableaux)
+        pos = np.minimum(np.searchsorted(cles_index, cles), len(cles_index) - 1)
+        if (cles_index[pos] != cles).any():
+            return None
+        rangs = np.asarray(rangs[pos], dtype=np.int64)
+
+        # Cartes vivantes du tableau canonique, et positions des cartes du héros et des exclues parmi elles
+        perm = _PERMUTATIONS[perms]
+        canon = np.take_along_axis(perm, tableaux, axis=1)
+        hors_tableau = np.ones((n, 52), dtype=bool)
+        hors_tableau[lignes[:, None], canon] = False
+        vivantes = np.nonzero(hors_tableau)[1].reshape(n, NB_VIVANTES)
+
+        def positions(cartes):
+            cartes = perm[:, list(cartes)]
+            return (vivantes[:, :, None] == cartes[:, None, :]).argmax(axis=1)
+
+        heros = positions(main)
+        interdites = np.zeros((n, NB_VIVANTES), dtype=bool)
+        interdites[lignes[:, None], heros] = True
+        mortes = sorted(connues - set(main) - set(tableau))
+        if mortes:
+            interdites[lignes[:, None], positions(mortes)] = True
+        valides = ~(interdites[:, _PI] | interdites[:, _PJ])
+
+        mon_rang = rangs[lignes, _PAIRE[heros[:, 0], heros[:, 1]]][:, None]
+        n_gagne = IndexRiviere._couplages(valides & (rangs < mon_rang), nb_adv)
+        n_sans_perte = IndexRiviere._couplages(valides & (rangs <= mon_rang), nb_adv)
+        poids = IndexRiviere._couplages(valides, nb_adv)
+
+        # Type de main du héros sur chaque tableau final
+        sept = np.hstack([np.broadcast_to(_CODES[list(main)], (n, 2)), _CODES[tableaux]])
+        types = EvaluateurFast.evaluer_batch(sept) >> 24
+        stats_mains = np.bincount(types, weights=n_gagne, minlength=9)
+        total_mains = np.bincount(types, weights=poids, minlength=9)
+        return (int(n_gagne.sum()), int((n_sans_perte - n_gagne).sum()),
+                [int(s) for s in stats_mains], [int(t) for t in total_mains])
+
+    @staticmethod
+    def _couplages(mains, k):
+        """Nombre d'ensembles de k mains disjointes parmi les mains marquées de chaque ligne (k = 1 ou 2)."""
+        m = mains.sum(axis=1)
+        if k == 1:
+            return m
+        # Couples de mains moins ceux qui partagent une carte (produit en flottants : exact à ces tailles)
+        degres = (mains @ _INCIDENCE).astype(np.int64)
+        return m * (m - 1) // 2 - (degres * (degres - 1) // 2).sum(axis=1)
+
+    @staticmethod
+    def canoniques(tableaux):
+        """(clé canonique, index de la permutation des couleurs qui y mène) de chaque tableau (n, 5)."""
+        formes = np.sort(_PERMUTATIONS[:, tableaux], axis=2)
+        cles = _BINOMES[formes, np.arange(5)].sum(axis=2)
+        perms = cles.argmin(axis=0)
+        return cles[perms, np.arange(len(tableaux))], perms
+
+    @staticmethod
+    def ouvrir(chemin=INDEX_PATH):
+        """(clés, rangs) projetés en mémoire, ou False si le fichier est absent, d'une autre version
+        ou corrompu.
+
+        Le CRC32 du fichier est contrôlé une fois par process, à la première ouverture (lecture
+        complète du fichier, dont les pages restent partagées en cache) ; un fichier tronqué ou
+        altéré est signalé dans le journal et ignoré, les calculs passent alors par la simulation.
+        """
+        donnees = IndexRiviere._OUVERTS.get(chemin)
+        if donnees is None:
+            donnees = IndexRiviere._projeter(chemin)
+            if donnees and not IndexRiviere._crc_correct(chemin, donnees):
+                journaliser_avertissement('index_riviere_corrompu', chemin=chemin)
+                donnees = None
+            donnees = IndexRiviere._OUVERTS[chemin] = donnees or False
+        return donnees
+
+    @staticmethod
+    def _projeter(chemin):
+        if np is None: return None
+        try:
+            with open(chemin, "rb") as f:
+                magic, version, nb_mains, nb_tableaux, _ = _ENTETE.unpack(f.read(_ENTETE.size))
+        except (OSError, struct.error):
+            return None
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or nb_mains != NB_MAINS:
+            return None
+        if os.path.getsize(chemin) != _ENTETE.size + nb_tableaux * (4 + 2 * NB_MAINS) or not nb_tableaux:
+            return None
+        brut = np.memmap(chemin, dtype=np.uint8, mode="r")
+        fin_cles = _ENTETE.size + 4 * nb_tableaux
+        return brut[_ENTETE.size:fin_cles].view("<u4"), brut[fin_cles:].view("<u2").reshape(nb_tableaux, NB_MAINS)
+
+    @staticmethod
+    def _crc_correct(chemin, donnees):
+        """Vrai si le CRC32 des clés puis des rangs projetés est celui de l'en-tête."""
+        with open(chemin, "rb") as f:
+            crc_attendu = _ENTETE.unpack(f.read(_ENTETE.size))[4]
+        cles, rangs = donnees
+        crc = zlib.crc32(cles)
+        for debut in range(0, len(rangs), 4096):
+            crc = zlib.crc32(rangs[debut:debut + 4096], crc)
+        return crc == crc_attendu
+
+    @staticmethod
+    def verifier(chemin=INDEX_PATH):
+        """Vrai si le fichier est lisible et que son CRC32 est correct."""
+        donnees = IndexRiviere._projeter(chemin)
+        return bool(donnees) and IndexRiviere._crc_correct(chemin, donnees)
+
+    @staticmethod
+    def tableaux_canoniques():
+        """(clés triées, cartes (n, 5), nombre de tableaux isomorphes) des 134 459 tableaux canoniques."""
+        cles, cartes, multiplicites = [], [], np.zeros(comb(52, 5), dtype=np.int64)
+        tous = combinations(range(52), 5)
+        while True:
+            bloc = np.array(list(islice(tous, 1 << 16)), dtype=np.int64)
+            if not len(bloc): break
+            canon, _ = IndexRiviere.canoniques(bloc)
+            propres = _BINOMES[bloc, np.arange(5)].sum(axis=1)
+            np.add.at(multiplicites, canon, 1)
+            cles.append(propres[propres == canon])
+            cartes.append(bloc[propres == canon])
+        cles, cartes = np.concatenate(cles), np.concatenate(cartes)
+        ordre = np.argsort(cles)
+        return cles[ordre], cartes[ordre], multiplicites[cles[ordre]]
+
+    @staticmethod
+    def _rangs(tableaux):
+        """Rang (mains strictement plus faibles) de chaque main de 2 cartes sur chaque tableau (n, 5)."""
+        n = len(tableaux)
+        hors_tableau = np.ones((n, 52), dtype=bool)
+        hors_tableau[np.arange(n)[:, None], tableaux] = False
+        vivantes = _CODES[np.nonzero(hors_tableau)[1].reshape(n, NB_VIVANTES)]
+        mains = np.stack([vivantes[:, _PI], vivantes[:, _PJ]], axis=2)
+        scores = EvaluateurFast.evaluer_joueurs_batch(_CODES[tableaux], mains)
+        # Un seul tri pour toute la tranche : chaque tableau est décalé au-delà des scores (< 2^28)
+        decales = scores.astype(np.int64) + (np.arange(n, dtype=np.int64)[:, None] << 32)
+        rangs = np.searchsorted(np.sort(decales, axis=None), decales).reshape(n, NB_MAINS)
+        return (rangs - np.arange(n)[:, None] * NB_MAINS).astype(np.uint16)
+
+    @staticmethod
+    def construire(chemin=INDEX_PATH, partie=None, tableaux=None, verbeux=True):
+        """Ajoute au fichier les tableaux canoniques qui lui manquent, puis le réécrit atomiquement.
+
+        `partie` = (k, n) ne traite qu'un tableau canonique sur n (le k-ième, 1 <= k <= n) ;
+        `tableaux` limite la construction à ces tableaux (listes d'index de cartes) : un tableau
+        de 4 cartes ajoute toutes ses rivers. Un fichier d'une autre version est reconstruit.
+        Retourne le nombre de tableaux ajoutés.
+        """
+        if np is None:
+            raise RuntimeError("La construction de l'index nécessite NumPy")
+        debut = time.perf_counter()
+        if tableaux is not None:
+            complets = []
+            for t in tableaux:
+                complets += [list(t)] if len(t) == 5 else [list(t) + [r] for r in range(52) if r not in t]
+            demandes = np.array(complets, dtype=np.int64).reshape(-1, 5)
+            cles, perms = IndexRiviere.canoniques(demandes)
+            cles, premiers = np.unique(cles, return_index=True)
+            cartes = np.sort(np.take_along_axis(_PERMUTATIONS[perms[premiers]], demandes[premiers], axis=1), axis=1)
+        else:
+            cles, cartes, _ = IndexRiviere.tableaux_canoniques()
+        if partie is not None:
+            k, n = partie
+            cles, cartes = cles[k - 1::n], cartes[k - 1::n]
+
+        existant = IndexRiviere._projeter(chemin)
+        anciennes = existant[0] if existant else np.zeros(0, dtype=np.uint32)
+        nouveaux = ~np.isin(cles, anciennes)
+        cles, cartes = cles[nouveaux], cartes[nouveaux]
+        if not len(cles):
+            return 0
+
+        rangs = []
+        for i in range(0, len(cartes), TABLEAUX_PAR_TRANCHE):
+            rangs.append(IndexRiviere._rangs(cartes[i:i + TABLEAUX_PAR_TRANCHE]))
+            if verbeux and (i // TABLEAUX_PAR_TRANCHE) % 50 == 0:
+                print(f"  {i + len(rangs[-1]):,}/{len(cartes):,} tableaux ({time.perf_counter() - debut:.0f}s)",
+                      file=sys.stderr)
+        rangs = np.concatenate(rangs)
+
+        # Fusion avec l'existant, triée par clé
+        toutes = np.concatenate([anciennes.astype(np.int64), cles])
+        ordre = np.argsort(toutes, kind="stable")
+        nb_anciennes = len(anciennes)
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"\0" * _ENTETE.size)
+            cles_finales = toutes[ordre].astype("<u4")
+            f.write(cles_finales.tobytes())
+            crc = zlib.crc32(cles_finales)
+            for i in range(0, len(ordre), 4096):
+                source = ordre[i:i + 4096]
+                bloc = np.empty((len(source), NB_MAINS), dtype="<u2")
+                depuis_ancien = source < nb_anciennes
+                if depuis_ancien.any():
+                    bloc[depuis_ancien] = existant[1][source[depuis_ancien]]
+                bloc[~depuis_ancien] = rangs[source[~depuis_ancien] - nb_anciennes]
+                f.write(bloc.tobytes())
+                crc = zlib.crc32(bloc, crc)
+            f.seek(0)
+            f.write(_ENTETE.pack(INDEX_MAGIC, INDEX_VERSION, NB_MAINS, len(ordre), crc))
+        existant = None
+        os.replace(tmp, chemin)
+        IndexRiviere._OUVERTS.pop(chemin, None)
+        if verbeux:
+            print(f"{len(cles):,} tableaux ajoutés, {len(ordre):,} au total ({time.perf_counter() - debut:.0f}s)",
+                  file=sys.stderr)
+        return len(cles)
+
+
+def _lire_tableau(texte):
+    noms = texte.replace(',', ' ').split()
+    return [CARTES[INDEX_PAR_NOM[nom[0].upper() + nom[1].lower()]].index for nom in noms]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit l'index des tableaux de river (river_index.bin).")
+    parser.add_argument("--partie", help="k/n : ne construire qu'un tableau canonique sur n")
+    parser.add_argument("--tableaux", nargs="+", help="tableaux de 4 ou 5 cartes à ajouter (\"Ah Kd 7c 2s\")")
+    parser.add_argument("--verifier", action="store_true", help="contrôler le CRC32 du fichier")
+    parser.add_argument("--sortie", default=INDEX_PATH)
+    args = parser.parse_args()
+    if args.verifier:
+        correct = IndexRiviere.verifier(args.sortie)
+        print("index valide" if correct else "index absent ou corrompu", file=sys.stderr)
+        sys.exit(0 if correct else 1)
+    partie = tuple(int(x) for x in args.partie.split('/')) if args.partie else None
+    tableaux = [_lire_tableau(t) for t in args.tableaux] if args.tableaux else None
+    IndexRiviere.construire(args.sortie, partie, tableaux)
@@ -0,0 +1,144 @@
+"""Sessions de main : le travail d'un tour sert aux tours suivants.
+
+Au flop, l'analyse des tirages (tirages.py) calcule les issues exactes de chaque fin de
+tableau. Une session les garde : l'équité et la heatmap du flop s'en déduisent sans
+simulation, et quand le turn puis la river tombent, il suffit de garder les fins de tableau
+qui contiennent les nouvelles cartes. Analyse des tirages, équité et heatmap du nouveau
+tour sont alors obtenues sans nouvelle évaluation.
+
+Si l'analyse n'est pas exacte (plus de 2 adversaires aléatoires, plusieurs ranges), seule
+l'analyse des tirages est reprise : l'équité et la heatmap passent par le calcul habituel.
+Un changement de main, de profils ou de cartes exclues repart d'une nouvelle analyse.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from card import INDEX_PAR_CODE, NOMS
+from metrics import METRIQUES
+from simulator import Simulateur
+from tirages import SEUIL_FRANC, AnalyseurTirages
+
+
+class SessionMain:
+    """Une main suivie d'un tour à l'autre (héros, profils adverses, tableau, cartes exclues)."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.verrou = threading.Lock()
+        self.acces = time.monotonic()
+        self.cle = None
+        self.tableau = ()
+        self.donnees = None
+
+    def analyser(self, ma_main, tableau, cartes_exclues, profils):
+        """(analyse des tirages, résultat de simuler_detail ou None, heatmap ou None).
+
+        None signifie que la session ne peut pas répondre exactement : l'appelant fait le
+        calcul habituel.
+        """
+        with self.verrou:
+            self.acces = time.monotonic()
+            if self._placer(ma_main, tableau, cartes_exclues, profils):
+                METRIQUES.compter('session_reprises')
+            if self.donnees is None:
+                return {}, None, None
+            exact = self.donnees[6]
+            return self._tirages(), self._equite() if exact else None, self._heatmap() if exact else None
+
+    def _placer(self, ma_main, tableau, cartes_exclues, profils):
+        """Met la session sur ce tableau ; True si les issues du tour précédent suffisent."""
+        cle = (frozenset(c.index for c in ma_main), frozenset(c.index for c in cartes_exclues), tuple(profils))
+        avant, apres = set(self.tableau), {c.index for c in tableau}
+        self.tableau = tuple(c.index for c in tableau)
+        if self.donnees is not None and cle == self.cle and avant <= apres:
+            nouvelles = [c.bit_value for c in tableau if c.index not in avant]
+            if set(nouvelles) <= set(self.donnees[2]):
+                self.donnees = SessionMain._restreindre(self.donnees, nouvelles)
+                return True
+        self.cle = cle
+        self.donnees = None
+        if 3 <= len(tableau) <= 4:
+            self.donnees = AnalyseurTirages.issues_fins(ma_main, tableau, cartes_exclues, profils)
+        return False
+
+    @staticmethod
+    def _restreindre(donnees, nouvelles):
+        """Issues des seules fins de tableau qui contiennent les nouvelles cartes du tableau."""
+        main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact = donnees
+        tombees = {restantes.index(code) for code in nouvelles}
+        nouvel_index = {}
+        for i in range(len(restantes)):
+            if i not in tombees: nouvel_index[i] = len(nouvel_index)
+        gardees = sorted((tuple(nouvel_index[i] for i in fin if i not in tombees), score, issue)
+                         for fin, score, issue in zip(fins, mes_scores, issues) if tombees <= set(fin))
+        return (main_ints, tableau_ints + list(nouvelles), [c for i, c in enumerate(restantes) if i not in tombees],
+                [fin for fin, _, _ in gardees], [s for _, s, _ in gardees], [issue for _, _, issue in gardees], exact)
+
+    def _tirages(self):
+        main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact = self.donnees
+        if len(tableau_ints) >= 5: return {}
+        return AnalyseurTirages._classer(main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact,
+                                         SEUIL_FRANC)
+
+    def _equite(self):
+        """Résultat exact au format de Simulateur.simuler_detail."""
+        victoires = egalites = 0.0
+        stats_mains = [0.0] * 9
+        total_mains = [0.0] * 9
+        for score, (v, s, p) in zip(self.donnees[4], self.donnees[5]):
+            victoires += v * p
+            egalites += (s - v) * p
+            stats_mains[score >> 24] += v * p
+            total_mains[score >> 24] += p
+        METRIQUES.compter('simulations_session')
+        return Simulateur._resultat((victoires, egalites, stats_mains, total_mains), 'exact')
+
+    def _heatmap(self):
+        """Équité après chaque prochaine carte, au format de Simulateur.calculer_heatmap."""
+        _, tableau_ints, restantes, fins, _, issues, _ = self.donnees
+        if len(tableau_ints) >= 5: return {}
+        gains = [0.0] * len(restantes)
+        poids = [0.0] * len(restantes)
+        for fin, (v, s, p) in zip(fins, issues):
+            for i in fin:
+                gains[i] += p * (v + 0.5 * (s - v))
+                poids[i] += p
+        return {NOMS[INDEX_PAR_CODE[c]]: 100 * g / w for c, g, w in zip(restantes, gains, poids) if w > 0}
+
+
+class GestionnaireSessions:
+    """Sessions par id, oubliées `duree_vie` secondes après leur dernière requête ; au plus
+    `max_sessions` (les moins récemment utilisées partent en premier)."""
+
+    def __init__(self, duree_vie=900, max_sessions=10000):
+        self.duree_vie = duree_vie
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.verrou = threading.Lock()
+
+    def obtenir(self, id_session=None):
+        """La session `id_session`, ou une nouvelle si l'id est absent, inconnu ou expiré."""
+        with self.verrou:
+            self._purger()
+            session = self.sessions.get(id_session) if isinstance(id_session, str) else None
+            if session is None:
+                session = SessionMain()
+                self.sessions[session.id] = session
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            self.sessions.move_to_end(session.id)
+            session.acces = time.monotonic()
+            return session
+
+    def supprimer(self, id_session):
+        with self.verrou:
+            return self.sessions.pop(id_session, None) is not None
+
+    def _purger(self):
+        limite = time.monotonic() - self.duree_vie
+        while self.sessions:
+            id_session, session = next(iter(self.sessions.items()))
+            if session.acces >= limite: break
+            del self.sessions[id_session]
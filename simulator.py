@@ -1,7 +1,41 @@
+import multiprocessing
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
-from card import Carte, Paquet
+from math import comb, factorial, sqrt
+from card import CARTES, INDEX_PAR_CODE, MASQUE_PAQUET, Echantillonneur, masque_cartes
 from evaluator_fast import EvaluateurFast
+from journal import journaliser_avertissement
+from metrics import METRIQUES, memoire_process
+from preflop import PREFLOP_PATH, TablePreflop
+from ranges import Range, range_depuis_texte
+from riviere import IndexRiviere
+from variance import METHODES as METHODES_REDUCTION
+
+try:
+    import numpy as np
+except ImportError:  # Sans NumPy, les simulations restent en boucles Python
+    np = None
+
+# Au-delà de ce nombre d'évaluations, simuler passe de l'énumération exacte à Monte Carlo
+BUDGET_EXACT = 200000
+
+# Méthodes de réduction de variance déjà signalées comme indisponibles (sans NumPy)
+_METHODES_SANS_NUMPY = set()
+
+# Essais d'un lot du mode adaptatif, répartis sur tout le pool ; l'erreur est vérifiée après chaque lot
+LOT_ADAPTATIF = 2000
+
+# Tirages des mains adverses partagés par toutes les cartes candidates de la heatmap
+ESSAIS_HEATMAP = 2000
+
+# Nombre d'essais Monte Carlo traités par appel à EvaluateurFast.evaluer_batch
+ESSAIS_PAR_TRANCHE = 4096
+
+# Taille max (essais x combos) des matrices de tirage conditionnel des ranges
+CELLULES_RANGES = 1 << 22
 
 class Simulateur:
     """Moteur de simulation complet avec Analyse et Heatmap."""
@@ -36,163 +70,603 @@ class Simulateur:
         return alerts
 
     @staticmethod
-    def analyser_tirages(heatmap, win_actuel, total_inconnues):
-        """Regroupe les cartes bénéfiques de manière intelligente et fiable."""
-        tirages = []
-        bonnes_cartes = [c for c, eq in heatmap.items() if eq > (win_actuel + 5)]
-        
-        if not bonnes_cartes: return [], 0
+    def calculer_heatmap(ma_main, tableau, cartes_exclues, profils, essais=ESSAIS_HEATMAP,
+                         budget_exact=BUDGET_EXACT, graine=None, rappel=None):
+        """Équité du héros (victoire + moitié des égalités) si chaque carte possible tombe au prochain tour.
 
-        # Récupérer toutes les cartes testées dans la heatmap pour comparer
-        toutes_testees = list(heatmap.keys())
-        cartes_retenues_global = set()
-        
-        # 1. Analyse par Rang (ex: Les 5)
-        rangs_presents = set(c[0] for c in toutes_testees)
-        for r in rangs_presents:
-            dans_ce_rang = [c for c in toutes_testees if c[0] == r]
-            bons_dans_ce_rang = [c for c in dans_ce_rang if c in bonnes_cartes]
-            
-            # Condition : Au moins 75% du rang doit être bon ET au moins 2 cartes
-            if len(bons_dans_ce_rang) >= 2 and (len(bons_dans_ce_rang) / len(dans_ce_rang)) >= 0.75:
-                nom = f"Un {Carte.NOM_VALEURS.get(r, r)}"
-                prob = (len(bons_dans_ce_rang) / total_inconnues) * 100
-                tirages.append({'nom': nom, 'prob': round(prob, 1), 'type': 'rank'})
-                for c in bons_dans_ce_rang: cartes_retenues_global.add(c)
-
-        # 2. Analyse par Couleur (ex: Les Cœurs)
-        couleurs_presentes = set(c[-1] for c in toutes_testees)
-        for coul in couleurs_presentes:
-            dans_cette_coul = [c for c in toutes_testees if c[-1] == coul]
-            bons_dans_cette_coul = [c for c in dans_cette_coul if c in bonnes_cartes]
-            
-            # Condition : Au moins 75% de la couleur doit être bonne ET au moins 4 cartes
-            if len(bons_dans_cette_coul) >= 4 and (len(bons_dans_cette_coul) / len(dans_cette_coul)) >= 0.75:
-                nom = f"Un {Carte.NOM_COULEURS.get(coul, coul)}"
-                prob = (len(bons_dans_cette_coul) / total_inconnues) * 100
-                tirages.append({'nom': nom, 'prob': round(prob, 1), 'type': 'suit'})
-                for c in bons_dans_cette_coul: cartes_retenues_global.add(c)
-        
-        # Probabilité cumulée réelle (Union de toutes les cartes bénéfiques identifiées)
-        proba_cumulee = (len(cartes_retenues_global) / total_inconnues) * 100
-        
-        return sorted(tirages, key=lambda x: x['prob'], reverse=True), round(proba_cumulee, 1)
+        Le reste du tableau est joué jusqu'à la river. Le calcul est exact si l'énumération tient
+        dans `budget_exact` (typiquement au turn) et que tous les adversaires sont aléatoires ;
+        sinon `essais` tirages des mains adverses (et de la fin du tableau) sont partagés par
+        toutes les cartes candidates (nombres aléatoires communs), ce qui rend les écarts entre
+        cartes significatifs.
 
-    @staticmethod
-    def calculer_heatmap(ma_main, tableau, cartes_exclues, profils):
-        """Estime l'impact de chaque carte future sur l'équité (Multi-joueurs)."""
+        `rappel`, s'il est donné, reçoit la heatmap partielle après chaque tranche d'essais
+        Monte Carlo ; il peut lever une exception pour interrompre le calcul.
+        """
         if len(tableau) >= 5: return {}
         
-        nb_adv = len(profils)
         cartes_connues = list(ma_main) + list(tableau) + list(cartes_exclues)
-        paquet = Paquet()
-        cartes_testables = [c for c in paquet.cartes if not any(c.valeur == ck.valeur and c.couleur == ck.couleur for ck in cartes_connues)]
-        
-        impacts = {}
-        # On réduit les itérations pour garder une interface fluide
-        base_iterations = 150 if nb_adv <= 3 else 80 
-        
-        for carte_future in cartes_testables:
-            tableau_futur = tableau + [carte_future]
-            victoires = 0
-            pool = [c for c in cartes_testables if c != carte_future]
-            
-            # Calcul du score héro une seule fois pour ce tableau futur
-            mon_score = EvaluateurFast.evaluer_7_cartes(ma_main + tableau_futur)[1]
-
-            for _ in range(base_iterations):
-                random.shuffle(pool)
-                idx = 0
-                mains_actives = []
-                for _ in range(nb_adv):
-                    if idx + 2 > len(pool): break
-                    mains_actives.append([pool[idx], pool[idx+1]])
-                    idx += 2
-                
-                gagne = True
-                partage = False
-                for m_adv in mains_actives:
-                    adv_score = EvaluateurFast.evaluer_7_cartes(m_adv + tableau_futur)[1]
-                    if adv_score > mon_score:
-                        gagne = False
-                        break
-                    elif adv_score == mon_score:
-                        partage = True
-                
-                if gagne:
-                    victoires += 1 if not partage else 0.5
-            
-            equite = (victoires / base_iterations) * 100
-            impacts[repr(carte_future)] = equite
-            
-        return impacts
+        cartes_testables = Simulateur._cartes_vivantes(masque_cartes(cartes_connues))
+        situation = Simulateur._situation(ma_main, tableau, cartes_testables, profils)
+        en_dict = lambda gains, comptes: {repr(c): (g / n) * 100 for c, g, n in zip(cartes_testables, gains, comptes) if n > 0}
+        partiel = (lambda gains, comptes: rappel(en_dict(gains, comptes))) if rappel is not None else None
+        return en_dict(*Simulateur._heatmap_compteurs(situation, essais, budget_exact, graine, partiel))
+
+    @staticmethod
+    def _heatmap_compteurs(situation, essais, budget_exact=BUDGET_EXACT, graine=None, rappel=None):
+        """Pour chaque carte de restantes : (gains, nombre de situations) quand elle tombe au prochain tour.
+
+        gains compte 1 par victoire et 0,5 par égalité. Avec des ranges adverses, chaque essai
+        compte pour son poids d'importance (voir _tirer_ranges).
+        """
+        main_ints, tableau_ints, restantes, nb_adv, ranges = situation
+        cartes_a_venir = 5 - len(tableau_ints)
+        gains = [0.0] * len(restantes)
+        comptes = [0] * len(restantes)
+
+        if not ranges and budget_exact and Simulateur.cout_exact(len(restantes), cartes_a_venir, nb_adv) <= budget_exact:
+            # Chaque fin de tableau contient la prochaine carte : par symétrie, l'équité d'une carte
+            # est la moyenne des fins de tableau qui la contiennent
+            details = Simulateur._simuler_exact(*situation[:4], par_tirage=True)[4]
+            for tirage, v, e, poids in details:
+                for i in tirage:
+                    gains[i] += v + 0.5 * e
+                    comptes[i] += poids
+            return gains, comptes
+
+        if np is not None:
+            return Simulateur._heatmap_vectorisee(situation, essais, graine, rappel)
+
+        # Repli Python : nombres aléatoires communs, états partiels partagés par toutes les candidates
+        essais = max(1, essais // 5)
+        suite = cartes_a_venir - 1
+        alea = random.Random(graine)
+        ech = Echantillonneur(MASQUE_PAQUET & ~Simulateur._masque_codes(restantes), alea)
+        nb_adv = min(nb_adv, (ech.n - 1 - suite - 2 * len(ranges)) // 2)
+        a_tirer = 2 * nb_adv + suite
+        index = {c: i for i, c in enumerate(restantes)}
+        METRIQUES.compter('essais_heatmap', essais)
+        METRIQUES.compter('evaluations', essais * len(restantes) * (1 + nb_adv + len(ranges)))
+        for essai in range(essais):
+            poids, mains_r = Simulateur._tirer_ranges(ranges, alea)
+            if not poids: continue
+            ech.restaurer()
+            ech.exclure(c for main in mains_r for c in main)
+            ech.melanger_partiel(a_tirer)
+            tires = ech.cartes[:a_tirer]
+            fin = tableau_ints + tires[2 * nb_adv:]
+            etat_heros = EvaluateurFast.etat_partiel(main_ints + fin)
+            etats_adv = [EvaluateurFast.etat_partiel(list(main) + fin) for main in mains_r]
+            etats_adv += [EvaluateurFast.etat_partiel(tires[2 * k:2 * k + 2] + fin) for k in range(nb_adv)]
+            exclues = {index[c] for c in tires}
+            exclues.update(index[c] for main in mains_r for c in main)
+            for i, carte in enumerate(restantes):
+                if i in exclues: continue
+                mon_score = EvaluateurFast.evaluer_complement(etat_heros, carte)
+                meilleur = max((EvaluateurFast.evaluer_complement(e, carte) for e in etats_adv), default=-1)
+                comptes[i] += poids
+                if meilleur < mon_score: gains[i] += poids
+                elif meilleur == mon_score: gains[i] += 0.5 * poids
+            if rappel is not None and (essai + 1) % 50 == 0:
+                rappel(gains, comptes)
+        return gains, comptes
+
+    @staticmethod
+    def _heatmap_vectorisee(situation, essais, graine=None, rappel=None):
+        """Heatmap par nombres aléatoires communs, vectorisée.
+
+        Chaque essai tire les mains adverses et la fin du tableau une seule fois ; leurs états
+        partiels (produit, couleurs, masques) sont combinés avec chaque carte candidate, qui
+        n'ajoute qu'une carte. Un essai ne compte pas pour les candidates qu'il a tirées.
+        """
+        main_ints, tableau_ints, restantes, nb_adv, ranges = situation
+        rng = np.random.default_rng(graine)
+        pool = np.array(restantes, dtype=np.int64)
+        nb_cand = len(pool)
+        suite = 4 - len(tableau_ints)
+        nb_adv = min(nb_adv, (nb_cand - 1 - suite - 2 * len(ranges)) // 2)
+        nb_joueurs = nb_adv + len(ranges)
+        a_tirer = 2 * nb_adv + suite
+        tableau_np = np.array(tableau_ints, dtype=np.int64)
+        METRIQUES.compter('essais_heatmap', essais)
+        METRIQUES.compter('evaluations', essais * nb_cand * (1 + nb_joueurs))
+        if ranges:
+            tables = [r.tableaux_numpy() for r in ranges]
+            bits = Simulateur._bits_codes(restantes)
+
+        def etendre(etat, idx):
+            return etat[0][idx], etat[1][idx], etat[2][idx + (slice(None),)]
+
+        candidates = EvaluateurFast.etat_batch(pool[:, None])
+        etat_main = EvaluateurFast.etat_batch(np.array(main_ints + tableau_ints, dtype=np.int64))
+        gains = np.zeros(nb_cand)
+        comptes = np.zeros(nb_cand, dtype=np.float64 if ranges else np.int64)
+
+        tranche = max(1, 200000 // (nb_cand * max(1, nb_joueurs)))
+        if rappel is not None:
+            # Tranches plus courtes pour publier des résultats partiels
+            tranche = max(1, min(tranche, essais // 8))
+        for debut in range(0, essais, tranche):
+            t = min(tranche, essais - debut)
+            cles = rng.random((t, nb_cand))
+            valide = np.ones((t, nb_cand), dtype=bool)
+            if ranges:
+                mains_r, utilisees, poids = Simulateur._tirer_ranges_vectorise(tables, t, rng)
+                occupees = (utilisees[:, None] & bits) != 0
+                cles[occupees] = 2.0
+                valide &= ~occupees
+            idx = np.argsort(cles, axis=1)[:, :a_tirer]
+            tirage = pool[idx]
+            valide[np.arange(t)[:, None], idx] = False
+
+            fin = tirage[:, 2 * nb_adv:]
+            etat_fin = EvaluateurFast.etat_batch(fin)
+            heros = EvaluateurFast.combiner_etats(
+                etendre(EvaluateurFast.combiner_etats(etat_main, etat_fin), (slice(None), None)),
+                etendre(candidates, (None, slice(None))))
+            mon_score = EvaluateurFast.evaluer_etat_batch(heros)
+
+            if nb_joueurs:
+                privees = tirage[:, :2 * nb_adv].reshape(t, nb_adv, 2)
+                if ranges:
+                    privees = np.concatenate([mains_r, privees], axis=1)
+                mains_adv = np.concatenate([
+                    privees,
+                    np.broadcast_to(tableau_np, (t, nb_joueurs, len(tableau_np))),
+                    np.broadcast_to(fin[:, None, :], (t, nb_joueurs, suite)),
+                ], axis=2)
+                advs = EvaluateurFast.combiner_etats(
+                    etendre(EvaluateurFast.etat_batch(mains_adv), (slice(None), None, slice(None))),
+                    etendre(candidates, (None, slice(None), None)))
+                meilleur = EvaluateurFast.evaluer_etat_batch(advs).max(axis=2)
+            else:
+                meilleur = np.full((t, nb_cand), -1)
+
+            resultat = ((meilleur < mon_score) & valide) + 0.5 * ((meilleur == mon_score) & valide)
+            if ranges:
+                gains += (poids[:, None] * resultat).sum(axis=0)
+                comptes += (poids[:, None] * valide).sum(axis=0)
+            else:
+                gains += resultat.sum(axis=0)
+                comptes += valide.sum(axis=0)
+            if rappel is not None and debut + t < essais:
+                rappel(gains.tolist(), comptes.tolist())
+        return gains.tolist(), comptes.tolist()
+
+    @staticmethod
+    def _masque_codes(codes):
+        """Masque 64 bits d'une liste de codes bit_value."""
+        masque = 0
+        for code in codes:
+            masque |= 1 << INDEX_PAR_CODE[code]
+        return masque
+
+    @staticmethod
+    def _bits_codes(codes):
+        """Bit (masque 64 bits) de chaque code, en tableau NumPy uint64."""
+        return np.array([1 << INDEX_PAR_CODE[code] for code in codes], dtype=np.uint64)
+
+    @staticmethod
+    def _situation(ma_main, tableau, cartes_restantes, profils, range_heros=None):
+        """(main_ints, tableau_ints, restantes_ints, nb_aleatoires, ranges) pour les moteurs.
+
+        Les profils aléatoires ('any', 'random'...) ne comptent que pour nb_aleatoires ; les
+        autres sont analysés comme des ranges (voir ranges.Range), dont on retire d'avance les
+        combos qui touchent une carte connue. Avec `range_heros` (et ma_main vide), la range
+        du héros est la première des ranges.
+        """
+        masque_mortes = MASQUE_PAQUET & ~masque_cartes(cartes_restantes)
+        textes = [p for p in profils if not Range.est_aleatoire(p)]
+        nb_aleatoires = len(profils) - len(textes)
+        if range_heros is not None:
+            textes.insert(0, range_heros)
+        ranges = []
+        for texte in textes:
+            preparee = range_depuis_texte(texte).preparer(masque_mortes)
+            if not len(preparee):
+                raise ValueError(f"Aucun combo de la range {texte!r} n'est compatible avec les cartes connues")
+            ranges.append(preparee)
+        return ([c.bit_value for c in ma_main], [c.bit_value for c in tableau],
+                [c.bit_value for c in cartes_restantes], nb_aleatoires, tuple(ranges))
+
+    @staticmethod
+    def _tirer_ranges(ranges, rng):
+        """Tire une main par range, dans l'ordre, parmi les combos compatibles avec les précédentes.
+
+        Ce tirage séquentiel n'est pas la loi jointe des mains : on le corrige par le poids
+        d'importance retourné, produit des poids vivants de chaque range au moment de son tirage.
+        Retourne (poids, [(c1, c2), ...]) ; poids 0 si une range n'a plus de combo possible.
+        """
+        poids = 1.0
+        mains = []
+        utilisees = 0
+        for r in ranges:
+            k, vivant = r.tirer(utilisees, rng)
+            if k < 0: return 0.0, mains
+            mains.append(r.codes[k])
+            utilisees |= r.masques[k]
+            poids *= vivant
+        return poids, mains
+
+    @staticmethod
+    def _tirer_ranges_vectorise(tables, n, rng):
+        """Version vectorisée de _tirer_ranges pour n essais.
+
+        `tables` contient les tableaux_numpy() de chaque range. Retourne (mains (n, nb_ranges, 2),
+        masques des cartes utilisées (n,) et poids d'importance (n,)).
+        """
+        mains = np.empty((n, len(tables), 2), dtype=np.int64)
+        utilisees = np.zeros(n, dtype=np.uint64)
+        poids = np.ones(n)
+        for r, (codes, masques, poids_combos) in enumerate(tables):
+            vivants = np.where((masques[None, :] & utilisees[:, None]) != 0, 0.0, poids_combos[None, :])
+            cumul = np.cumsum(vivants, axis=1)
+            total = cumul[:, -1]
+            # Premier combo dont le cumul dépasse la cible : jamais un combo en conflit (poids nul)
+            k = np.minimum((cumul <= (rng.random(n) * total)[:, None]).sum(axis=1), len(poids_combos) - 1)
+            mains[:, r] = codes[k]
+            utilisees |= masques[k]
+            poids *= total
+        return mains, utilisees, poids
+
+    @staticmethod
+    def _taille_effective(victoires, egalites, stats_mains, total_mains, somme_carres):
+        """Ramène des compteurs pondérés à la taille d'échantillon effective (somme w)² / somme w².
+
+        Les proportions ne changent pas ; sum(total_mains) devient la taille effective, ce qui
+        garde des erreurs standard honnêtes quand les poids d'importance sont inégaux.
+        """
+        if somme_carres <= 0:
+            return 0, 0, [0] * 9, [0] * 9
+        f = sum(total_mains) / somme_carres
+        return victoires * f, egalites * f, [s * f for s in stats_mains], [t * f for t in total_mains]
 
     @staticmethod
     def calculer_outs(ma_main, tableau, cartes_exclues):
         if len(tableau) >= 5: return []
         cartes_connues = list(ma_main) + list(tableau) + list(cartes_exclues)
-        paquet = Paquet()
-        paquet.cartes = [c for c in paquet.cartes if not any(c.valeur == ck.valeur and c.couleur == ck.couleur for ck in cartes_connues)]
+        cartes_testables = Simulateur._cartes_vivantes(masque_cartes(cartes_connues))
         
         score_actuel = EvaluateurFast.evaluer_7_cartes(ma_main + tableau)
+        main_ints = [c.bit_value for c in list(ma_main) + list(tableau)] + [0]
         outs = []
-        for carte_test in paquet.cartes:
-            nouveau_score = EvaluateurFast.evaluer_7_cartes(ma_main + tableau + [carte_test])
-            if nouveau_score[1] > score_actuel[1]:
+        METRIQUES.compter('evaluations', len(cartes_testables) + 1)
+        for carte_test in cartes_testables:
+            main_ints[-1] = carte_test.bit_value
+            if len(main_ints) >= 5 and EvaluateurFast.evaluer_7_ints(main_ints) > score_actuel[1]:
                 outs.append(carte_test)
         return outs
 
     @staticmethod
-    def simuler(ma_main, tableau, profils, cartes_exclues=None, iterations=10000):
-        victoires = 0
-        egalites = 0
-        stats_mains = [0] * 9
-        total_mains = [0] * 9
+    def _cartes_vivantes(masque_connues):
+        """Cartes absentes du masque 64 bits, dans l'ordre des index 0-51."""
+        return [c for c in CARTES if not (masque_connues >> c.index) & 1]
+
+    @staticmethod
+    def simuler(ma_main, tableau, profils, cartes_exclues=None, iterations=10000, budget_exact=BUDGET_EXACT,
+                processus=1, graine=None, erreur_cible=None, budget_temps=None, utiliser_tables=True, methode='standard'):
+        """Équité du héros contre len(profils) adversaires (aléatoires ou ranges).
+
+        Retourne (prob_victoire, prob_egalite, {}, repartition_absolue) ; voir simuler_detail
+        pour les paramètres et pour obtenir les barres d'erreur.
+        """
+        res = Simulateur.simuler_detail(ma_main, tableau, profils, cartes_exclues, iterations, budget_exact,
+                                        processus, graine, erreur_cible, budget_temps, utiliser_tables,
+                                        methode=methode)
+        return res['win'], res['tie'], {}, res['repartition']
+
+    @staticmethod
+    def simuler_detail(ma_main, tableau, profils, cartes_exclues=None, iterations=10000, budget_exact=BUDGET_EXACT,
+                       processus=1, graine=None, erreur_cible=None, budget_temps=None, utiliser_tables=True,
+                       rappel=None, methode='standard'):
+        """Équité du héros avec ses barres d'erreur.
+
+        Si l'énumération exhaustive coûte au plus `budget_exact` évaluations (voir cout_exact),
+        le résultat est exact ; sinon des essais Monte Carlo sont joués, répartis sur
+        `processus` process si > 1. Avec une `graine`, le résultat est reproductible
+        (pour un même nombre de process).
+
+        Sans `erreur_cible` ni `budget_temps`, exactement `iterations` essais sont joués.
+        Sinon les essais sont joués par lots jusqu'à ce que l'erreur standard de la victoire
+        et de l'égalité (en points de %) passe sous `erreur_cible`, que `budget_temps`
+        secondes soient écoulées, ou que `iterations` (maximum) soit atteint. Dans ce mode,
+        `rappel` reçoit après chaque lot le résultat partiel (même format que le retour) ; il
+        peut lever une exception pour interrompre le calcul.
+
+        Chaque profil est 'any' (main aléatoire) ou une range texte ("QQ+, AKs, T9s-65s", voir
+        ranges.Range). Avec au moins une range, le calcul est toujours Monte Carlo : les mains
+        des ranges sont tirées sans rejet parmi les combos compatibles et chaque essai est
+        pondéré ; `taille_effective` du résultat est alors la taille d'échantillon effective
+        (somme des poids)² / somme des poids², `iterations` restant le nombre d'essais joués.
+
+        Préflop, sans cartes exclues et contre 1 à 9 adversaires aléatoires, la réponse vient de
+        la table pré-calculée (mode 'table') si `utiliser_tables` est vrai. De même au turn et
+        à la river contre 1 ou 2 adversaires aléatoires, si l'index des tableaux de river
+        (riviere.py) a été construit : le résultat est alors exact (mode 'index').
+
+        `methode` choisit l'échantillonnage Monte Carlo : 'standard', ou une méthode de réduction
+        de variance de variance.py ('stratifie', 'quasi', 'controle'), jouée
+        dans le process courant ; avec des ranges ou sans NumPy, l'échantillonnage reste 'standard'.
+
+        Retourne un dict : win, tie, loss, repartition, mode ('exact', 'index', 'table',
+        'monte_carlo' ou 'adaptatif'), methode, iterations, taille_effective (essais Monte Carlo
+        standard de même précision), erreur_win, erreur_tie (erreurs standard) et ic95_win.
+        """
         if cartes_exclues is None: cartes_exclues = []
+        if methode != 'standard' and methode not in METHODES_REDUCTION:
+            raise ValueError(f"Méthode d'échantillonnage inconnue : {methode!r}")
+        if methode != 'standard' and np is None:
+            Simulateur._avertir_sans_numpy(methode)
+            methode = 'standard'
+
+        if utiliser_tables and not tableau and not cartes_exclues and all(Range.est_aleatoire(p) for p in profils):
+            res = TablePreflop.consulter(ma_main, len(profils))
+            if res is not None:
+                METRIQUES.compter('simulations_table')
+                return res
         
         cartes_connues = list(ma_main) + list(tableau) + list(cartes_exclues)
-        paquet_base = Paquet()
-        cartes_restantes = [c for c in paquet_base.cartes if not any(c.valeur == ck.valeur and c.couleur == ck.couleur for ck in cartes_connues)]
+        cartes_restantes = Simulateur._cartes_vivantes(masque_cartes(cartes_connues))
         
-        nb_adv = len(profils)
         cartes_a_venir = 5 - len(tableau)
-        iterations_reelles = 20000 if iterations == 5000 else iterations 
-        
-        for _ in range(iterations_reelles):
-            random.shuffle(cartes_restantes)
-            idx = 0
-            mains_actives = []
-            
-            for _ in profils:
-                if idx + 2 > len(cartes_restantes): break
-                mains_actives.append([cartes_restantes[idx], cartes_restantes[idx+1]])
-                idx += 2
-
-            tableau_simu = list(tableau)
-            for _ in range(cartes_a_venir):
-                tableau_simu.append(cartes_restantes[idx])
-                idx += 1
-            
-            mon_res = EvaluateurFast.evaluer_7_cartes(ma_main + tableau_simu)
-            mon_score_total = mon_res[1]
-            mon_type = mon_res[0]
-            
-            gagne = True
-            partage = False
-            for m_adv in mains_actives:
-                adv_res = EvaluateurFast.evaluer_7_cartes(m_adv + tableau_simu)
-                if adv_res[1] > mon_score_total:
-                    gagne = False
-                    break
-                elif adv_res[1] == mon_score_total:
-                    partage = True
-            
-            total_mains[mon_type] += 1
-            if gagne:
-                if partage: egalites += 1
-                else:
-                    victoires += 1
-                    stats_mains[mon_type] += 1
+        situation = Simulateur._situation(ma_main, tableau, cartes_restantes, profils)
+        nb_adv, ranges = situation[3], situation[4]
+
+        # Index, énumération exacte et réduction de variance supposent un héros à deux cartes
+        main_complete = len(ma_main) == 2
+        compteurs = None
+        if utiliser_tables and main_complete and not ranges and len(tableau) >= 4:
+            compteurs = IndexRiviere.compteurs([c.index for c in ma_main], [c.index for c in tableau],
+                                               [c.index for c in cartes_exclues], nb_adv)
+        if compteurs is not None:
+            mode = 'index'
+        elif main_complete and not ranges and budget_exact and Simulateur.cout_exact(len(cartes_restantes), cartes_a_venir, nb_adv) <= budget_exact:
+            mode = 'exact'
+            compteurs = Simulateur._simuler_exact(*situation[:4])
+        elif methode != 'standard' and main_complete and not ranges:
+            mode = 'adaptatif' if erreur_cible or budget_temps else 'monte_carlo'
+            METRIQUES.compter(f'simulations_{mode}')
+            return Simulateur._simuler_reduit(situation, methode, iterations, mode, erreur_cible, budget_temps, graine,
+                                              rappel)
+        elif erreur_cible or budget_temps:
+            mode = 'adaptatif'
+            compteurs, iterations = Simulateur._simuler_adaptatif(situation, iterations, erreur_cible, budget_temps,
+                                                                  processus, graine, rappel)
+        elif processus > 1:
+            mode = 'monte_carlo'
+            compteurs = Simulateur._simuler_parallele(situation, iterations, processus, graine)
+        else:
+            mode = 'monte_carlo'
+            compteurs = Simulateur._simuler_monte_carlo(situation, iterations, graine)
+        METRIQUES.compter(f'simulations_{mode}')
+        return Simulateur._resultat(compteurs, mode, iterations)
+
+    @staticmethod
+    def _avertir_sans_numpy(methode):
+        """Avertit (une fois par process et par méthode) que `methode` est remplacée par 'standard'."""
+        if methode in _METHODES_SANS_NUMPY: return
+        _METHODES_SANS_NUMPY.add(methode)
+        journaliser_avertissement('reduction_variance_indisponible', methode=methode, remplacee_par='standard',
+                                  raison="NumPy absent")
+
+    @staticmethod
+    def _simuler_reduit(situation, methode, iterations, mode, erreur_cible=None, budget_temps=None, graine=None,
+                        rappel=None):
+        """Essais par lots d'une méthode de réduction de variance (voir variance.py).
+
+        Les critères d'arrêt sont ceux de _simuler_adaptatif, appliqués à l'erreur estimée par
+        la méthode ; sans erreur_cible ni budget_temps, `iterations` essais sont joués.
+        """
+        debut = time.perf_counter()
+        echantillonnage = METHODES_REDUCTION[methode](situation, graine)
+        lot = LOT_ADAPTATIF if mode == 'adaptatif' else ESSAIS_PAR_TRANCHE
+        while echantillonnage.joues < iterations:
+            n = min(lot, iterations - echantillonnage.joues)
+            Simulateur._compter_essais(situation, n)
+            echantillonnage.lot(n)
+            if mode != 'adaptatif': continue
+            resultat = Simulateur._resultat_reduit(echantillonnage, mode)
+            if rappel is not None:
+                rappel(resultat)
+            if erreur_cible and max(resultat['erreur_win'], resultat['erreur_tie']) <= erreur_cible:
+                break
+            if budget_temps and time.perf_counter() - debut >= budget_temps:
+                break
+        return Simulateur._resultat_reduit(echantillonnage, mode)
+
+    @staticmethod
+    def _resultat_reduit(echantillonnage, mode):
+        """Dict de simuler_detail à partir d'une méthode de réduction de variance."""
+        win, tie, var_win, var_tie = echantillonnage.estimation()
+        erreur_win = sqrt(var_win) * 100
+        return {
+            'win': win * 100,
+            'tie': tie * 100,
+            'loss': max(0.0, 100 - (win + tie) * 100),
+            'repartition': {EvaluateurFast.RANGS_MAINS[i]: f * 100
+                            for i, f in enumerate(echantillonnage.repartition().tolist()) if f > 0},
+            'mode': mode,
+            'methode': echantillonnage.nom,
+            'iterations': echantillonnage.joues,
+            'taille_effective': echantillonnage.taille_effective(),
+            'erreur_win': erreur_win,
+            'erreur_tie': sqrt(var_tie) * 100,
+            'ic95_win': 1.96 * erreur_win,
+        }
+
+    @staticmethod
+    def simuler_range_detail(range_heros, tableau, profils, cartes_exclues=None, iterations=10000, processus=1,
+                             graine=None, erreur_cible=None, budget_temps=None, rappel=None):
+        """Équité d'une range du héros contre les profils adverses (range contre ranges).
+
+        La main du héros est tirée dans sa range à chaque essai, avant les ranges adverses.
+        Mêmes paramètres et même format de retour que simuler_detail (toujours Monte Carlo).
+        """
+        if cartes_exclues is None: cartes_exclues = []
+        cartes_restantes = Simulateur._cartes_vivantes(masque_cartes(list(tableau) + list(cartes_exclues)))
+        # Main du héros vide : les moteurs prennent la première range comme main du héros
+        situation = Simulateur._situation([], tableau, cartes_restantes, profils, range_heros)
+
+        if erreur_cible or budget_temps:
+            mode = 'adaptatif'
+            compteurs, iterations = Simulateur._simuler_adaptatif(situation, iterations, erreur_cible, budget_temps,
+                                                                  processus, graine, rappel)
+        elif processus > 1:
+            mode = 'monte_carlo'
+            compteurs = Simulateur._simuler_parallele(situation, iterations, processus, graine)
+        else:
+            mode = 'monte_carlo'
+            compteurs = Simulateur._simuler_monte_carlo(situation, iterations, graine)
+        METRIQUES.compter(f'simulations_{mode}')
+        return Simulateur._resultat(compteurs, mode, iterations)
+
+    @staticmethod
+    def simuler_joueurs(joueurs, tableau, cartes_exclues=None, iterations=10000, graine=None):
+        """Parts de pot de chaque joueur au showdown, toutes les mains classées ensemble.
+
+        `joueurs` donne pour chaque joueur une main connue (2 Carte) ou un profil ('any' ou
+        range texte, pondérée comme dans simuler_detail). Chaque essai tire les ranges, les
+        mains aléatoires et la fin du tableau, évalue tous les joueurs sur l'état du tableau
+        final puis partage le pot à parts égales entre les meilleures mains.
+
+        Retourne {'joueurs': [{'win', 'tie', 'equite'}, ...], 'iterations'} : win (seul
+        gagnant), tie (pot partagé) et equite (part de pot moyenne) en %, dans l'ordre de
+        `joueurs` ; avec des ranges, iterations est la taille d'échantillon effective. Une carte
+        présente deux fois (mains, tableau, cartes exclues) lève ValueError.
+        """
+        if cartes_exclues is None: cartes_exclues = []
+        connues = [list(j) for j in joueurs if not isinstance(j, str)]
+        profils = [j for j in joueurs if isinstance(j, str)]
+        if any(len(main) != 2 for main in connues):
+            raise ValueError("Une main connue doit contenir 2 cartes")
+        cartes_connues = [c for main in connues for c in main] + list(tableau) + list(cartes_exclues)
+        masque_connues = masque_cartes(cartes_connues)
+        if bin(masque_connues).count('1') != len(cartes_connues):
+            raise ValueError("Carte en double")
+        cartes_restantes = Simulateur._cartes_vivantes(masque_connues)
+        situation = Simulateur._situation([], tableau, cartes_restantes, profils)
+
+        # Origine de la main de chaque joueur : ('connue', codes), ('range', r) ou ('aleatoire', k)
+        origines = []
+        nb_r = nb_a = 0
+        for j in joueurs:
+            if not isinstance(j, str):
+                origines.append(('connue', tuple(c.bit_value for c in j)))
+            elif Range.est_aleatoire(j):
+                origines.append(('aleatoire', nb_a))
+                nb_a += 1
+            else:
+                origines.append(('range', nb_r))
+                nb_r += 1
+
+        Simulateur._compter_essais(situation, iterations)
+        if np is not None:
+            victoires, egalites, parts, poids, somme_carres = Simulateur._showdown_vectorise(
+                situation, origines, iterations, graine)
+        else:
+            victoires, egalites, parts, poids, somme_carres = Simulateur._showdown_boucle(
+                situation, origines, iterations, graine)
+        pourcent = lambda x: (x / poids * 100) if poids > 0 else 0.0
+        return {
+            'joueurs': [{'win': pourcent(v), 'tie': pourcent(e), 'equite': pourcent(p)}
+                        for v, e, p in zip(victoires, egalites, parts)],
+            'iterations': (poids * poids / somme_carres) if situation[4] and somme_carres else poids,
+        }
+
+    @staticmethod
+    def _showdown_vectorise(situation, origines, iterations, graine=None):
+        """simuler_joueurs par tranches NumPy. Retourne (victoires, egalites, parts, poids total, somme des carrés)."""
+        _, tableau_ints, restantes, nb_adv, ranges = situation
+        rng = np.random.default_rng(graine)
+        bits = Simulateur._bits_codes(restantes) if ranges else None
+        restantes = np.array(restantes, dtype=np.int64)
+        tableau_ints = np.array(tableau_ints, dtype=np.int64)
+        cartes_a_venir = 5 - len(tableau_ints)
+        a_tirer = 2 * nb_adv + cartes_a_venir
+        if len(restantes) - 2 * len(ranges) < a_tirer:
+            raise ValueError("Pas assez de cartes pour tous les joueurs")
+        nb_joueurs = len(origines)
+        victoires = np.zeros(nb_joueurs)
+        egalites = np.zeros(nb_joueurs)
+        parts = np.zeros(nb_joueurs)
+        total = somme_carres = 0.0
+        tranche = ESSAIS_PAR_TRANCHE
+        if ranges:
+            tables = [r.tableaux_numpy() for r in ranges]
+            tranche = max(1, min(tranche, CELLULES_RANGES // max(len(r) for r in ranges)))
+
+        for debut in range(0, iterations, tranche):
+            n = min(tranche, iterations - debut)
+            cles = rng.random((n, len(restantes)))
+            poids = np.ones(n)
+            if ranges:
+                mains_r, utilisees, poids = Simulateur._tirer_ranges_vectorise(tables, n, rng)
+                cles[(utilisees[:, None] & bits) != 0] = 2.0
+            tirage = restantes[np.argsort(cles, axis=1)[:, :a_tirer]]
+            tableaux = np.hstack([np.broadcast_to(tableau_ints, (n, len(tableau_ints))), tirage[:, 2 * nb_adv:]])
+            mains = np.empty((n, nb_joueurs, 2), dtype=np.int64)
+            for j, (origine, valeur) in enumerate(origines):
+                if origine == 'connue': mains[:, j] = valeur
+                elif origine == 'range': mains[:, j] = mains_r[:, valeur]
+                else: mains[:, j] = tirage[:, 2 * valeur:2 * valeur + 2]
+
+            scores = EvaluateurFast.evaluer_joueurs_batch(tableaux, mains)
+            gagnants = scores == scores.max(axis=1, keepdims=True)
+            nb_gagnants = gagnants.sum(axis=1, keepdims=True)
+            victoires += poids @ (gagnants & (nb_gagnants == 1))
+            egalites += poids @ (gagnants & (nb_gagnants > 1))
+            parts += poids @ (gagnants / nb_gagnants)
+            total += float(poids.sum())
+            somme_carres += float((poids * poids).sum())
+        return victoires.tolist(), egalites.tolist(), parts.tolist(), total, somme_carres
+
+    @staticmethod
+    def _showdown_boucle(situation, origines, iterations, graine=None):
+        """Repli Python de _showdown_vectorise."""
+        _, tableau_ints, restantes, nb_adv, ranges = situation
+        alea = random.Random(graine)
+        ech = Echantillonneur(MASQUE_PAQUET & ~Simulateur._masque_codes(restantes), alea)
+        cartes = ech.cartes
+        cartes_a_venir = 5 - len(tableau_ints)
+        if ech.n - 2 * len(ranges) < 2 * nb_adv + cartes_a_venir:
+            raise ValueError("Pas assez de cartes pour tous les joueurs")
+        pos = len(tableau_ints)
+        tableau = list(tableau_ints) + [0] * cartes_a_venir
+        nb_joueurs = len(origines)
+        victoires = [0.0] * nb_joueurs
+        egalites = [0.0] * nb_joueurs
+        parts = [0.0] * nb_joueurs
+        total = somme_carres = 0.0
+        poids = 1.0
+        tirees = []
+
+        for _ in range(iterations):
+            if ranges:
+                poids, tirees = Simulateur._tirer_ranges(ranges, alea)
+                if not poids: continue
+                ech.restaurer()
+                ech.exclure(c for main in tirees for c in main)
+            ech.melanger_partiel(2 * nb_adv + cartes_a_venir)
+            tableau[pos:] = cartes[2 * nb_adv:2 * nb_adv + cartes_a_venir]
+            mains = [valeur if origine == 'connue' else tirees[valeur] if origine == 'range'
+                     else (cartes[2 * valeur], cartes[2 * valeur + 1]) for origine, valeur in origines]
+
+            scores = EvaluateurFast.evaluer_joueurs(EvaluateurFast.etat_tableau(tableau), mains)
+            meilleur = max(scores)
+            gagnants = [j for j, s in enumerate(scores) if s == meilleur]
+            for j in gagnants:
+                parts[j] += poids / len(gagnants)
+                if len(gagnants) == 1: victoires[j] += poids
+                else: egalites[j] += poids
+            total += poids
+            somme_carres += poids * poids
+        return victoires, egalites, parts, total, somme_carres
+
+    @staticmethod
+    def _resultat(compteurs, mode, joues=None):
+        """Dict de simuler_detail à partir des compteurs d'un moteur et du nombre d'essais joués
+        (par défaut sum(total_mains), qui est la taille effective avec des ranges)."""
+        victoires, egalites, stats_mains, total_mains = compteurs
                 
         total_played = sum(total_mains)
         prob_victoire = (victoires / total_played * 100) if total_played > 0 else 0
@@ -203,5 +677,463 @@ class Simulateur:
             for i, count in enumerate(total_mains):
                 if count > 0:
                     repartition_absolue[EvaluateurFast.RANGS_MAINS[i]] = (count / total_played) * 100
+
+        exact = mode in ('exact', 'index')
+        if exact:
+            erreur_win = erreur_tie = 0.0
+        else:
+            erreur_win = Simulateur._erreur_standard(victoires, total_played)
+            erreur_tie = Simulateur._erreur_standard(egalites, total_played)
         
-        return prob_victoire, prob_egalite, {}, repartition_absolue
+        return {
+            'win': prob_victoire,
+            'tie': prob_egalite,
+            'loss': max(0.0, 100 - prob_victoire - prob_egalite),
+            'repartition': repartition_absolue,
+            'mode': mode,
+            'methode': 'standard',
+            'iterations': 0 if exact else round(total_played if joues is None else joues),
+            'taille_effective': 0 if exact else total_played,
+            'erreur_win': erreur_win,
+            'erreur_tie': erreur_tie,
+            'ic95_win': 1.96 * erreur_win,
+        }
+
+    @staticmethod
+    def _erreur_standard(succes, n):
+        """Erreur standard (en points de %) d'une proportion estimée sur n essais."""
+        if n <= 0: return 100.0
+        p = succes / n
+        return sqrt(p * (1 - p) / n) * 100
+
+    @staticmethod
+    def _simuler_adaptatif(situation, iterations_max, erreur_cible, budget_temps, processus=1, graine=None, rappel=None):
+        """Joue des lots de LOT_ADAPTATIF essais jusqu'à atteindre l'erreur cible ou le budget de temps.
+        Retourne (compteurs, essais joués).
+
+        Avec plusieurs process, chaque lot est réparti sur le pool : la cible est vérifiée tous
+        les LOT_ADAPTATIF essais quel que soit le nombre de process. Le pool est démarré (voir
+        prechauffer) avant de compter le temps : son démarrage n'entame pas `budget_temps`.
+        """
+        if processus > 1 and not _pool_pret(processus):
+            prechauffer(processus)
+        debut = time.perf_counter()
+        maitre = random.Random(graine)
+        victoires = egalites = joues = 0
+        stats_mains = [0] * 9
+        total_mains = [0] * 9
+
+        while joues < iterations_max:
+            lot = min(LOT_ADAPTATIF, iterations_max - joues)
+            graine_lot = maitre.getrandbits(64)
+            if processus > 1:
+                v, e, stats, totaux = Simulateur._simuler_parallele(situation, lot, processus, graine_lot)
+            else:
+                v, e, stats, totaux = Simulateur._simuler_monte_carlo(situation, lot, graine_lot)
+            victoires += v
+            egalites += e
+            stats_mains = [a + b for a, b in zip(stats_mains, stats)]
+            total_mains = [a + b for a, b in zip(total_mains, totaux)]
+            joues += lot
+            if rappel is not None:
+                rappel(Simulateur._resultat((victoires, egalites, stats_mains, total_mains), 'adaptatif', joues))
+
+            # Avec des ranges, sum(total_mains) est la taille effective (< joues)
+            n = sum(total_mains)
+            if erreur_cible and max(Simulateur._erreur_standard(victoires, n),
+                                    Simulateur._erreur_standard(egalites, n)) <= erreur_cible:
+                break
+            if budget_temps and time.perf_counter() - debut >= budget_temps:
+                break
+
+        return (victoires, egalites, stats_mains, total_mains), joues
+
+    @staticmethod
+    def _simuler_monte_carlo(situation, iterations, graine=None):
+        """Monte Carlo dans le process courant (vectorisé si NumPy est disponible)."""
+        Simulateur._compter_essais(situation, iterations)
+        if np is not None and len(situation[0]) in (0, 2):
+            return Simulateur._simuler_vectorise(*situation, iterations, graine)
+        return Simulateur._simuler_boucle(*situation, iterations, graine)
+
+    @staticmethod
+    def _compter_essais(situation, iterations):
+        """Compteurs d'essais et d'évaluations (une par joueur et par essai) d'un lot Monte Carlo."""
+        if not METRIQUES.actif: return
+        main_ints, _, _, nb_adv, ranges = situation
+        METRIQUES.compter('essais', iterations)
+        METRIQUES.compter('evaluations', iterations * ((1 if main_ints else 0) + nb_adv + len(ranges)))
+
+    @staticmethod
+    def _simuler_parallele(situation, iterations, processus, graine=None):
+        """Répartit les essais sur un pool de process et additionne leurs compteurs.
+
+        Chaque lot reçoit sa propre graine, dérivée de la graine maître dans l'ordre des lots.
+        """
+        Simulateur._compter_essais(situation, iterations)
+        maitre = random.Random(graine)
+        taille, reste = divmod(iterations, processus)
+        lots = [(situation, taille + (1 if i < reste else 0), maitre.getrandbits(64)) for i in range(processus)]
+        lots = [lot for lot in lots if lot[1] > 0]
+
+        victoires = egalites = 0
+        stats_mains = [0] * 9
+        total_mains = [0] * 9
+        for v, e, stats, totaux in _pool(processus).map(_executer_lot, lots):
+            victoires += v
+            egalites += e
+            stats_mains = [a + b for a, b in zip(stats_mains, stats)]
+            total_mains = [a + b for a, b in zip(total_mains, totaux)]
+        return victoires, egalites, stats_mains, total_mains
+
+    @staticmethod
+    def _simuler_boucle(main_ints, tableau_ints, restantes, nb_adv, ranges, iterations, graine=None):
+        """Monte Carlo en Python pur (sans NumPy). Retourne (victoires, egalites, stats_mains, total_mains).
+
+        Les adversaires à range sont tirés d'abord (_tirer_ranges), puis les adversaires aléatoires
+        et la fin du tableau parmi les cartes restantes ; sans main du héros, il prend la première range.
+        Une main du héros qui n'a pas deux cartes est évaluée à part (evaluer_7_ints).
+        """
+        victoires = 0
+        egalites = 0
+        stats_mains = [0] * 9
+        total_mains = [0] * 9
+        alea = random.Random(graine)
+        ech = Echantillonneur(MASQUE_PAQUET & ~Simulateur._masque_codes(restantes), alea)
+        cartes = ech.cartes
+        cartes_a_venir = 5 - len(tableau_ints)
+        nb_ranges = len(ranges)
+        nb_adv = min(nb_adv, (ech.n - 2 * nb_ranges - cartes_a_venir) // 2)
+        debut_tableau = 2 * nb_adv
+        etat_tableau = EvaluateurFast.etat_tableau
+        evaluer_joueurs = EvaluateurFast.evaluer_joueurs
+        somme_carres = 0.0
+
+        # Tableau final pré-alloué ; les mains sont le héros, les ranges puis les adversaires aléatoires
+        pos = len(tableau_ints)
+        tableau = list(tableau_ints) + [0] * cartes_a_venir
+        heros = [tuple(main_ints)] if len(main_ints) == 2 else []
+        heros_partiel = tuple(main_ints) if main_ints and len(main_ints) != 2 else None
+        poids = 1
+        tirees = []
+        
+        for _ in range(iterations):
+            if ranges:
+                poids, tirees = Simulateur._tirer_ranges(ranges, alea)
+                if not poids: continue
+                somme_carres += poids * poids
+                ech.restaurer()
+                ech.exclure(c for main in tirees for c in main)
+            ech.melanger_partiel(debut_tableau + cartes_a_venir)
+            tableau[pos:] = cartes[debut_tableau:debut_tableau + cartes_a_venir]
+
+            # Un seul état du tableau, complété par les deux cartes de chaque joueur
+            mains = heros + tirees + [(cartes[2 * k], cartes[2 * k + 1]) for k in range(nb_adv)]
+            scores = evaluer_joueurs(etat_tableau(tableau), mains)
+            if heros_partiel is not None:
+                scores.insert(0, EvaluateurFast.evaluer_7_ints(tableau + list(heros_partiel)))
+            mon_score_total = scores[0]
+            mon_type = mon_score_total >> 24
+            meilleur_adv = max(scores[1:], default=-1)
+            
+            total_mains[mon_type] += poids
+            if meilleur_adv < mon_score_total:
+                victoires += poids
+                stats_mains[mon_type] += poids
+            elif meilleur_adv == mon_score_total:
+                egalites += poids
+
+        if ranges:
+            return Simulateur._taille_effective(victoires, egalites, stats_mains, total_mains, somme_carres)
+        return victoires, egalites, stats_mains, total_mains
+
+    @staticmethod
+    def compter_combinaisons(nb_restantes, cartes_a_venir, nb_adv):
+        """Nombre de situations distinctes (tableau final, ensemble de mains adverses)."""
+        n = nb_restantes - cartes_a_venir
+        ensembles = 1
+        for i in range(nb_adv):
+            ensembles *= comb(n - 2 * i, 2)
+        return comb(nb_restantes, cartes_a_venir) * ensembles // factorial(nb_adv)
+
+    @staticmethod
+    def cout_exact(nb_restantes, cartes_a_venir, nb_adv):
+        """Nombre d'évaluations de l'énumération exacte.
+
+        Chaque tableau final évalue une fois le héros et une fois chaque paire de cartes restantes ;
+        jusqu'à 2 adversaires les ensembles de mains sont comptés par formule, au-delà ils sont énumérés.
+        Lève ValueError s'il ne reste pas assez de cartes pour le tableau et tous les adversaires.
+        """
+        if nb_restantes - cartes_a_venir < 2 * nb_adv:
+            raise ValueError("Pas assez de cartes pour tous les joueurs")
+        n = nb_restantes - cartes_a_venir
+        cout = comb(nb_restantes, cartes_a_venir) * (1 + comb(n, 2))
+        if nb_adv > 2:
+            cout += Simulateur.compter_combinaisons(nb_restantes, cartes_a_venir, nb_adv)
+        return cout
+
+    @staticmethod
+    def _simuler_exact(main_ints, tableau_ints, restantes, nb_adv, par_tirage=False):
+        """Énumère tous les tableaux finaux et toutes les mains adverses.
+
+        Les compteurs retournés sont pondérés par le nombre d'ensembles de mains adverses :
+        mêmes proportions que Monte Carlo, sans variance. Avec `par_tirage`, un 5e élément
+        liste pour chaque tirage (indices dans restantes, victoires, egalites, poids).
+        """
+        METRIQUES.compter('evaluations', Simulateur.cout_exact(len(restantes), 5 - len(tableau_ints), nb_adv))
+        details = []
+        victoires = egalites = 0
+        stats_mains = [0] * 9
+        total_mains = [0] * 9
+        h1, h2 = main_ints
+        cartes_a_venir = 5 - len(tableau_ints)
+        nb_vivantes = len(restantes) - cartes_a_venir
+
+        # Paires d'indices dans la liste des cartes vivantes (identique pour chaque tableau final)
+        paires = list(combinations(range(nb_vivantes), 2))
+        pi = [i for i, _ in paires]
+        pj = [j for _, j in paires]
+        poids = Simulateur.compter_combinaisons(nb_vivantes, 0, nb_adv)
+
+        tirages = list(combinations(range(len(restantes)), cartes_a_venir))
+        if np is not None and paires:
+            # Le héros et toutes les paires vivantes de chaque tableau final, évalués en un seul appel
+            rest = np.array(restantes, dtype=np.int64)
+            sorties = np.array(tirages, dtype=np.int64).reshape(len(tirages), cartes_a_venir)
+            vivantes = np.ones((len(tirages), len(restantes)), dtype=bool)
+            vivantes[np.arange(len(tirages))[:, None], sorties] = False
+            vivantes = rest[np.nonzero(vivantes)[1]].reshape(len(tirages), nb_vivantes)
+            tableaux = np.hstack([np.broadcast_to(np.array(tableau_ints, dtype=np.int64), (len(tirages), len(tableau_ints))), rest[sorties]])
+            mains = np.concatenate([
+                np.broadcast_to(np.array([h1, h2], dtype=np.int64), (len(tirages), 1, 2)),
+                np.stack([vivantes[:, pi], vivantes[:, pj]], axis=2),
+            ], axis=1)
+            scores = EvaluateurFast.evaluer_joueurs_batch(tableaux, mains)
+            mes_scores, scores_paires = scores[:, 0].tolist(), scores[:, 1:].tolist()
+        else:
+            mes_scores, scores_paires = [], []
+            for sortie in tirages:
+                board = tableau_ints + [restantes[i] for i in sortie]
+                exclus = set(sortie)
+                vivantes = [c for i, c in enumerate(restantes) if i not in exclus]
+                scores = EvaluateurFast.evaluer_joueurs(EvaluateurFast.etat_tableau(board),
+                                                        [(h1, h2)] + [(vivantes[i], vivantes[j]) for i, j in paires])
+                mes_scores.append(scores[0])
+                scores_paires.append(scores[1:])
+
+        for tirage, mon_score, scores in zip(tirages, mes_scores, scores_paires):
+            battues = [k for k, s in enumerate(scores) if s < mon_score]
+            non_gagnantes = [k for k, s in enumerate(scores) if s <= mon_score]
+            n_gagne = Simulateur._compter_couplages([pi[k] for k in battues], [pj[k] for k in battues], nb_adv)
+            n_sans_perte = Simulateur._compter_couplages([pi[k] for k in non_gagnantes], [pj[k] for k in non_gagnantes], nb_adv)
+
+            mon_type = mon_score >> 24
+            total_mains[mon_type] += poids
+            stats_mains[mon_type] += n_gagne
+            victoires += n_gagne
+            egalites += n_sans_perte - n_gagne
+            if par_tirage:
+                details.append((tirage, n_gagne, n_sans_perte - n_gagne, poids))
+
+        if par_tirage:
+            return victoires, egalites, stats_mains, total_mains, details
+        return victoires, egalites, stats_mains, total_mains
+
+    @staticmethod
+    def _compter_couplages(pi, pj, k):
+        """Nombre d'ensembles de k paires disjointes parmi les paires (pi[e], pj[e])."""
+        m = len(pi)
+        if k == 0: return 1
+        if k == 1: return m
+        if k == 2:
+            # Couples de paires moins ceux qui partagent une carte
+            degres = {}
+            for c in pi + pj:
+                degres[c] = degres.get(c, 0) + 1
+            return comb(m, 2) - sum(comb(d, 2) for d in degres.values())
+
+        def compter(debut, utilisees, restant):
+            if restant == 0: return 1
+            total = 0
+            for e in range(debut, m):
+                masque = (1 << pi[e]) | (1 << pj[e])
+                if not utilisees & masque:
+                    total += compter(e + 1, utilisees | masque, restant - 1)
+            return total
+        return compter(0, 0, k)
+
+    @staticmethod
+    def _simuler_vectorise(main_ints, tableau_ints, restantes, nb_adv, ranges, iterations, graine=None):
+        """Monte Carlo par tranches : chaque tranche évalue tous les joueurs en un seul appel
+        (EvaluateurFast.evaluer_joueurs_batch, un état par tableau final).
+
+        Les mains des ranges sont tirées d'abord (_tirer_ranges_vectorise) ; leurs cartes reçoivent
+        une clé de tri hors d'atteinte, si bien que les adversaires aléatoires et la fin du tableau
+        sont tirés parmi les cartes qu'elles laissent. Sans main du héros, il prend la première range.
+        Retourne (victoires, egalites, stats_mains, total_mains) comme la boucle Python.
+        """
+        rng = np.random.default_rng(graine)
+        bits = Simulateur._bits_codes(restantes) if ranges else None
+        restantes = np.array(restantes, dtype=np.int64)
+        main_ints = np.array(main_ints, dtype=np.int64)
+        tableau_ints = np.array(tableau_ints, dtype=np.int64)
+        cartes_a_venir = 5 - len(tableau_ints)
+        nb_adv = min(nb_adv, (len(restantes) - 2 * len(ranges) - cartes_a_venir) // 2)
+        nb_joueurs = nb_adv + len(ranges) - (0 if len(main_ints) else 1)
+        a_tirer = 2 * nb_adv + cartes_a_venir
+
+        victoires = egalites = 0
+        somme_carres = 0.0
+        stats_mains = np.zeros(9, dtype=np.float64 if ranges else np.int64)
+        total_mains = np.zeros(9, dtype=np.float64 if ranges else np.int64)
+        tranche = ESSAIS_PAR_TRANCHE
+        if ranges:
+            tables = [r.tableaux_numpy() for r in ranges]
+            tranche = max(1, min(tranche, CELLULES_RANGES // max(len(r) for r in ranges)))
+
+        for debut in range(0, iterations, tranche):
+            n = min(tranche, iterations - debut)
+            with METRIQUES.phase('melange'):
+                cles = rng.random((n, len(restantes)))
+                if ranges:
+                    mains_r, utilisees, poids = Simulateur._tirer_ranges_vectorise(tables, n, rng)
+                    cles[(utilisees[:, None] & bits) != 0] = 2.0
+                tirage = restantes[np.argsort(cles, axis=1)[:, :a_tirer]]
+            tableaux = np.hstack([np.broadcast_to(tableau_ints, (n, len(tableau_ints))), tirage[:, 2 * nb_adv:]])
+
+            # Mains (héros, ranges, aléatoires) complétées par l'état de leur tableau final
+            mains = tirage[:, :2 * nb_adv].reshape(n, nb_adv, 2)
+            if ranges:
+                mains = np.concatenate([mains_r, mains], axis=1)
+            if len(main_ints):
+                mains = np.concatenate([np.broadcast_to(main_ints, (n, 1, 2)), mains], axis=1)
+            with METRIQUES.phase('evaluation'):
+                scores = EvaluateurFast.evaluer_joueurs_batch(tableaux, mains)
+
+            mon_score = scores[:, 0]
+            meilleur_adv = scores[:, 1:].max(axis=1) if nb_joueurs else np.full(n, -1)
+            types = mon_score >> 24
+            gagne = meilleur_adv < mon_score
+            partage = meilleur_adv == mon_score
+
+            if ranges:
+                victoires += float(poids[gagne].sum())
+                egalites += float(poids[partage].sum())
+                total_mains += np.bincount(types, weights=poids, minlength=9)
+                stats_mains += np.bincount(types[gagne], weights=poids[gagne], minlength=9)
+                somme_carres += float((poids * poids).sum())
+            else:
+                victoires += int(gagne.sum())
+                egalites += int(partage.sum())
+                total_mains += np.bincount(types, minlength=9)
+                stats_mains += np.bincount(types[gagne], minlength=9)
+
+        if ranges:
+            return Simulateur._taille_effective(victoires, egalites, stats_mains.tolist(), total_mains.tolist(), somme_carres)
+        return victoires, egalites, stats_mains.tolist(), total_mains.tolist()
+
+
+# Pool de process partagé entre les appels (créé à la demande ou par prechauffer, recréé si
+# la taille change ; un process issu d'un fork ne réutilise pas le pool de son parent)
+_POOL = None
+_POOL_TAILLE = 0
+_POOL_PID = None
+_POOL_BARRIERE = None
+_POOL_PRET = False  # tous les process du pool courant ont démarré (prechauffer)
+
+# Les process du pool sont issus d'un serveur de fork (forkserver) qui n'a importé que ce module,
+# et non du process courant, qui peut déjà avoir des threads (serveur web, journal)
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    _CONTEXTE = multiprocessing.get_context('forkserver')
+    _CONTEXTE.set_forkserver_preload([__name__])
+else:
+    _CONTEXTE = multiprocessing.get_context()
+
+# Délai maximal (secondes) de démarrage des process du pool par prechauffer
+ATTENTE_POOL = 60
+
+
+def _pool(processus):
+    global _POOL, _POOL_TAILLE, _POOL_PID, _POOL_BARRIERE, _POOL_PRET
+    if _POOL is None or _POOL_TAILLE != processus or _POOL_PID != os.getpid():
+        _POOL_PRET = False
+        if _POOL is not None and _POOL_PID == os.getpid():
+            _POOL.shutdown(wait=False)
+        _POOL_BARRIERE = _CONTEXTE.Barrier(processus)
+        _POOL = ProcessPoolExecutor(max_workers=processus, mp_context=_CONTEXTE, initializer=_initialiser_process,
+                                    initargs=(_POOL_BARRIERE,))
+        _POOL_TAILLE = processus
+        _POOL_PID = os.getpid()
+    return _POOL
+
+
+def pool(processus):
+    """Pool de `processus` process du simulateur (tables chargées), créé à la première demande."""
+    return _pool(processus)
+
+
+def _pool_pret(processus):
+    """Vrai si le pool de `processus` process de ce process a déjà démarré tous ses process."""
+    return _POOL_PRET and _POOL_TAILLE == processus and _POOL_PID == os.getpid()
+
+
+def _initialiser_process(barriere):
+    """Initialisation d'un process du pool : tables chargées, barrière de prechauffer gardée."""
+    global _POOL_BARRIERE
+    _POOL_BARRIERE = barriere
+    charger_tables()
+
+
+def charger_tables():
+    """Charge les tables pré-calculées dans le process : {nom: {'secondes', 'octets', 'projetee'}}.
+
+    Les tables de l'évaluateur le sont à l'import (EvaluateurFast._init_tables) ; la table
+    préflop et l'index de river le sont ici plutôt qu'à la première requête. Les tables
+    projetées (mmap) sont partagées par tous les process de la machine.
+    """
+    tables = {'evaluateur': {
+        'secondes': EvaluateurFast.DUREE_CHARGEMENT,
+        'octets': 4 * sum(len(t) for t in (EvaluateurFast.FLUSH_LOOKUP, EvaluateurFast.UNSUITED_LOOKUP,
+                                           EvaluateurFast.UNSUITED_DISP)),
+        'projetee': EvaluateurFast.PROJECTION is not None,
+    }}
+    debut = time.perf_counter()
+    if TablePreflop.donnees():
+        tables['preflop'] = {'secondes': time.perf_counter() - debut, 'octets': os.path.getsize(PREFLOP_PATH),
+                             'projetee': False}
+    debut = time.perf_counter()
+    index = IndexRiviere.ouvrir()
+    if index:
+        cles, rangs = index
+        int(cles.max())  # les clés (cherchées à chaque requête) sont lues d'avance
+        tables['riviere'] = {'secondes': time.perf_counter() - debut, 'octets': cles.nbytes + rangs.nbytes,
+                             'projetee': True}
+    return tables
+
+
+def prechauffer(processus):
+    """Démarre les `processus` process du pool, tables chargées, avant la première requête.
+
+    Chaque process reçoit une tâche qui attend les autres à une barrière : aucun ne peut en
+    prendre une deuxième, le pool doit donc tous les démarrer. Retourne la mémoire (voir
+    metrics.memoire_process) de chaque process du pool.
+    """
+    global _POOL_PRET
+    if processus <= 1: return []
+    rapports = list(_pool(processus).map(_process_pret, [ATTENTE_POOL] * processus))
+    if len({pid for pid, _ in rapports}) != processus:
+        raise RuntimeError("Le pool de simulation n'a pas démarré tous ses process")
+    _POOL_PRET = True
+    return [memoire for _, memoire in rapports]
+
+
+def _process_pret(attente):
+    """(pid, mémoire) du process, une fois tous les process du pool arrivés à la barrière."""
+    _POOL_BARRIERE.wait(attente)
+    return os.getpid(), memoire_process()
+
+
+def _executer_lot(lot):
+    """Point d'entrée d'un process du pool : un lot Monte Carlo avec sa propre graine."""
+    situation, iterations, graine = lot
+    return Simulateur._simuler_monte_carlo(situation, iterations, graine)
@@ -0,0 +1,278 @@
+"""Analyse exacte des tirages : équité du héros après chaque prochaine carte et chaque fin de tableau.
+
+Toutes les fins de tableau (1 carte au turn, 2 au flop) sont énumérées une fois. Pour chacune,
+l'état du tableau final est calculé une seule fois puis complété par la main du héros et par
+chaque paire de cartes adverses possible (EvaluateurFast.evaluer_joueurs). L'équité de chaque
+fin de tableau est exacte ; celle de chaque prochaine carte en est la moyenne pondérée.
+
+Une carte qui fait progresser la main du héros (catégorie supérieure) est un out :
+    - franc si l'équité après cette carte atteint SEUIL_FRANC ;
+    - souillé si elle augmente l'équité sans l'y amener (la carte aide aussi les adversaires) ;
+    - partagé si elle n'augmente pas l'équité (elle améliore surtout le tableau).
+Au flop, une fin de tableau dont aucune carte n'est un out mais qui amène le héros au seuil
+avec une main supérieure est un tirage runner-runner.
+"""
+from itertools import combinations
+from math import comb
+
+from card import INDEX_PAR_CODE, NOMS, masque_cartes
+from evaluator_fast import EvaluateurFast, np
+from metrics import METRIQUES
+from simulator import Simulateur
+
+# Équité (%) à partir de laquelle une carte qui améliore le héros est un out franc
+SEUIL_FRANC = 75.0
+
+# Cellules (fins de tableau x paires adverses) évaluées par appel NumPy
+CELLULES_MAX = 1 << 18
+
+
+class AnalyseurTirages:
+    """Équités exactes par carte et par fin de tableau, et classement des outs."""
+
+    @staticmethod
+    def analyser(ma_main, tableau, cartes_exclues, profils, seuil_franc=SEUIL_FRANC):
+        """Analyse des tirages au flop ou au turn ({} sinon).
+
+        Les adversaires sont des profils 'any' ou des ranges (voir ranges.Range). Le calcul est
+        exact contre 1 ou 2 adversaires aléatoires ou contre une seule range ; au-delà, chaque
+        adversaire est compté exactement face au héros et au tableau mais indépendamment des
+        autres (on néglige les cartes qu'ils se retirent entre eux) et 'exact' vaut False.
+
+        Retourne un dict :
+            equite         équité actuelle du héros (victoire + moitié des égalités, en %)
+            cartes         {carte: {'equite', 'prob', 'main', 'classe'}} pour chaque prochaine carte
+            outs           {'franc': [...], 'souille': [...], 'partage': [...]}
+            tirages        outs francs et souillés regroupés par main obtenue, puis runner-runner
+                           ({'nom', 'prob', 'type', 'outs'})
+            runner_runner  {main: {'prob', 'combos'}} (flop seulement)
+            proba_prochaine, proba_riviere : probabilité (%) de toucher un out au prochain tour,
+                           ou un out ou un runner-runner d'ici la river
+            exact
+        """
+        if not 3 <= len(tableau) <= 4: return {}
+        main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact = AnalyseurTirages.issues_fins(
+            ma_main, tableau, cartes_exclues, profils)
+        return AnalyseurTirages._classer(main_ints, tableau_ints, restantes, fins, mes_scores, issues,
+                                         exact, seuil_franc)
+
+    @staticmethod
+    def issues_fins(ma_main, tableau, cartes_exclues, profils):
+        """Issues de chaque fin de tableau, avant leur agrégation par carte (flop ou turn).
+
+        Retourne (main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact) : fins
+        liste les fins de tableau (tuples d'indices dans restantes), mes_scores le score final
+        du héros sur chacune et issues ses (victoire, non-défaite, poids), victoire et
+        non-défaite en fractions des mains adverses possibles, qui pèsent poids.
+        """
+        cartes_connues = list(ma_main) + list(tableau) + list(cartes_exclues)
+        cartes_restantes = Simulateur._cartes_vivantes(masque_cartes(cartes_connues))
+        main_ints, tableau_ints, restantes, nb_adv, ranges = Simulateur._situation(
+            ma_main, tableau, cartes_restantes, profils)
+        a_venir = 5 - len(tableau_ints)
+        fins = list(combinations(range(len(restantes)), a_venir))
+        paires = list(combinations(range(len(restantes)), 2))
+        adversaires = AnalyseurTirages._adversaires(restantes, paires, nb_adv, ranges)
+        exact = (not ranges and nb_adv <= 2) or (len(ranges) == 1 and nb_adv == 0)
+        METRIQUES.compter('evaluations', len(fins) * (1 + len(paires)))
+
+        if np is not None:
+            mes_scores, issues = AnalyseurTirages._issues_vectorisees(
+                main_ints, tableau_ints, restantes, fins, paires, adversaires, exact)
+        else:
+            mes_scores, issues = AnalyseurTirages._issues_boucle(
+                main_ints, tableau_ints, restantes, fins, paires, adversaires, exact)
+        return main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact
+
+    @staticmethod
+    def _adversaires(restantes, paires, nb_adv, ranges):
+        """[(poids par paire ou None si aléatoire, nombre d'adversaires de ce profil)]."""
+        adversaires = [(None, nb_adv)] if nb_adv else []
+        for r in ranges:
+            poids_combo = {frozenset(codes): p for codes, p in zip(r.codes, r.poids)}
+            adversaires.append(([poids_combo.get(frozenset((restantes[i], restantes[j])), 0.0) for i, j in paires], 1))
+        return adversaires
+
+    @staticmethod
+    def _issues_vectorisees(main_ints, tableau_ints, restantes, fins, paires, adversaires, exact):
+        """Score du héros et (victoire, non-défaite, poids) pour chaque fin de tableau, par lots NumPy."""
+        rest = np.array(restantes, dtype=np.int64)
+        bits = np.left_shift(np.uint64(1), np.arange(len(restantes), dtype=np.uint64))
+        ind_fins = np.array(fins, dtype=np.int64)
+        ind_paires = np.array(paires, dtype=np.int64)
+        masques_fins = np.bitwise_or.reduce(bits[ind_fins], axis=1)
+        masques_paires = bits[ind_paires[:, 0]] | bits[ind_paires[:, 1]]
+
+        # Chaque tableau final est évalué une fois (son état), puis complété par la main ou la paire
+        tableaux = np.hstack([np.broadcast_to(np.array(tableau_ints, dtype=np.int64), (len(fins), len(tableau_ints))),
+                              rest[ind_fins]])
+        mes_scores = EvaluateurFast.evaluer_joueurs_batch(
+            tableaux, np.broadcast_to(np.array(main_ints, dtype=np.int64), (len(fins), 1, 2)))[:, 0]
+        codes_paires = rest[ind_paires]
+        incidence = np.zeros((len(paires), len(restantes)), dtype=np.float64)
+        incidence[np.arange(len(paires))[:, None], ind_paires] = 1.0
+        poids = [(np.array(p, dtype=np.float64) if p is not None else None, n) for p, n in adversaires]
+
+        issues = np.zeros((len(fins), 3))
+        lot = max(1, CELLULES_MAX // len(paires))
+        for debut in range(0, len(fins), lot):
+            t = slice(debut, debut + lot)
+            scores = EvaluateurFast.evaluer_joueurs_batch(
+                tableaux[t], np.broadcast_to(codes_paires, (len(tableaux[t]), len(paires), 2)))
+            mien = mes_scores[t, None]
+            valide = (masques_fins[t, None] & masques_paires[None, :]) == 0
+            battue = valide & (scores < mien)
+            non_gagnante = valide & (scores <= mien)
+            if exact and poids and poids[0][0] is None:
+                # Adversaires aléatoires : ensembles de n paires disjointes, comptés par formule
+                n = poids[0][1]
+                compter = lambda m: AnalyseurTirages._ensembles_vectorise(m, incidence, n)
+                total = compter(valide)
+                total_sur = np.where(total > 0, total, 1.0)
+                issues[t, 0] = compter(battue) / total_sur
+                issues[t, 1] = compter(non_gagnante) / total_sur
+                issues[t, 2] = total
+                continue
+            victoire = np.ones(scores.shape[0])
+            sans_perte = np.ones(scores.shape[0])
+            total = np.ones(scores.shape[0])
+            for p, n in poids:
+                p = np.ones(len(paires)) if p is None else p
+                vivant = valide @ p
+                vivant_sur = np.where(vivant > 0, vivant, 1.0)
+                victoire *= ((battue @ p) / vivant_sur) ** n
+                sans_perte *= ((non_gagnante @ p) / vivant_sur) ** n
+                total *= vivant ** n
+            issues[t, 0] = victoire
+            issues[t, 1] = sans_perte
+            issues[t, 2] = total
+        return mes_scores.tolist(), issues.tolist()
+
+    @staticmethod
+    def _ensembles_vectorise(masque, incidence, n):
+        """Nombre d'ensembles de n (1 ou 2) paires disjointes parmi les paires vraies de chaque ligne."""
+        m = masque.sum(axis=1).astype(np.float64)
+        if n == 1: return m
+        degres = masque @ incidence
+        return m * (m - 1) / 2 - (degres * (degres - 1) / 2).sum(axis=1)
+
+    @staticmethod
+    def _issues_boucle(main_ints, tableau_ints, restantes, fins, paires, adversaires, exact):
+        """Repli Python de _issues_vectorisees : un état par tableau final, complété par chaque paire."""
+        mes_scores, issues = [], []
+        for fin in fins:
+            cartes_fin = [restantes[i] for i in fin]
+            etat = EvaluateurFast.etat_tableau(tableau_ints + cartes_fin)
+            mien = EvaluateurFast.evaluer_joueurs(etat, [tuple(main_ints)])[0]
+            mes_scores.append(mien)
+            sortie = set(fin)
+            valides = [k for k, (i, j) in enumerate(paires) if i not in sortie and j not in sortie]
+            scores = dict(zip(valides, EvaluateurFast.evaluer_joueurs(
+                etat, [(restantes[paires[k][0]], restantes[paires[k][1]]) for k in valides])))
+            battues = [k for k in valides if scores[k] < mien]
+            non_gagnantes = [k for k in valides if scores[k] <= mien]
+            if exact and adversaires and adversaires[0][0] is None:
+                n = adversaires[0][1]
+                total = AnalyseurTirages._ensembles(valides, paires, n)
+                total_sur = total or 1
+                issues.append((AnalyseurTirages._ensembles(battues, paires, n) / total_sur,
+                               AnalyseurTirages._ensembles(non_gagnantes, paires, n) / total_sur, total))
+                continue
+            victoire = sans_perte = total = 1.0
+            for p, n in adversaires:
+                poids = (lambda k: 1.0) if p is None else p.__getitem__
+                vivant = sum(poids(k) for k in valides)
+                if vivant > 0:
+                    victoire *= (sum(poids(k) for k in battues) / vivant) ** n
+                    sans_perte *= (sum(poids(k) for k in non_gagnantes) / vivant) ** n
+                total *= vivant ** n
+            issues.append((victoire, sans_perte, total))
+        return mes_scores, issues
+
+    @staticmethod
+    def _ensembles(indices, paires, n):
+        m = len(indices)
+        if n == 1: return m
+        degres = {}
+        for k in indices:
+            for c in paires[k]:
+                degres[c] = degres.get(c, 0) + 1
+        return comb(m, 2) - sum(comb(d, 2) for d in degres.values())
+
+    @staticmethod
+    def _classer(main_ints, tableau_ints, restantes, fins, mes_scores, issues, exact, seuil_franc):
+        """Agrège les issues par prochaine carte, classe les outs et cherche les runner-runner."""
+        a_venir = len(fins[0])
+        nb = len(restantes)
+        type_actuel = EvaluateurFast.evaluer_7_ints(main_ints + tableau_ints) >> 24
+        equites = [100 * (v + 0.5 * (s - v)) for v, s, _ in issues]
+        total = sum(p for _, _, p in issues) or 1.0
+
+        poids_carte = [0.0] * nb
+        equite_carte = [0.0] * nb
+        for fin, eq, (_, _, p) in zip(fins, equites, issues):
+            for i in fin:
+                poids_carte[i] += p
+                equite_carte[i] += p * eq
+        equite = sum(eq * p for eq, (_, _, p) in zip(equites, issues)) / total
+
+        cartes = {}
+        outs = {'franc': [], 'souille': [], 'partage': []}
+        classes = [None] * nb
+        for i, code in enumerate(restantes):
+            if poids_carte[i] <= 0: continue
+            if a_venir == 1:
+                score = mes_scores[i]
+            else:
+                score = EvaluateurFast.evaluer_7_ints(main_ints + tableau_ints + [code])
+            eq = equite_carte[i] / poids_carte[i]
+            if score >> 24 > type_actuel:
+                classes[i] = 'franc' if eq >= seuil_franc else 'souille' if eq > equite else 'partage'
+            nom = NOMS[INDEX_PAR_CODE[code]]
+            if classes[i]: outs[classes[i]].append(nom)
+            cartes[nom] = {
+                'equite': round(eq, 2),
+                'prob': round(100 * poids_carte[i] / (a_venir * total), 3),
+                'main': EvaluateurFast.RANGS_MAINS[score >> 24],
+                'classe': classes[i],
+            }
+
+        tirages = []
+        par_main = {}
+        for nom in outs['franc'] + outs['souille']:
+            info = cartes[nom]
+            groupe = par_main.setdefault((info['main'], info['classe']), [0, 0.0])
+            groupe[0] += 1
+            groupe[1] += info['prob']
+        for (main, classe), (n, prob) in par_main.items():
+            libelle = 'francs' if classe == 'franc' else 'souillés'
+            tirages.append({'nom': f"{main} ({n} outs {libelle})", 'prob': round(prob, 1), 'type': classe, 'outs': n})
+        proba_prochaine = sum(cartes[nom]['prob'] for nom in outs['franc'] + outs['souille'])
+
+        # Runner-runner et probabilité d'avoir touché d'ici la river
+        runner_runner = {}
+        touche = 0.0
+        utiles = ('franc', 'souille')
+        for fin, eq, mien, (_, _, p) in zip(fins, equites, mes_scores, issues):
+            if any(classes[i] in utiles for i in fin):
+                touche += p
+            elif a_venir == 2 and mien >> 24 > type_actuel and eq >= seuil_franc:
+                groupe = runner_runner.setdefault(EvaluateurFast.RANGS_MAINS[mien >> 24], [0.0, 0])
+                groupe[0] += p
+                groupe[1] += 1
+                touche += p
+        runner_runner = {main: {'prob': round(100 * p / total, 2), 'combos': n} for main, (p, n) in runner_runner.items()}
+        for main, info in runner_runner.items():
+            tirages.append({'nom': f"{main} (runner-runner)", 'prob': round(info['prob'], 1), 'type': 'runner',
+                            'outs': info['combos']})
+
+        return {
+            'equite': round(equite, 2),
+            'cartes': cartes,
+            'outs': outs,
+            'tirages': sorted(tirages, key=lambda x: x['prob'], reverse=True),
+            'runner_runner': runner_runner,
+            'proba_prochaine': round(proba_prochaine, 1),
+            'proba_riviere': round(100 * touche / total, 1),
+            'exact': exact,
+        }
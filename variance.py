@@ -0,0 +1,271 @@
+"""Réduction de variance pour Monte Carlo : stratification, quasi-Monte Carlo randomisé
+et variables de contrôle.
+
+Chaque méthode estime sans biais la même équité que Monte Carlo standard, avec une variance
+plus faible pour un même nombre d'essais. Cette variance est estimée sur les essais joués
+et rapportée en taille d'échantillon effective : le nombre d'essais Monte Carlo standard
+qui donneraient la même erreur standard sur la victoire.
+
+Réservé aux adversaires aléatoires et à une main du héros connue ; NumPy requis.
+"""
+from functools import lru_cache
+from itertools import combinations, islice
+
+from card import CARTES, INDEX_PAR_CODE
+from evaluator_fast import EvaluateurFast, np
+from preflop import TablePreflop
+
+# Points de la suite de Halton par réplique du mode 'quasi' (chaque réplique a son propre décalage)
+POINTS_REPLIQUE = 512
+
+# Bases de la suite de Halton : une par carte tirée (fin du tableau, puis mains adverses)
+_BASES_HALTON = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83)
+
+
+class Echantillonnage:
+    """Base des méthodes : tirages (fin du tableau puis mains adverses) et évaluation d'un lot.
+
+    Les sous-classes jouent les lots (`lot(n)`, arrondi à des répliques entières pour 'quasi')
+    et calculent l'estimation et sa variance (`estimation` -> win, tie, variance de win,
+    variance de tie, en fractions).
+    """
+    nom = None
+
+    def __init__(self, situation, graine=None):
+        main_ints, tableau_ints, restantes, nb_adv, ranges = situation
+        if np is None:
+            raise RuntimeError("La réduction de variance nécessite NumPy")
+        if ranges or len(main_ints) != 2:
+            raise ValueError("Réduction de variance : main du héros connue et adversaires aléatoires uniquement")
+        self.rng = np.random.default_rng(graine)
+        self.main = np.array(main_ints, dtype=np.int64)
+        self.tableau = np.array(tableau_ints, dtype=np.int64)
+        self.restantes = np.array(restantes, dtype=np.int64)
+        self.a_venir = 5 - len(tableau_ints)
+        self.nb_adv = min(nb_adv, (len(restantes) - self.a_venir) // 2)
+        self.a_tirer = self.a_venir + 2 * self.nb_adv
+        self.joues = 0
+        self.totaux = np.zeros(9)
+
+    def _issues(self, idx):
+        """Essais dont les colonnes de `idx` (indices dans restantes) sont la fin du tableau puis
+        les mains adverses. Retourne (victoire, égalité, type de main du héros) par essai."""
+        n = len(idx)
+        tirage = self.restantes[idx]
+        tableaux = np.hstack([np.broadcast_to(self.tableau, (n, len(self.tableau))), tirage[:, :self.a_venir]])
+        mains = np.concatenate([np.broadcast_to(self.main, (n, 1, 2)),
+                                tirage[:, self.a_venir:].reshape(n, self.nb_adv, 2)], axis=1)
+        scores = EvaluateurFast.evaluer_joueurs_batch(tableaux, mains)
+        mon_score = scores[:, 0]
+        meilleur = scores[:, 1:].max(axis=1) if self.nb_adv else np.full(n, -1)
+        types = mon_score >> 24
+        self.joues += n
+        self.totaux += np.bincount(types, minlength=9)
+        return (meilleur < mon_score).astype(np.float64), (meilleur == mon_score).astype(np.float64), types
+
+    def _ordre(self, cles):
+        return np.argsort(cles, axis=1)[:, :self.a_tirer]
+
+    def repartition(self):
+        """Fréquence (fraction) de chaque type de main finale du héros."""
+        return self.totaux / max(1, self.joues)
+
+    def taille_effective(self):
+        """Essais Monte Carlo standard de même variance sur la victoire."""
+        win, _, var_win, _ = self.estimation()
+        if var_win <= 0:
+            return float(self.joues)
+        return win * (1 - win) / var_win
+
+
+class _Moyennes:
+    """Moyenne et variance de la moyenne d'observations i.i.d. (sommes cumulées)."""
+    __slots__ = ('n', 'somme', 'carres')
+
+    def __init__(self):
+        self.n = 0
+        self.somme = 0.0
+        self.carres = 0.0
+
+    def ajouter(self, valeurs):
+        self.n += len(valeurs)
+        self.somme += float(valeurs.sum())
+        self.carres += float((valeurs * valeurs).sum())
+
+    def moyenne(self):
+        return self.somme / self.n if self.n else 0.0
+
+    def variance(self):
+        if self.n < 2: return 0.0
+        m = self.moyenne()
+        return max(0.0, (self.carres - self.n * m * m) / (self.n - 1)) / self.n
+
+
+class Stratifie(Echantillonnage):
+    """Stratification sur la première carte à venir (rang et couleur).
+
+    Chaque carte restante a la même probabilité d'être la prochaine : les essais sont répartis
+    à tour de rôle entre les strates, et l'estimation est la moyenne des moyennes par strate.
+    La variance entre strates (ce que la prochaine carte explique) disparaît de l'erreur.
+    """
+    nom = 'stratifie'
+
+    def __init__(self, situation, graine=None):
+        super().__init__(situation, graine)
+        m = len(self.restantes)
+        self.decalage = int(self.rng.integers(m))
+        self.comptes = np.zeros(m)
+        self.victoires = np.zeros(m)
+        self.egalites = np.zeros(m)
+
+    def lot(self, n):
+        m = len(self.restantes)
+        strates = (self.decalage + self.joues + np.arange(n)) % m
+        cles = self.rng.random((n, m))
+        cles[np.arange(n), strates] = -1.0  # la carte de la strate est tirée en premier
+        gagne, partage, _ = self._issues(self._ordre(cles))
+        self.comptes += np.bincount(strates, minlength=m)
+        self.victoires += np.bincount(strates, weights=gagne, minlength=m)
+        self.egalites += np.bincount(strates, weights=partage, minlength=m)
+
+    def estimation(self):
+        vues = self.comptes > 0
+        if not vues.any(): return 0.0, 0.0, 0.0, 0.0
+        n_s = self.comptes[vues]
+        k = len(n_s)
+
+        def estimer(succes):
+            p_s = succes[vues] / n_s
+            variance = (p_s * (1 - p_s) / np.maximum(n_s - 1, 1)).sum() / (k * k)
+            return float(p_s.mean()), float(variance)
+
+        win, var_win = estimer(self.victoires)
+        tie, var_tie = estimer(self.egalites)
+        return win, tie, var_win, var_tie
+
+
+class Quasi(Echantillonnage):
+    """Quasi-Monte Carlo randomisé : les cartes tirées suivent une suite de Halton à décalage aléatoire.
+
+    La coordonnée j d'un point choisit la carte j (fin du tableau, puis mains adverses) parmi
+    celles qui restent : indice u_j x cartes restantes. Au-delà de 23 cartes, le reste est tiré
+    au hasard. Chaque réplique de POINTS_REPLIQUE points a son propre décalage (Cranley-Patterson) :
+    les répliques sont indépendantes et sans biais, la variance est celle de leurs moyennes.
+    """
+    nom = 'quasi'
+
+    def __init__(self, situation, graine=None):
+        super().__init__(situation, graine)
+        self.victoires = _Moyennes()
+        self.egalites = _Moyennes()
+        i = np.arange(1, POINTS_REPLIQUE + 1)
+        self.dimensions = min(self.a_tirer, len(_BASES_HALTON))
+        self.points = np.column_stack([Quasi._halton(i, b) for b in _BASES_HALTON[:self.dimensions]] or
+                                      [np.empty((POINTS_REPLIQUE, 0))])
+
+    @staticmethod
+    def _halton(indices, base):
+        """Inverse radical des indices dans la base donnée (suite de Van der Corput)."""
+        valeurs = np.zeros(len(indices))
+        facteur = 1.0
+        reste = indices.copy()
+        while reste.any():
+            facteur /= base
+            valeurs += facteur * (reste % base)
+            reste //= base
+        return valeurs
+
+    def lot(self, n):
+        m = len(self.restantes)
+        for _ in range(max(1, -(-n // POINTS_REPLIQUE))):
+            u = (self.points + self.rng.random(self.dimensions)) % 1.0
+            q = len(u)
+            choisies = np.empty((q, self.dimensions), dtype=np.int64)
+            for j in range(self.dimensions):
+                # (rang + 1)-ième carte non choisie : on saute les cartes déjà choisies, par ordre croissant
+                pos = (u[:, j] * (m - j)).astype(np.int64)
+                for deja in np.sort(choisies[:, :j], axis=1).T:
+                    pos += deja <= pos
+                choisies[:, j] = pos
+            adverses = np.empty((q, 0), dtype=np.int64)
+            if self.dimensions < self.a_tirer:
+                cles = self.rng.random((q, m))
+                cles[np.arange(q)[:, None], choisies] = 2.0
+                adverses = np.argsort(cles, axis=1)[:, :self.a_tirer - self.dimensions]
+            gagne, partage, _ = self._issues(np.hstack([choisies, adverses]))
+            self.victoires.ajouter(np.array([gagne.mean()]))
+            self.egalites.ajouter(np.array([partage.mean()]))
+
+    def estimation(self):
+        return (self.victoires.moyenne(), self.egalites.moyenne(),
+                self.victoires.variance(), self.egalites.variance())
+
+
+class Controle(Echantillonnage):
+    """Variables de contrôle : indicatrices du type de main finale du héros, d'espérance exacte connue.
+
+    Les fréquences exactes des types viennent de la table préflop ou de l'énumération des fins
+    de tableau (frequences_types). Le coefficient optimal de ces indicatrices revient à pondérer
+    le taux de victoire observé pour chaque type par sa fréquence exacte (post-stratification) :
+    seule la variance à type de main fixé reste dans l'erreur.
+    """
+    nom = 'controle'
+
+    def __init__(self, situation, graine=None):
+        super().__init__(situation, graine)
+        self.exactes = np.array(frequences_types(tuple(situation[0]), tuple(situation[1]), tuple(situation[2])))
+        self.victoires = np.zeros(9)
+        self.egalites = np.zeros(9)
+
+    def lot(self, n):
+        gagne, partage, types = self._issues(self._ordre(self.rng.random((n, len(self.restantes)))))
+        self.victoires += np.bincount(types, weights=gagne, minlength=9)
+        self.egalites += np.bincount(types, weights=partage, minlength=9)
+
+    def repartition(self):
+        return self.exactes
+
+    def estimation(self):
+        if not self.joues: return 0.0, 0.0, 0.0, 0.0
+        n_t = self.totaux
+        vus = n_t > 0
+
+        def estimer(succes):
+            # Type jamais observé : son taux est estimé par le taux global
+            p_t = np.where(vus, succes / np.maximum(n_t, 1), succes.sum() / self.joues)
+            variance = (self.exactes ** 2 * p_t * (1 - p_t) / np.maximum(n_t - 1, 1))[vus].sum()
+            return float(self.exactes @ p_t), float(variance)
+
+        win, var_win = estimer(self.victoires)
+        tie, var_tie = estimer(self.egalites)
+        return win, tie, var_win, var_tie
+
+
+METHODES = {cls.nom: cls for cls in (Stratifie, Quasi, Controle)}
+
+
+@lru_cache(maxsize=256)
+def frequences_types(main_ints, tableau_ints, restantes):
+    """Fréquence exacte (fraction) de chaque type de main finale du héros sur toutes les fins de tableau.
+
+    Préflop sans carte exclue, elle vient de la table préflop ; sinon toutes les fins de
+    tableau sont énumérées (1 081 au flop, 46 au turn).
+    """
+    a_venir = 5 - len(tableau_ints)
+    if a_venir == 5 and len(restantes) == 50:
+        repartition = TablePreflop.repartition([CARTES[INDEX_PAR_CODE[c]] for c in main_ints])
+        if repartition is not None:
+            total = sum(repartition)
+            return tuple(f / total for f in repartition)
+
+    totaux = np.zeros(9)
+    rest = np.array(restantes, dtype=np.int64)
+    fixes = np.array(main_ints + tableau_ints, dtype=np.int64)
+    tirages = combinations(range(len(restantes)), a_venir)
+    while True:
+        bloc = list(islice(tirages, 1 << 18))
+        if not bloc: break
+        tranche = np.array(bloc, dtype=np.int64).reshape(len(bloc), a_venir)
+        mains = np.hstack([np.broadcast_to(fixes, (len(bloc), len(fixes))), rest[tranche]])
+        totaux += np.bincount(EvaluateurFast.evaluer_batch(mains) >> 24, minlength=9)
+    return tuple((totaux / totaux.sum()).tolist())